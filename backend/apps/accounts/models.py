@@ -48,6 +48,10 @@ class Address(TimeStampedModel):
         db_table = 'addresses'
         verbose_name = 'Address'
         verbose_name_plural = 'Addresses'
+        indexes = [
+            # save(): clearing the user's previous default of the same type.
+            models.Index(fields=['user', 'address_type', 'is_default'], name='addresses_user_default_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.address_type}"
@@ -98,7 +98,7 @@ class NotificationAdminSerializer(serializers.ModelSerializer):
 class OrderAdminSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
-        fields = '__all__'
+        exclude = ['snapshot']
         read_only_fields = ['order_number']
 
 
@@ -155,6 +155,13 @@ class CategoryAdminSerializer(serializers.ModelSerializer):
             'slug': {'required': False, 'allow_blank': True},
         }
 
+    def validate_parent(self, parent):
+        if parent is not None and self.instance is not None and (
+            parent.pk == self.instance.pk or parent.is_descendant_of(self.instance)
+        ):
+            raise serializers.ValidationError('A category cannot be moved under itself or one of its descendants.')
+        return parent
+
     def create(self, validated_data):
         slug = (validated_data.get('slug') or '').strip()
         if not slug:
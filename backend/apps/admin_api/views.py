@@ -6,6 +6,7 @@ from apps.accounts.models import User, Address, UserProfile
 from apps.cart.models import Cart, CartItem
 from apps.notifications.models import Notification
 from apps.orders.models import Order, OrderItem, OrderStatusHistory
+from apps.orders.snapshots import write_snapshot
 from apps.payments.models import Payment
 from apps.products.models import Brand, Category, Product, ProductImage, ProductVariant, ProductAttribute
 from apps.reviews.models import Review, ReviewImage
@@ -37,6 +38,7 @@ from .serializers import (
 )
 
 
+from utils.pagination import ApproximateCountPagination
 from utils.permissions import IsStaffOrInAdminGroupStrict
 from utils.otel_utils import set_span_attributes, add_span_event, record_span_error
 from utils.telemetry import admin_request_counter, admin_error_counter, admin_duration_histogram
@@ -45,6 +47,7 @@ import time
 
 class AdminOnly(viewsets.ModelViewSet):
     permission_classes = [IsStaffOrInAdminGroupStrict]
+    pagination_class = ApproximateCountPagination
 
     def dispatch(self, request, *args, **kwargs):
         start = time.monotonic()
@@ -88,16 +91,19 @@ class AdminOnly(viewsets.ModelViewSet):
 class TokenAdminViewSet(AdminOnly):
     queryset = Token.objects.all().select_related('user')
     serializer_class = TokenAdminSerializer
+    cursor_ordering = ('-created', '-key')
 
 
 class GroupAdminViewSet(AdminOnly):
     queryset = Group.objects.all()
     serializer_class = GroupAdminSerializer
+    cursor_ordering = ('-id',)
 
 
 class UserAdminViewSet(AdminOnly):
     queryset = User.objects.all()
     serializer_class = UserAdminSerializer
+    cursor_ordering = ('-date_joined', '-id')
 
 
 class AddressAdminViewSet(AdminOnly):
@@ -115,17 +121,41 @@ class NotificationAdminViewSet(AdminOnly):
     serializer_class = NotificationAdminSerializer
 
 
-class OrderAdminViewSet(AdminOnly):
+class OrderSnapshotMixin:
+    """Rebuild the order's snapshot (the customer-facing read model) after a write."""
+
+    def _order_of(self, instance):
+        return instance.order
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        write_snapshot(self._order_of(serializer.instance))
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        write_snapshot(self._order_of(serializer.instance))
+
+    def perform_destroy(self, instance):
+        order = self._order_of(instance)
+        super().perform_destroy(instance)
+        if order is not instance:
+            write_snapshot(order)
+
+
+class OrderAdminViewSet(OrderSnapshotMixin, AdminOnly):
     queryset = Order.objects.all().select_related('user')
     serializer_class = OrderAdminSerializer
 
+    def _order_of(self, instance):
+        return instance
+
 
-class OrderItemAdminViewSet(AdminOnly):
+class OrderItemAdminViewSet(OrderSnapshotMixin, AdminOnly):
     queryset = OrderItem.objects.all().select_related('order', 'product')
     serializer_class = OrderItemAdminSerializer
 
 
-class OrderStatusHistoryAdminViewSet(AdminOnly):
+class OrderStatusHistoryAdminViewSet(OrderSnapshotMixin, AdminOnly):
     queryset = OrderStatusHistory.objects.all().select_related('order')
     serializer_class = OrderStatusHistoryAdminSerializer
 
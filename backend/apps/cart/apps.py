@@ -1,7 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CartConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.cart'
     verbose_name = 'Shopping Cart'
+
+    def ready(self):
+        from . import signals
+
+        if getattr(settings, 'CART_STORE_BACKEND', 'database') == 'redis':
+            signals.connect()
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.cart.store import get_cart_store
+
+
+class Command(BaseCommand):
+    help = (
+        'Write buffered cart quantities back to the database. Only does work with '
+        'CART_STORE_BACKEND=redis; run it periodically and before stopping workers.'
+    )
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+        flush_dirty = getattr(store, 'flush_dirty', None)
+        if flush_dirty is None:
+            self.stdout.write('Cart store writes through to the database; nothing to flush')
+            return
+        total = flush_dirty()
+        self.stdout.write(self.style.SUCCESS(f'Flushed {total} carts'))
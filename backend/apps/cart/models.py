@@ -1,12 +1,63 @@
+from decimal import Decimal
+
 from django.db import models
 from django.conf import settings
+from django.db.models import DecimalField, ExpressionWrapper, F, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce
 from apps.products.models import Product, ProductVariant
 from utils.models import TimeStampedModel
 
 
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _unit_price(prefix=''):
+    """Product price plus variant adjustment, as a database expression."""
+    return ExpressionWrapper(
+        F(f'{prefix}product__price') + Coalesce(F(f'{prefix}variant__price_adjustment'), Value(Decimal('0'))),
+        output_field=MONEY,
+    )
+
+
+class CartItemQuerySet(models.QuerySet):
+    def for_read(self):
+        """Lines with a slim product/variant row and DB-computed prices."""
+        return self.select_related('product', 'variant').only(
+            'id', 'cart_id', 'quantity', 'product_id', 'variant_id',
+            'product__id', 'product__name', 'product__slug', 'product__sku',
+            'product__price', 'product__stock', 'product__is_active',
+            'variant__id', 'variant__name', 'variant__value', 'variant__price_adjustment',
+            'variant__stock',
+        ).annotate(
+            unit_price=_unit_price(),
+            line_subtotal=ExpressionWrapper(_unit_price() * F('quantity'), output_field=MONEY),
+        ).order_by('id')
+
+
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate ``items_total_price``/``items_total_quantity`` in SQL."""
+        return self.annotate(
+            items_total_quantity=Coalesce(Sum('items__quantity'), 0),
+            items_total_price=Coalesce(
+                Sum(ExpressionWrapper(_unit_price('items__') * F('items__quantity'), output_field=MONEY)),
+                Value(Decimal('0')),
+                output_field=MONEY,
+            ),
+        )
+
+    def for_read(self):
+        """Cart with totals plus its lines: two queries regardless of size."""
+        return self.with_totals().prefetch_related(
+            Prefetch('items', queryset=CartItem.objects.for_read())
+        )
+
+
 class Cart(TimeStampedModel):
     """Shopping cart model."""
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cart')
+
+    objects = CartQuerySet.as_manager()
     
     class Meta:
         db_table = 'carts'
@@ -18,10 +69,14 @@ class Cart(TimeStampedModel):
     
     @property
     def total_price(self):
+        if hasattr(self, 'items_total_price'):
+            return self.items_total_price
         return sum(item.subtotal for item in self.items.all())
     
     @property
     def total_items(self):
+        if hasattr(self, 'items_total_quantity'):
+            return self.items_total_quantity
         return sum(item.quantity for item in self.items.all())
 
 
@@ -31,6 +86,8 @@ class CartItem(TimeStampedModel):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, null=True, blank=True)
     quantity = models.PositiveIntegerField(default=1)
+
+    objects = CartItemQuerySet.as_manager()
     
     class Meta:
         db_table = 'cart_items'
@@ -43,6 +100,8 @@ class CartItem(TimeStampedModel):
     
     @property
     def price(self):
+        if hasattr(self, 'unit_price'):
+            return self.unit_price
         base_price = self.product.price
         if self.variant:
             base_price += self.variant.price_adjustment
@@ -50,4 +109,6 @@ class CartItem(TimeStampedModel):
     
     @property
     def subtotal(self):
+        if hasattr(self, 'line_subtotal'):
+            return self.line_subtotal
         return self.price * self.quantity
@@ -1,25 +1,104 @@
 from rest_framework import serializers
 from .models import Cart, CartItem
-from apps.products.serializers import ProductSerializer
+from apps.products.models import Product, ProductVariant, StockReservation
+
+
+class CartProductSummarySerializer(serializers.ModelSerializer):
+    """The few product fields a cart line needs; not the catalog payload."""
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'slug', 'sku', 'price', 'stock', 'is_active']
+        read_only_fields = fields
+
+
+class CartVariantSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductVariant
+        fields = ['id', 'name', 'value', 'price_adjustment', 'stock']
+        read_only_fields = fields
 
 
 class CartItemSerializer(serializers.ModelSerializer):
-    product_details = ProductSerializer(source='product', read_only=True)
+    product_details = CartProductSummarySerializer(source='product', read_only=True)
+    variant_details = CartVariantSummarySerializer(source='variant', read_only=True)
     price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
-    
+
     class Meta:
         model = CartItem
-        fields = ['id', 'product', 'variant', 'quantity', 'product_details', 'price', 'subtotal']
+        fields = ['id', 'product', 'variant', 'quantity', 'product_details', 'variant_details', 'price', 'subtotal']
         read_only_fields = ['id']
 
 
 class CartSerializer(serializers.ModelSerializer):
+    """Cart read model; pass a cart loaded with ``Cart.objects.for_read()``."""
     items = CartItemSerializer(many=True, read_only=True)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     total_items = serializers.IntegerField(read_only=True)
-    
+
     class Meta:
         model = Cart
         fields = ['id', 'user', 'items', 'total_price', 'total_items', 'created_at', 'updated_at']
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockReservation
+        fields = ['id', 'product', 'variant', 'quantity', 'status', 'expires_at']
+        read_only_fields = fields
+
+
+CART_BATCH_MAX_OPERATIONS = 100
+
+
+class CartBatchOperationSerializer(serializers.Serializer):
+    """One line change in a ``POST /cart/batch/`` request.
+
+    - ``add``: ``product``, optional ``variant``, ``quantity`` >= 1 (default 1)
+    - ``set``: ``item_id``, ``quantity`` >= 0 (0 removes the line)
+    - ``remove``: ``item_id``
+    - ``increment``: ``item_id``, non-zero ``quantity`` (default 1; negative
+      decrements, removing the line at 0)
+    """
+    OPS = ('add', 'set', 'remove', 'increment')
+
+    op = serializers.ChoiceField(choices=OPS)
+    product = serializers.IntegerField(required=False, min_value=1)
+    variant = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    item_id = serializers.IntegerField(required=False, min_value=1)
+    quantity = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        op = attrs['op']
+        if op == 'add':
+            if 'product' not in attrs:
+                raise serializers.ValidationError({'product': 'This field is required.'})
+            attrs.setdefault('quantity', 1)
+            attrs.setdefault('variant', None)
+            if attrs['quantity'] <= 0:
+                raise serializers.ValidationError({'quantity': 'Must be at least 1.'})
+            return attrs
+
+        if 'item_id' not in attrs:
+            raise serializers.ValidationError({'item_id': 'This field is required.'})
+        if op == 'set':
+            if attrs.get('quantity') is None or attrs['quantity'] < 0:
+                raise serializers.ValidationError({'quantity': 'Must be 0 or more.'})
+        elif op == 'increment':
+            attrs.setdefault('quantity', 1)
+            if attrs['quantity'] == 0:
+                raise serializers.ValidationError({'quantity': 'Must not be 0.'})
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartBatchOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, operations):
+        if len(operations) > CART_BATCH_MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f'At most {CART_BATCH_MAX_OPERATIONS} operations per request.'
+            )
+        return operations
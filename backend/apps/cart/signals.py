@@ -0,0 +1,34 @@
+"""Keep the Redis cart store in step with lines deleted outside it."""
+from django.db import transaction
+from django.db.models.signals import post_delete
+
+from .models import Cart, CartItem
+from .store import get_cart_store
+
+
+def forget_deleted_line(sender, instance, **kwargs):
+    """post_delete: drop the line from the user's hot cart, however it was deleted.
+
+    Checkout, cascades from a deleted product and the admin delete rows the
+    store never sees; left in the hash, the line's ``l:``/``q:`` fields would
+    swallow the next add of the same product.
+    """
+    if CartItem.cart.is_cached(instance):
+        user_id = instance.cart.user_id
+    else:
+        user_id = Cart.objects.filter(pk=instance.cart_id).values_list('user_id', flat=True).first()
+    if user_id is None:
+        return
+    store = get_cart_store()
+    line = (user_id, instance.pk, instance.product_id, instance.variant_id)
+    transaction.on_commit(lambda: store.forget_line(*line))
+
+
+def connect():
+    """Connect the receivers; only with the Redis store, since any ``post_delete``
+    receiver turns the database store's bulk line deletes into select-then-delete."""
+    post_delete.connect(forget_deleted_line, sender=CartItem, dispatch_uid='cart_store_forget_line')
+
+
+def disconnect():
+    post_delete.disconnect(sender=CartItem, dispatch_uid='cart_store_forget_line')
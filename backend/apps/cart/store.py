@@ -0,0 +1,514 @@
+"""
+Cart storage backends.
+
+``CART_STORE_BACKEND`` selects where cart line quantities are written:
+
+- ``'database'`` (default): every change is written to ``CartItem`` directly.
+- ``'redis'``: quantities of active carts live in a Redis hash and are changed
+  with atomic ``HINCRBY``/``HSET``. Changed carts are recorded in a dirty set
+  and written back to ``CartItem`` in the background (write-behind, the
+  ``flush_cart`` task), and synchronously before checkout via ``flush()``.
+  Reads are served from the hash too, with line details cached for
+  ``CART_STORE_READ_TTL`` seconds.
+
+The database stays the owner of line identity: adding a product that is not in
+the cart yet, and removing a line, are still written through so line ids are
+stable and foreign keys are enforced. Only quantity churn is buffered.
+"""
+import json
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from utils.redis_client import get_redis
+from utils.tasks import enqueue
+
+from apps.products import reservations
+from apps.products.models import Product, ProductVariant
+
+from .models import Cart, CartItem
+
+
+class CartBatchError(Exception):
+    """A batch operation that can't be applied; nothing in the batch was written."""
+
+    def __init__(self, code, message, index):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.index = index
+
+
+class DatabaseCartStore:
+    """Writes straight to ``Cart``/``CartItem``."""
+
+    def read(self, user):
+        """Load the user's cart through the read model, creating it if needed."""
+        cart = Cart.objects.for_read().filter(user=user).first()
+        if cart is None:
+            Cart.objects.get_or_create(user=user)
+            cart = Cart.objects.for_read().get(user=user)
+        return cart
+
+    def add_item(self, user, product_id, variant_id, quantity):
+        """Add ``quantity`` of a product/variant, merging into an existing line; returns its id."""
+        cart, _ = Cart.objects.get_or_create(user=user)
+        cart_item, created = CartItem.objects.get_or_create(
+            cart=cart,
+            product_id=product_id,
+            variant_id=variant_id,
+            defaults={'quantity': quantity}
+        )
+        if not created:
+            cart_item.quantity += quantity
+            cart_item.save()
+        return cart_item.id
+
+    def remove_item(self, user, item_id):
+        """Delete a line; return its quantity, or ``None`` if it isn't the user's."""
+        try:
+            cart_item = CartItem.objects.get(id=item_id, cart__user=user)
+        except CartItem.DoesNotExist:
+            return None
+        removed_quantity = int(cart_item.quantity or 0)
+        cart_item.delete()
+        return removed_quantity
+
+    def set_quantity(self, user, item_id, quantity):
+        """Set a line's quantity (0 deletes it); ``None`` if the line is unknown."""
+        try:
+            cart_item = CartItem.objects.get(id=item_id, cart__user=user)
+        except CartItem.DoesNotExist:
+            return None
+        if quantity == 0:
+            cart_item.delete()
+        else:
+            cart_item.quantity = quantity
+            cart_item.save()
+        return quantity
+
+    def change_quantity(self, user, item_id, delta):
+        """Add ``delta`` to a line, deleting it at 0; ``None`` if the line is unknown."""
+        try:
+            cart_item = CartItem.objects.get(id=item_id, cart__user=user)
+        except CartItem.DoesNotExist:
+            return None
+        cart_item.quantity += delta
+        if cart_item.quantity <= 0:
+            cart_item.delete()
+            return 0
+        cart_item.save()
+        return cart_item.quantity
+
+    def clear(self, user):
+        cart, _ = Cart.objects.get_or_create(user=user)
+        cart.items.all().delete()
+        reservations.release(cart=cart)
+
+    def apply_batch(self, user, operations):
+        """Apply validated ``CartBatchOperationSerializer`` data in one transaction.
+
+        Operations are folded in memory over the cart's current lines, then
+        written with at most one DELETE, one ``bulk_update`` and one
+        ``bulk_create``. Returns ``(added, removed)`` quantity totals; raises
+        ``CartBatchError`` (and writes nothing) if any operation is invalid.
+        """
+        with transaction.atomic():
+            cart, _ = Cart.objects.get_or_create(user=user)
+            lines = {
+                item.id: item
+                for item in CartItem.objects.select_for_update().filter(cart=cart).only(
+                    'id', 'cart_id', 'product_id', 'variant_id', 'quantity'
+                )
+            }
+            self._check_products(operations)
+            by_key = {(item.product_id, item.variant_id): item for item in lines.values()}
+            quantities = {item_id: item.quantity for item_id, item in lines.items()}
+            new_lines = {}
+            added = removed = 0
+
+            for index, operation in enumerate(operations):
+                op = operation['op']
+                if op == 'add':
+                    key = (operation['product'], operation['variant'])
+                    added += operation['quantity']
+                    item = by_key.get(key)
+                    if item is not None and quantities.get(item.id, 0) > 0:
+                        quantities[item.id] += operation['quantity']
+                    else:
+                        new_lines[key] = new_lines.get(key, 0) + operation['quantity']
+                    continue
+
+                item_id = operation['item_id']
+                if quantities.get(item_id, 0) <= 0:
+                    raise CartBatchError('item_not_found', 'Item not found', index)
+                if op == 'remove':
+                    quantity = 0
+                elif op == 'set':
+                    quantity = operation['quantity']
+                else:
+                    quantity = max(quantities[item_id] + operation['quantity'], 0)
+                if quantity > quantities[item_id]:
+                    added += quantity - quantities[item_id]
+                else:
+                    removed += quantities[item_id] - quantity
+                quantities[item_id] = quantity
+
+            deleted = [item_id for item_id, quantity in quantities.items() if quantity <= 0]
+            changed = [
+                lines[item_id] for item_id, quantity in quantities.items()
+                if quantity > 0 and quantity != lines[item_id].quantity
+            ]
+            for item in changed:
+                item.quantity = quantities[item.id]
+            # A line removed and re-added in the same batch keeps its row.
+            for key, item in by_key.items():
+                if key in new_lines and item.id in deleted:
+                    deleted.remove(item.id)
+                    item.quantity = new_lines.pop(key)
+                    changed.append(item)
+
+            if deleted:
+                CartItem.objects.filter(id__in=deleted).delete()
+            if changed:
+                CartItem.objects.bulk_update(changed, ['quantity'])
+            if new_lines:
+                CartItem.objects.bulk_create(
+                    CartItem(cart=cart, product_id=product_id, variant_id=variant_id, quantity=quantity)
+                    for (product_id, variant_id), quantity in new_lines.items()
+                )
+        return added, removed
+
+    @staticmethod
+    def _check_products(operations):
+        adds = [(i, op) for i, op in enumerate(operations) if op['op'] == 'add']
+        if not adds:
+            return
+        product_ids = set(Product.objects.filter(
+            id__in={op['product'] for _, op in adds}
+        ).values_list('id', flat=True))
+        variant_ids = {op['variant'] for _, op in adds if op['variant'] is not None}
+        variants = dict(ProductVariant.objects.filter(id__in=variant_ids).values_list('id', 'product_id')) if variant_ids else {}
+        for index, op in adds:
+            if op['product'] not in product_ids:
+                raise CartBatchError('invalid_product', 'Product not found', index)
+            if op['variant'] is not None and variants.get(op['variant']) != op['product']:
+                raise CartBatchError('invalid_product', 'Variant does not belong to product', index)
+
+    def flush(self, user_id):
+        """Write buffered changes for one user to the database (nothing buffered here)."""
+
+    def forget(self, user_id):
+        """Drop any hot copy of the user's cart after flushing it."""
+
+
+class RedisCartStore(DatabaseCartStore):
+    """Keeps line quantities of active carts in Redis, written back lazily.
+
+    ``cart:<user_id>`` is a hash with ``q:<item_id>`` -> quantity and
+    ``l:<product_id>:<variant_id>`` -> item id, plus a ``_loaded`` marker so an
+    empty cart is distinguishable from one that was never loaded, and ``_view``:
+    the cart's line details (product/variant summaries, unit prices) as JSON,
+    for ``read()``. User ids with unflushed quantities are members of
+    ``cart:dirty``.
+    """
+
+    DIRTY_KEY = 'cart:dirty'
+    LOADED = '_loaded'
+    VIEW = '_view'
+    PRODUCT_FIELDS = ('id', 'name', 'slug', 'sku', 'price', 'stock', 'is_active')
+    VARIANT_FIELDS = ('id', 'name', 'value', 'price_adjustment', 'stock')
+
+    def __init__(self, client=None, ttl=None):
+        self.redis = client or get_redis()
+        self.ttl = ttl or getattr(settings, 'CART_STORE_TTL', 7 * 24 * 3600)
+
+    @staticmethod
+    def key(user_id):
+        return f'cart:{user_id}'
+
+    @staticmethod
+    def _line_field(product_id, variant_id):
+        return f'l:{product_id}:{variant_id or ""}'
+
+    def _load(self, user_id):
+        """Copy the user's lines into Redis unless they're there already.
+
+        ``HSETNX`` keeps quantities written by a concurrent request that
+        loaded the cart first.
+        """
+        key = self.key(user_id)
+        if self.redis.hexists(key, self.LOADED):
+            return key
+        rows = CartItem.objects.filter(cart__user_id=user_id).values_list(
+            'id', 'product_id', 'variant_id', 'quantity'
+        )
+        pipe = self.redis.pipeline()
+        for item_id, product_id, variant_id, quantity in rows:
+            pipe.hsetnx(key, f'q:{item_id}', quantity)
+            pipe.hsetnx(key, self._line_field(product_id, variant_id), item_id)
+        pipe.hset(key, self.LOADED, 1)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+        return key
+
+    def _mark_dirty(self, user_id):
+        self.redis.expire(self.key(user_id), self.ttl)
+        if self.redis.sadd(self.DIRTY_KEY, user_id):
+            enqueue(flush_cart, user_id)
+
+    def _prune(self, user_id, item_ids, fields=None):
+        """Drop the hash fields of lines that no longer exist in the database."""
+        key = self.key(user_id)
+        if fields is None:
+            fields = self.redis.hgetall(key)
+        ids = {str(item_id) for item_id in item_ids}
+        stale = [f'q:{item_id}' for item_id in ids] + [
+            field for field, value in fields.items() if field.startswith('l:') and value in ids
+        ]
+        self.redis.hdel(key, self.VIEW, *stale)
+
+    def forget_line(self, user_id, item_id, product_id, variant_id):
+        """Drop one line from the hash; used whenever a ``CartItem`` is deleted."""
+        self.redis.hdel(
+            self.key(user_id), self.VIEW, f'q:{item_id}', self._line_field(product_id, variant_id)
+        )
+
+    @staticmethod
+    def _totals(cart, items):
+        cart.items_total_quantity = sum(item.quantity for item in items)
+        cart.items_total_price = sum((item.line_subtotal for item in items), Decimal('0'))
+        return cart
+
+    @staticmethod
+    def _summary(obj, fields):
+        return {name: getattr(obj, name) for name in fields}
+
+    @staticmethod
+    def _restore(model, values):
+        return model(**{name: model._meta.get_field(name).to_python(value) for name, value in values.items()})
+
+    def _cache_view(self, key, cart, items):
+        view = {
+            'at': time.time(),
+            'cart': [cart.id, cart.created_at.isoformat(), cart.updated_at.isoformat()],
+            'lines': [
+                [
+                    item.id,
+                    self._summary(item.product, self.PRODUCT_FIELDS),
+                    self._summary(item.variant, self.VARIANT_FIELDS) if item.variant_id else None,
+                    item.unit_price,
+                ]
+                for item in items
+            ],
+        }
+        self.redis.hset(key, self.VIEW, json.dumps(view, cls=DjangoJSONEncoder))
+
+    def _cached_read(self, user, fields):
+        """The cart rebuilt from ``_view`` and hot quantities, or ``None`` if that is stale."""
+        raw = fields.get(self.VIEW)
+        if raw is None:
+            return None
+        view = json.loads(raw)
+        if time.time() - view['at'] >= getattr(settings, 'CART_STORE_READ_TTL', 30):
+            return None
+        cart_id, created_at, updated_at = view['cart']
+        cart = Cart(id=cart_id, user=user, created_at=parse_datetime(created_at),
+                    updated_at=parse_datetime(updated_at))
+        items = []
+        for item_id, product, variant, price in view['lines']:
+            hot = fields.get(f'q:{item_id}')
+            if hot is None:
+                return None
+            item = CartItem(
+                id=item_id, cart=cart, quantity=int(hot),
+                product=self._restore(Product, product),
+                variant=self._restore(ProductVariant, variant) if variant else None,
+            )
+            item.unit_price = Decimal(price)
+            item.line_subtotal = item.unit_price * item.quantity
+            items.append(item)
+        if sum(1 for field in fields if field.startswith('q:')) != len(items):
+            return None
+        cart._prefetched_objects_cache = {'items': items}
+        return self._totals(cart, items)
+
+    def read(self, user):
+        """Serve the cart from the hash while its cached line details are fresh.
+
+        Quantities always come from the hash. Line details are cached for
+        ``CART_STORE_READ_TTL`` seconds and dropped whenever a line is added or
+        removed, so only prices and stock shown in the cart can lag; checkout
+        prices from the database. Otherwise the read model is loaded from the
+        database, which also loads the hash and prunes lines deleted elsewhere.
+        """
+        key = self.key(user.id)
+        fields = self.redis.hgetall(key)
+        cart = self._cached_read(user, fields)
+        if cart is not None:
+            return cart
+
+        cart = super().read(user)
+        items = list(cart.items.all())
+        hot_ids = {int(field[2:]) for field in fields if field.startswith('q:')}
+        stale = hot_ids - {item.id for item in items}
+        if stale:
+            self._prune(user.id, stale, fields)
+        pipe = self.redis.pipeline()
+        for item in items:
+            hot = fields.get(f'q:{item.id}')
+            if hot is not None:
+                item.quantity = int(hot)
+                item.line_subtotal = item.unit_price * item.quantity
+            else:
+                pipe.hsetnx(key, f'q:{item.id}', item.quantity)
+                pipe.hsetnx(key, self._line_field(item.product_id, item.variant_id), item.id)
+        pipe.hset(key, self.LOADED, 1)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+        self._cache_view(key, cart, items)
+        return self._totals(cart, items)
+
+    def add_item(self, user, product_id, variant_id, quantity):
+        key = self._load(user.id)
+        item_id = self.redis.hget(key, self._line_field(product_id, variant_id))
+        if item_id is not None and self.redis.hexists(key, f'q:{item_id}'):
+            self.redis.hincrby(key, f'q:{item_id}', quantity)
+            self._mark_dirty(user.id)
+            return int(item_id)
+
+        cart, _ = Cart.objects.get_or_create(user=user)
+        cart_item, created = CartItem.objects.get_or_create(
+            cart=cart,
+            product_id=product_id,
+            variant_id=variant_id,
+            defaults={'quantity': quantity}
+        )
+        pipe = self.redis.pipeline()
+        pipe.hset(key, self._line_field(product_id, variant_id), cart_item.id)
+        pipe.hsetnx(key, f'q:{cart_item.id}', cart_item.quantity)
+        pipe.hdel(key, self.VIEW)
+        if not created:
+            pipe.hincrby(key, f'q:{cart_item.id}', quantity)
+        pipe.execute()
+        if not created:
+            self._mark_dirty(user.id)
+        return cart_item.id
+
+    def _drop_line(self, user_id, item_id):
+        item = CartItem.objects.filter(id=item_id, cart__user_id=user_id).select_related('cart').only(
+            'id', 'product_id', 'variant_id', 'quantity', 'cart__id', 'cart__user_id'
+        ).first()
+        if item is None:
+            return None
+        item.delete()
+        self.forget_line(user_id, item.id, item.product_id, item.variant_id)
+        return item
+
+    def remove_item(self, user, item_id):
+        key = self._load(user.id)
+        hot = self.redis.hget(key, f'q:{item_id}')
+        item = self._drop_line(user.id, item_id)
+        if item is None:
+            return None
+        return int(hot if hot is not None else item.quantity or 0)
+
+    def set_quantity(self, user, item_id, quantity):
+        key = self._load(user.id)
+        if not self.redis.hexists(key, f'q:{item_id}'):
+            return None
+        if quantity == 0:
+            self._drop_line(user.id, item_id)
+            return 0
+        self.redis.hset(key, f'q:{item_id}', quantity)
+        self._mark_dirty(user.id)
+        return quantity
+
+    def change_quantity(self, user, item_id, delta):
+        key = self._load(user.id)
+        if not self.redis.hexists(key, f'q:{item_id}'):
+            return None
+        quantity = self.redis.hincrby(key, f'q:{item_id}', delta)
+        if quantity <= 0:
+            self._drop_line(user.id, item_id)
+            return 0
+        self._mark_dirty(user.id)
+        return quantity
+
+    def clear(self, user):
+        super().clear(user)
+        self.redis.delete(self.key(user.id))
+        self.redis.srem(self.DIRTY_KEY, user.id)
+
+    def apply_batch(self, user, operations):
+        """Batches write through: flush, apply in the database, then reload lazily."""
+        self.flush(user.id)
+        result = super().apply_batch(user, operations)
+        self.redis.delete(self.key(user.id))
+        return result
+
+    def flush(self, user_id):
+        """Write the user's hot quantities to ``CartItem``; returns rows updated.
+
+        The user leaves the dirty set *before* the hash is read, so a change
+        landing during the flush marks the cart dirty again. Lines whose rows
+        are gone are pruned from the hash.
+        """
+        self.redis.srem(self.DIRTY_KEY, user_id)
+        quantities = {
+            int(field[2:]): int(value)
+            for field, value in self.redis.hgetall(self.key(user_id)).items()
+            if field.startswith('q:')
+        }
+        if not quantities:
+            return 0
+        with transaction.atomic():
+            rows = list(CartItem.objects.select_for_update().filter(
+                cart__user_id=user_id, id__in=list(quantities)
+            ).only('id', 'quantity'))
+            items = [
+                item for item in rows
+                if item.quantity != quantities[item.id] and quantities[item.id] > 0
+            ]
+            for item in items:
+                item.quantity = quantities[item.id]
+            CartItem.objects.bulk_update(items, ['quantity'])
+        gone = set(quantities) - {item.id for item in rows}
+        if gone:
+            self._prune(user_id, gone)
+        return len(items)
+
+    def flush_dirty(self):
+        """Flush every cart with pending changes; returns the number of carts."""
+        user_ids = self.redis.smembers(self.DIRTY_KEY)
+        for user_id in user_ids:
+            self.flush(int(user_id))
+        return len(user_ids)
+
+    def forget(self, user_id):
+        self.flush(user_id)
+        self.redis.delete(self.key(user_id))
+
+
+CART_STORES = {
+    'database': DatabaseCartStore,
+    'redis': RedisCartStore,
+}
+
+
+def get_cart_store():
+    """Return the store selected by ``CART_STORE_BACKEND``."""
+    backend = getattr(settings, 'CART_STORE_BACKEND', 'database')
+    try:
+        return CART_STORES[backend]()
+    except KeyError:
+        raise ValueError(f'Unknown CART_STORE_BACKEND: {backend!r}')
+
+
+def flush_cart(user_id):
+    """Background task: write one user's buffered quantities to the database."""
+    return get_cart_store().flush(user_id)
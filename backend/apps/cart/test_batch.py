@@ -0,0 +1,113 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.cart.models import Cart, CartItem
+from apps.products.models import Category, Product, ProductVariant
+from utils.redis_client import get_redis
+
+
+class CartBatchTests(TestCase):
+    url = '/api/v1/cart/batch/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='batcher', email='batcher@example.com', password='password123',
+        )
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Batch', slug='batch')
+        self.products = [
+            Product.objects.create(
+                name=f'Batch {i}', slug=f'batch-{i}', description='', category=category,
+                sku=f'BATCH-{i}', price=Decimal('5.00'), stock=100,
+            )
+            for i in range(4)
+        ]
+        self.variant = ProductVariant.objects.create(
+            product=self.products[0], name='Size', value='XL', sku='BATCH-0-XL',
+            price_adjustment=Decimal('1.00'),
+        )
+        self.cart = Cart.objects.create(user=self.user)
+        self.kept = CartItem.objects.create(cart=self.cart, product=self.products[1], quantity=2)
+        self.dropped = CartItem.objects.create(cart=self.cart, product=self.products[2], quantity=1)
+
+    def _batch(self, operations):
+        return self.client.post(self.url, {'operations': operations}, format='json')
+
+    def test_applies_operations_in_order_and_returns_snapshot(self):
+        response = self._batch([
+            {'op': 'add', 'product': self.products[0].id, 'variant': self.variant.id, 'quantity': 2},
+            {'op': 'add', 'product': self.products[3].id},
+            {'op': 'add', 'product': self.products[3].id, 'quantity': 2},
+            {'op': 'increment', 'item_id': self.kept.id},
+            {'op': 'set', 'item_id': self.kept.id, 'quantity': 5},
+            {'op': 'increment', 'item_id': self.kept.id, 'quantity': -1},
+            {'op': 'remove', 'item_id': self.dropped.id},
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        quantities = {
+            (line['product'], line['variant']): line['quantity'] for line in response.data['items']
+        }
+        self.assertEqual(quantities, {
+            (self.products[0].id, self.variant.id): 2,
+            (self.products[1].id, None): 4,
+            (self.products[3].id, None): 3,
+        })
+        self.assertEqual(response.data['total_price'], '47.00')
+        self.assertFalse(CartItem.objects.filter(pk=self.dropped.pk).exists())
+
+    def test_writes_are_bulk(self):
+        operations = [{'op': 'add', 'product': p.id} for p in self.products] + [
+            {'op': 'set', 'item_id': self.kept.id, 'quantity': 9},
+            {'op': 'remove', 'item_id': self.dropped.id},
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = self._batch(operations)
+        self.assertEqual(response.status_code, 200, response.data)
+        writes = [q['sql'] for q in context.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertEqual(len(writes), 3, writes)
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 3)
+
+    def test_remove_then_add_keeps_the_row(self):
+        response = self._batch([
+            {'op': 'remove', 'item_id': self.kept.id},
+            {'op': 'add', 'product': self.products[1].id, 'quantity': 7},
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.kept.refresh_from_db()
+        self.assertEqual(self.kept.quantity, 7)
+
+    def test_invalid_operation_writes_nothing(self):
+        response = self._batch([
+            {'op': 'add', 'product': self.products[0].id},
+            {'op': 'increment', 'item_id': 99999},
+        ])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data, {'error': 'Item not found', 'index': 1})
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 2)
+
+        response = self._batch([{'op': 'add', 'product': self.products[1].id, 'variant': self.variant.id}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['index'], 0)
+
+    def test_validation_errors(self):
+        for operations in ([], [{'op': 'set', 'item_id': self.kept.id}], [{'op': 'explode'}]):
+            response = self._batch(operations)
+            self.assertEqual(response.status_code, 400, operations)
+            self.assertEqual(response.data['error'], 'Invalid operations')
+
+    @override_settings(CART_STORE_BACKEND='redis')
+    @mock.patch('apps.cart.store.enqueue')
+    def test_redis_store_flushes_before_batch(self, _enqueue):
+        get_redis().flushall()
+        self.client.post('/api/v1/cart/increment_item/', {'item_id': self.kept.id}, format='json')
+        response = self._batch([{'op': 'increment', 'item_id': self.kept.id, 'quantity': 2}])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.kept.refresh_from_db()
+        self.assertEqual(self.kept.quantity, 5)
@@ -0,0 +1,126 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Address, User
+from apps.cart.models import Cart, CartItem
+from apps.cart import signals
+from apps.cart.serializers import CartSerializer
+from apps.cart.store import DatabaseCartStore, RedisCartStore, flush_cart, get_cart_store
+from apps.products.models import Category, Product
+from utils.redis_client import LocalRedis, get_redis
+
+
+@override_settings(CART_STORE_BACKEND='redis')
+class RedisCartStoreTests(TestCase):
+    def setUp(self):
+        get_redis().flushall()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='hot', email='hot@example.com', password='password123',
+        )
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Hot', slug='hot')
+        self.product = Product.objects.create(
+            name='Mug', slug='mug', description='', category=category,
+            sku='MUG', price=Decimal('8.00'), stock=50,
+        )
+        # Hold background flushes so the write-behind window is observable.
+        patcher = mock.patch('apps.cart.store.enqueue')
+        self.enqueue = patcher.start()
+        self.addCleanup(patcher.stop)
+        signals.connect()
+        self.addCleanup(signals.disconnect)
+
+    def _post(self, action, data):
+        response = self.client.post(f'/api/v1/cart/{action}/', data, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_uses_local_stand_in_without_redis_url(self):
+        store = get_cart_store()
+        self.assertIsInstance(store, RedisCartStore)
+        self.assertIsInstance(store.redis, LocalRedis)
+
+    def test_quantity_changes_are_buffered_until_flush(self):
+        data = self._post('add_item', {'product': self.product.id, 'quantity': 2})
+        item_id = data['items'][0]['id']
+        self._post('increment_item', {'item_id': item_id})
+        data = self._post('add_item', {'product': self.product.id, 'quantity': 3})
+
+        self.assertEqual(data['items'][0]['quantity'], 6)
+        self.assertEqual(data['items'][0]['subtotal'], '48.00')
+        self.assertEqual((data['total_items'], data['total_price']), (6, '48.00'))
+        self.assertEqual(CartItem.objects.get(pk=item_id).quantity, 2)
+        # One flush is scheduled per dirty period, not one per change.
+        self.enqueue.assert_called_once_with(flush_cart, self.user.id)
+
+        self.assertEqual(get_cart_store().flush(self.user.id), 1)
+        self.assertEqual(CartItem.objects.get(pk=item_id).quantity, 6)
+        self.assertEqual(get_redis().smembers(RedisCartStore.DIRTY_KEY), set())
+
+    def test_existing_database_lines_are_loaded(self):
+        item = CartItem.objects.create(cart=Cart.objects.create(user=self.user), product=self.product, quantity=4)
+        data = self._post('decrement_item', {'item_id': item.id})
+        self.assertEqual(data['items'][0]['quantity'], 3)
+        data = self._post('set_quantity', {'item_id': item.id, 'quantity': 0})
+        self.assertEqual(data['items'], [])
+        self.assertFalse(CartItem.objects.filter(pk=item.pk).exists())
+
+    def test_unknown_item_is_not_found(self):
+        for action in ('increment_item', 'decrement_item', 'remove_item'):
+            response = self.client.post(f'/api/v1/cart/{action}/', {'item_id': 999}, format='json')
+            self.assertEqual(response.status_code, 404)
+
+    def test_flush_carts_command_writes_dirty_carts(self):
+        data = self._post('add_item', {'product': self.product.id})
+        self._post('set_quantity', {'item_id': data['items'][0]['id'], 'quantity': 7})
+        call_command('flush_carts', stdout=mock.MagicMock())
+        self.assertEqual(CartItem.objects.get().quantity, 7)
+
+    def test_checkout_reads_flushed_quantities(self):
+        data = self._post('add_item', {'product': self.product.id})
+        self._post('increment_item', {'item_id': data['items'][0]['id']})
+        address = Address.objects.create(
+            user=self.user, address_type='shipping', full_name='Hot User', phone='1',
+            address_line1='1 St', city='City', state='ST', postal_code='1', country='US',
+        )
+        response = self.client.post('/api/v1/orders/create_from_cart/', {
+            'shipping_address': address.id, 'billing_address': address.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['items'][0]['quantity'], 2)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertFalse(get_redis().exists(RedisCartStore.key(self.user.id)))
+
+    def test_reads_are_served_from_redis_while_fresh(self):
+        data = self._post('add_item', {'product': self.product.id, 'quantity': 2})
+        self._post('increment_item', {'item_id': data['items'][0]['id']})
+        store = get_cart_store()
+        with self.assertNumQueries(0):
+            cached = CartSerializer(store.read(self.user)).data
+        store.flush(self.user.id)
+        self.assertEqual(cached, CartSerializer(DatabaseCartStore().read(self.user)).data)
+
+        with override_settings(CART_STORE_READ_TTL=0), self.assertNumQueries(2):
+            store.read(self.user)
+
+    def test_lines_deleted_elsewhere_do_not_swallow_adds(self):
+        self._post('add_item', {'product': self.product.id, 'quantity': 2})
+        with self.captureOnCommitCallbacks(execute=True):
+            CartItem.objects.filter(cart__user=self.user).delete()
+        data = self._post('add_item', {'product': self.product.id, 'quantity': 3})
+        self.assertEqual(data['items'][0]['quantity'], 3)
+        self.assertEqual(CartItem.objects.get().quantity, 3)
+
+    def test_flush_prunes_lines_that_are_gone(self):
+        data = self._post('add_item', {'product': self.product.id})
+        self._post('increment_item', {'item_id': data['items'][0]['id']})
+        signals.disconnect()
+        CartItem.objects.all().delete()
+        self.assertEqual(get_cart_store().flush(self.user.id), 0)
+        fields = get_redis().hgetall(RedisCartStore.key(self.user.id))
+        self.assertEqual(sorted(fields), [RedisCartStore.LOADED])
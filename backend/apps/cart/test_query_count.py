@@ -0,0 +1,99 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.cart.models import Cart, CartItem
+from apps.products.models import Category, Product, ProductImage, ProductVariant
+
+
+class CartReadModelTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='shopper',
+            email='shopper@example.com',
+            password='password123',
+        )
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Cart Category', slug='cart-category')
+        self.cart = Cart.objects.create(user=self.user)
+        self.products = []
+
+    def _add_lines(self, count, with_variant=True):
+        for _ in range(count):
+            index = len(self.products)
+            product = Product.objects.create(
+                name=f'Cart Product {index}',
+                slug=f'cart-product-{index}',
+                description='Long description ' * 20,
+                category=self.category,
+                sku=f'CART-{index}',
+                price='10.00',
+                stock=20,
+            )
+            ProductImage.objects.create(product=product, alt_text='img', is_primary=True)
+            variant = None
+            if with_variant:
+                variant = ProductVariant.objects.create(
+                    product=product, name='Size', value='L', sku=f'CART-{index}-L',
+                    price_adjustment='2.50', stock=5,
+                )
+            CartItem.objects.create(cart=self.cart, product=product, variant=variant, quantity=2)
+            self.products.append(product)
+
+    def _count_queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return len(context.captured_queries), response
+
+    def test_totals_are_computed_in_the_database(self):
+        self._add_lines(2)
+        self._add_lines(1, with_variant=False)
+        cart = Cart.objects.with_totals().get(pk=self.cart.pk)
+        self.assertEqual(cart.total_items, 6)
+        self.assertEqual(cart.total_price, Decimal('70.00'))
+
+        empty = User.objects.create_user(username='empty', email='empty@example.com', password='x12345678')
+        cart = Cart.objects.with_totals().get(pk=Cart.objects.create(user=empty).pk)
+        self.assertEqual((cart.total_items, cart.total_price), (0, Decimal('0')))
+
+    def test_retrieve_query_count_is_constant(self):
+        self._add_lines(1)
+        small, _ = self._count_queries('get', '/api/v1/cart/0/')
+        self._add_lines(9)
+        large, response = self._count_queries('get', '/api/v1/cart/0/')
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 3)
+        self.assertEqual(response.data['total_items'], 20)
+        self.assertEqual(response.data['total_price'], '250.00')
+
+    def test_lines_carry_a_slim_product_summary(self):
+        self._add_lines(1)
+        _, response = self._count_queries('get', '/api/v1/cart/0/')
+        line = response.data['items'][0]
+        self.assertEqual(
+            set(line['product_details']),
+            {'id', 'name', 'slug', 'sku', 'price', 'stock', 'is_active'},
+        )
+        self.assertEqual(line['variant_details']['value'], 'L')
+        self.assertEqual((line['price'], line['subtotal']), ('12.50', '25.00'))
+
+    def test_mutation_endpoints_do_not_grow_with_cart_size(self):
+        self._add_lines(1)
+        item = CartItem.objects.get(cart=self.cart)
+        baseline, _ = self._count_queries('post', '/api/v1/cart/increment_item/', {'item_id': item.id})
+        self._add_lines(9)
+        count, response = self._count_queries('post', '/api/v1/cart/increment_item/', {'item_id': item.id})
+        self.assertEqual(count, baseline)
+        self.assertEqual(len(response.data['items']), 10)
+
+        product = Product.objects.create(
+            name='New', slug='new', description='', category=self.category, sku='NEW', price='1.00', stock=1
+        )
+        count, _ = self._count_queries('post', '/api/v1/cart/add_item/', {'product': product.id})
+        self.assertLessEqual(count, 8)
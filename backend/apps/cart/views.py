@@ -4,8 +4,12 @@ from rest_framework.response import Response
 
 from opentelemetry import trace
 
+from apps.products import reservations
+from apps.products.stock import InsufficientStock, StockLine, describe_shortage
+
 from .models import Cart, CartItem
-from .serializers import CartSerializer, CartItemSerializer
+from .serializers import CartBatchSerializer, CartSerializer, StockReservationSerializer
+from .store import CartBatchError, get_cart_store
 
 from utils.otel_utils import add_span_event, record_span_error, set_span_attributes
 from utils.telemetry import api_error_counter, cart_add_counter, cart_remove_counter
@@ -16,16 +20,21 @@ class CartViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Cart.objects.filter(user=self.request.user)
+        return Cart.objects.for_read().filter(user=self.request.user)
     
     def get_object(self):
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+        return self._read_cart(self.request.user)
+
+    def _read_cart(self, user):
+        """Load the user's cart through the read model, creating it if needed."""
+        return get_cart_store().read(user)
+
+    def _cart_response(self, user):
+        return Response(CartSerializer(self._read_cart(user)).data)
     
     @action(detail=False, methods=['post'])
     def add_item(self, request):
         """Add item to cart."""
-        cart, created = Cart.objects.get_or_create(user=request.user)
         product_id = request.data.get('product')
         variant_id = request.data.get('variant')
         try:
@@ -50,16 +59,7 @@ class CartViewSet(viewsets.ModelViewSet):
             }
         )
         
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product_id=product_id,
-            variant_id=variant_id,
-            defaults={'quantity': quantity}
-        )
-        
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
+        get_cart_store().add_item(request.user, product_id, variant_id, quantity)
 
         cart_add_counter.add(
             quantity,
@@ -70,33 +70,27 @@ class CartViewSet(viewsets.ModelViewSet):
         )
         add_span_event("cart.item_added", {"quantity": quantity})
         
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        return self._cart_response(request.user)
     
     @action(detail=False, methods=['post'])
     def remove_item(self, request):
         """Remove item from cart."""
         item_id = request.data.get('item_id')
-        try:
-            cart_item = CartItem.objects.get(id=item_id, cart__user=request.user)
-            removed_quantity = int(cart_item.quantity or 0)
-            cart_item.delete()
-
-            cart_remove_counter.add(
-                max(removed_quantity, 1),
-                {
-                    "endpoint": "cart.remove_item",
-                },
-            )
-            add_span_event("cart.item_removed", {"quantity": removed_quantity})
-            cart = Cart.objects.get(user=request.user)
-            serializer = CartSerializer(cart)
-            return Response(serializer.data)
-        except CartItem.DoesNotExist:
+        removed_quantity = get_cart_store().remove_item(request.user, item_id)
+        if removed_quantity is None:
             api_error_counter.add(1, {"endpoint": "cart.remove_item", "reason": "item_not_found"})
             record_span_error("not_found", "Cart item not found", {"endpoint": "cart.remove_item"})
             return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
 
+        cart_remove_counter.add(
+            max(removed_quantity, 1),
+            {
+                "endpoint": "cart.remove_item",
+            },
+        )
+        add_span_event("cart.item_removed", {"quantity": removed_quantity})
+        return self._cart_response(request.user)
+
     @action(detail=False, methods=['post'])
     def set_quantity(self, request):
         """Set cart item quantity. If quantity is 0, deletes the item."""
@@ -111,60 +105,100 @@ class CartViewSet(viewsets.ModelViewSet):
         if quantity < 0:
             return Response({'error': 'Invalid quantity'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            cart_item = CartItem.objects.get(id=item_id, cart__user=request.user)
-        except CartItem.DoesNotExist:
+        if get_cart_store().set_quantity(request.user, item_id, quantity) is None:
             return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        if quantity == 0:
-            cart_item.delete()
-        else:
-            cart_item.quantity = quantity
-            cart_item.save()
-
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        return self._cart_response(request.user)
 
     @action(detail=False, methods=['post'])
     def increment_item(self, request):
         """Increment cart item quantity by 1."""
         item_id = request.data.get('item_id')
-        try:
-            cart_item = CartItem.objects.get(id=item_id, cart__user=request.user)
-        except CartItem.DoesNotExist:
+        if get_cart_store().change_quantity(request.user, item_id, 1) is None:
             return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        cart_item.quantity += 1
-        cart_item.save()
-
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        return self._cart_response(request.user)
 
     @action(detail=False, methods=['post'])
     def decrement_item(self, request):
         """Decrement cart item quantity by 1. Deletes the item if it reaches 0."""
         item_id = request.data.get('item_id')
-        try:
-            cart_item = CartItem.objects.get(id=item_id, cart__user=request.user)
-        except CartItem.DoesNotExist:
+        if get_cart_store().change_quantity(request.user, item_id, -1) is None:
             return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        cart_item.quantity -= 1
-        if cart_item.quantity <= 0:
-            cart_item.delete()
-        else:
-            cart_item.save()
+        return self._cart_response(request.user)
+    
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Apply several line changes atomically and return one cart snapshot."""
+        serializer = CartBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            api_error_counter.add(1, {"endpoint": "cart.batch", "reason": "invalid_operations"})
+            record_span_error("validation_error", "Invalid operations", {"endpoint": "cart.batch"})
+            return Response(
+                {'error': 'Invalid operations', 'detail': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        operations = serializer.validated_data['operations']
+        set_span_attributes(
+            {
+                "app.operation": "cart.batch",
+                "user.id": request.user.id,
+                "cart.batch.size": len(operations),
+            }
+        )
+        try:
+            added, removed = get_cart_store().apply_batch(request.user, operations)
+        except CartBatchError as exc:
+            api_error_counter.add(1, {"endpoint": "cart.batch", "reason": exc.code})
+            record_span_error("validation_error", exc.message, {"endpoint": "cart.batch", "index": exc.index})
+            response_status = (
+                status.HTTP_404_NOT_FOUND if exc.code == 'item_not_found' else status.HTTP_400_BAD_REQUEST
+            )
+            return Response({'error': exc.message, 'index': exc.index}, status=response_status)
+
+        if added:
+            cart_add_counter.add(added, {"endpoint": "cart.batch"})
+        if removed:
+            cart_remove_counter.add(removed, {"endpoint": "cart.batch"})
+        add_span_event("cart.batch_applied", {"operations": len(operations), "added": added, "removed": removed})
 
+        return self._cart_response(request.user)
+
+    @action(detail=False, methods=['post'])
+    def reserve(self, request):
+        """Hold stock for every line in the cart until the reservation expires."""
+        store = get_cart_store()
+        store.flush(request.user.id)
         cart, _ = Cart.objects.get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
-    
+        lines = [
+            StockLine(item_id, product_id, variant_id, quantity)
+            for item_id, product_id, variant_id, quantity in CartItem.objects.filter(cart=cart).values_list(
+                'id', 'product_id', 'variant_id', 'quantity'
+            )
+        ]
+        if not lines:
+            return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            holds = reservations.reserve(lines, cart=cart)
+        except InsufficientStock as exc:
+            api_error_counter.add(1, {"endpoint": "cart.reserve", "reason": "insufficient_stock"})
+            record_span_error("insufficient_stock", "Insufficient stock", {"endpoint": "cart.reserve"})
+            return Response(
+                {'error': 'Insufficient stock', 'details': [describe_shortage(s) for s in exc.shortages]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        add_span_event("cart.reserved", {"lines": len(holds)})
+        return Response({
+            'expires_at': holds[0].expires_at,
+            'reservations': StockReservationSerializer(holds, many=True).data,
+        })
+
     @action(detail=False, methods=['post'])
     def clear(self, request):
         """Clear all items from cart."""
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        cart.items.all().delete()
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        get_cart_store().clear(request.user)
+        return self._cart_response(request.user)
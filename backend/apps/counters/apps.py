@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class CountersConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.counters'
+    verbose_name = 'Counters'
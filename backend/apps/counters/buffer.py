@@ -0,0 +1,95 @@
+"""
+In-process buffer in front of the sharded counters, for increments that must
+not cost the request a database write (product page views).
+
+``record()`` adds to a per-process dict under a lock and returns. Once
+``COUNTER_FLUSH_INTERVAL`` seconds have passed since the last flush, or
+``COUNTER_FLUSH_SIZE`` distinct counters are pending, the buffered amounts are
+taken out of the dict and handed to ``utils.tasks.enqueue`` as the arguments
+of ``write_counts``, so the write works the same in a Celery worker as in this
+process: one ``shards.increment()`` per counter, however many hits it
+received. Pending increments are also flushed at interpreter exit; a crash
+loses at most one interval's worth, which is acceptable for view counts.
+"""
+import atexit
+import threading
+import time
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+
+from utils.tasks import enqueue
+
+from . import shards
+
+_pending = defaultdict(int)
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _due() -> bool:
+    interval = getattr(settings, 'COUNTER_FLUSH_INTERVAL', 5)
+    size = getattr(settings, 'COUNTER_FLUSH_SIZE', 1000)
+    return time.monotonic() - _last_flush >= interval or len(_pending) >= size
+
+
+def record(model, field: str, amount: int = 1, **lookup) -> None:
+    """Buffer ``amount`` for the counter ``model.field`` of the row matching ``lookup``.
+
+    ``lookup`` is a single unique field, e.g. ``pk=3`` or ``slug='mug'``, so a
+    caller that only knows the slug (a cached detail response) need not query.
+    """
+    (lookup_field, value), = lookup.items()
+    with _lock:
+        _pending[(model._meta.label, field, lookup_field, value)] += amount
+        if not _due():
+            return
+        counts = _take()
+    enqueue(write_counts, counts)
+
+
+def _take() -> list:
+    """Empty the buffer (caller holds ``_lock``): ``[[label, field, lookup_field, value, amount], ...]``."""
+    global _last_flush
+    counts = [[*key, amount] for key, amount in _pending.items()]
+    _pending.clear()
+    _last_flush = time.monotonic()
+    return counts
+
+
+def flush() -> int:
+    """Write the buffered increments to the counter shards now; returns counters written."""
+    with _lock:
+        counts = _take()
+    return write_counts(counts)
+
+
+def write_counts(counts) -> int:
+    """Write increments taken from a buffer by ``_take()``; returns counters written."""
+    grouped = defaultdict(dict)
+    for label, field, lookup_field, value, amount in counts:
+        grouped[(label, field, lookup_field)][value] = amount
+    written = 0
+    for (label, field, lookup_field), amounts in grouped.items():
+        model = apps.get_model(label)
+        if lookup_field == 'pk':
+            pks = {value: value for value in amounts}
+        else:
+            pks = dict(model.objects.filter(**{f'{lookup_field}__in': list(amounts)}).values_list(lookup_field, 'pk'))
+        for value, amount in amounts.items():
+            if value in pks:
+                shards.increment(model, pks[value], field, amount)
+                written += 1
+    return written
+
+
+def _flush_at_exit():
+    if _pending:
+        try:
+            flush()
+        except Exception:
+            pass
+
+
+atexit.register(_flush_at_exit)
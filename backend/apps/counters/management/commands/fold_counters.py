@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.counters.shards import fold
+from apps.products.models import Product
+from apps.reviews.models import Review
+
+# Columns kept through sharded counters.
+COUNTERS = [
+    (Product, 'views_count'),
+    (Review, 'helpful_count'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Move pending counter shard values into their columns (views_count, helpful_count).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Shard rows folded per transaction (default: 1000)')
+
+    def handle(self, *args, **options):
+        for model, field in COUNTERS:
+            moved = fold(model, field, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{model.__name__}.{field}: folded {moved}'))
@@ -0,0 +1,31 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+
+class CounterShard(models.Model):
+    """One of ``COUNTER_SHARDS`` rows holding part of a counter's pending increments.
+
+    A counter is a ``(content_type, object_id, field)`` triple naming an integer
+    column, e.g. ``Product.views_count``. Increments land on a random shard so
+    concurrent writers rarely touch the same row; ``fold_counters`` moves the
+    shard values into the column. The counter's value is the column plus the
+    sum of its shards (see ``apps.counters.shards``).
+    """
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.BigIntegerField()
+    field = models.CharField(max_length=50)
+    shard = models.PositiveSmallIntegerField()
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'counter_shards'
+        verbose_name = 'Counter Shard'
+        verbose_name_plural = 'Counter Shards'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id', 'field', 'shard'], name='counter_shard_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type_id}:{self.object_id}.{self.field}[{self.shard}] = {self.value}"
@@ -0,0 +1,109 @@
+"""
+Sharded counters for hot integer columns (``Product.views_count``,
+``Review.helpful_count``).
+
+Incrementing the column itself makes every writer queue on one row lock.
+``increment()`` instead adds to one of ``COUNTER_SHARDS`` ``CounterShard``
+rows chosen at random, so concurrent writers are spread over N rows. Readers
+get the column plus the shards:
+
+- ``total(obj, field)`` / ``totals(model, field, pks)`` for exact values;
+- ``with_totals(queryset, field)`` annotates ``<field>_total`` for list views.
+
+``fold()`` (``manage.py fold_counters``) periodically moves shard values into
+the column with ``F()`` updates and zeroes the shards, so the column on its own
+is never far behind and shard rows are reused rather than growing.
+"""
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import CounterShard
+
+
+def shard_count() -> int:
+    return max(1, int(getattr(settings, 'COUNTER_SHARDS', 8)))
+
+
+def _shards(model, field):
+    return CounterShard.objects.filter(content_type=ContentType.objects.get_for_model(model), field=field)
+
+
+def increment(model, pk, field: str, amount: int = 1) -> None:
+    """Add ``amount`` to the counter ``model.field`` of row ``pk``."""
+    shard = random.randrange(shard_count())
+    row = _shards(model, field).filter(object_id=pk, shard=shard)
+    if row.update(value=F('value') + amount):
+        return
+    try:
+        with transaction.atomic():
+            CounterShard.objects.create(
+                content_type=ContentType.objects.get_for_model(model),
+                object_id=pk, field=field, shard=shard, value=amount,
+            )
+    except IntegrityError:
+        # Another writer created the shard first.
+        row.update(value=F('value') + amount)
+
+
+def _pending(model, field):
+    """``SUM`` of the shards of the row referenced by ``OuterRef('pk')``."""
+    return Coalesce(
+        Subquery(
+            _shards(model, field).filter(object_id=OuterRef('pk'))
+            .values('object_id').annotate(total=Sum('value')).values('total'),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def with_totals(queryset, *fields):
+    """Annotate each row with ``<field>_total``: the column plus its shards."""
+    return queryset.annotate(**{
+        f'{field}_total': F(field) + _pending(queryset.model, field) for field in fields
+    })
+
+
+def totals(model, field: str, pks) -> dict:
+    """``{pk: counter value}`` for rows of ``model`` (missing rows are absent)."""
+    return dict(
+        with_totals(model.objects.filter(pk__in=list(pks)), field).values_list('pk', f'{field}_total')
+    )
+
+
+def total(obj, field: str) -> int:
+    return totals(type(obj), field, [obj.pk]).get(obj.pk, getattr(obj, field))
+
+
+def fold(model, field: str, batch_size: int = 1000) -> int:
+    """Move shard values of ``model.field`` into the column; returns the amount moved.
+
+    Each batch locks the shards it reads, adds their sums to the column with
+    one ``UPDATE``, and zeroes them, all in one transaction, so increments
+    racing with the fold are neither lost nor counted twice. Column updates go
+    through ``update()``: counters don't touch signals or the catalog cache.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                _shards(model, field).select_for_update().exclude(value=0)
+                .order_by('id').values_list('id', 'object_id', 'value')[:batch_size]
+            )
+            if not rows:
+                return moved
+            sums = defaultdict(int)
+            for _id, object_id, value in rows:
+                sums[object_id] += value
+            model.objects.filter(pk__in=list(sums)).update(**{field: F(field) + Case(
+                *[When(pk=pk, then=Value(amount)) for pk, amount in sums.items()],
+                output_field=IntegerField(),
+            )})
+            CounterShard.objects.filter(pk__in=[row[0] for row in rows]).update(value=0)
+            moved += sum(sums.values())
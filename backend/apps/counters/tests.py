@@ -0,0 +1,103 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.counters import buffer
+from apps.counters.models import CounterShard
+from apps.counters.shards import fold, increment, total, totals
+from apps.products.models import Category, Product
+from apps.reviews.models import Review
+
+
+class ShardedCounterTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Counters', slug='counters')
+        self.product = Product.objects.create(
+            name='Kettle', slug='kettle', description='', category=category, sku='KETTLE', price='20.00',
+            views_count=5,
+        )
+
+    @override_settings(COUNTER_SHARDS=4)
+    def test_increments_spread_over_shards_and_sum_on_read(self):
+        for _ in range(50):
+            increment(Product, self.product.pk, 'views_count')
+        self.assertLessEqual(CounterShard.objects.count(), 4)
+        self.assertGreater(CounterShard.objects.count(), 1)
+        self.assertEqual(total(self.product, 'views_count'), 55)
+        self.assertEqual(totals(Product, 'views_count', [self.product.pk]), {self.product.pk: 55})
+
+    def test_fold_moves_shards_into_the_column(self):
+        increment(Product, self.product.pk, 'views_count', 7)
+        self.assertEqual(fold(Product, 'views_count', batch_size=1), 7)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views_count, 12)
+        self.assertEqual(total(self.product, 'views_count'), 12)
+        self.assertEqual(fold(Product, 'views_count'), 0)
+
+        increment(Product, self.product.pk, 'views_count', 2)
+        call_command('fold_counters', stdout=StringIO())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.views_count, 14)
+
+    def test_product_views_are_buffered_until_flush(self):
+        buffer.flush()
+        client = APIClient()
+        with override_settings(COUNTER_FLUSH_INTERVAL=3600):
+            for _ in range(3):
+                self.assertEqual(client.get('/api/v1/products/kettle/').status_code, 200)
+            with CaptureQueriesContext(connection) as context:
+                client.get('/api/v1/products/kettle/')
+        # The response reads the shards; the view itself writes nothing.
+        self.assertFalse(any(
+            'counter_shards' in q['sql'] and q['sql'].startswith(('UPDATE', 'INSERT'))
+            for q in context.captured_queries
+        ))
+        self.assertEqual(total(self.product, 'views_count'), 5)
+
+        buffer.flush()
+        self.assertEqual(total(self.product, 'views_count'), 9)
+
+    @override_settings(TASK_EXECUTOR='celery', COUNTER_FLUSH_INTERVAL=0)
+    def test_celery_flush_carries_the_buffered_counts(self):
+        buffer.flush()
+        with mock.patch('config.celery.write_counts.delay') as delay:
+            buffer.record(Product, 'views_count', slug='kettle')
+            buffer.record(Product, 'views_count', slug='kettle')
+        self.assertEqual(delay.call_count, 2)
+        self.assertEqual(delay.call_args[0], ([['products.Product', 'views_count', 'slug', 'kettle', 1]],))
+        self.assertEqual(buffer.flush(), 0)
+
+        buffer.write_counts(delay.call_args[0][0])
+        self.assertEqual(total(self.product, 'views_count'), 6)
+
+    def test_review_helpful_votes_are_counted_on_shards(self):
+        user = User.objects.create_user(username='counter', email='counter@example.com', password='password123')
+        review = Review.objects.create(
+            product=self.product, user=user, rating=5, title='Great', comment='Boils', is_approved=True,
+        )
+        client = APIClient()
+        self.assertEqual(client.post(f'/api/v1/reviews/{review.pk}/helpful/').status_code, 401)
+        client.force_authenticate(User.objects.create_user(
+            username='voter', email='voter@example.com', password='password123',
+        ))
+        for expected in (1, 2):
+            response = client.post(f'/api/v1/reviews/{review.pk}/helpful/')
+            self.assertEqual(response.data, {'id': review.pk, 'helpful_count': expected})
+        review.refresh_from_db()
+        self.assertEqual(review.helpful_count, 0)
+        self.assertTrue(CounterShard.objects.filter(object_id=review.pk, field='helpful_count').exists())
+
+        response = client.get(f'/api/v1/reviews/?product={self.product.pk}')
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual(results[0]['helpful_count'], 2)
+
+    def test_product_views_count_includes_shards(self):
+        increment(Product, self.product.pk, 'views_count', 4)
+        response = APIClient().get('/api/v1/products/kettle/')
+        self.assertEqual(response.data['views_count'], 9)
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import IdempotencyKey
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ['scope', 'key', 'user', 'status', 'response_status', 'created_at', 'expires_at']
+    list_filter = ['scope', 'status']
+    search_fields = ['key', 'user__email']
+    raw_id_fields = ['user']
+    readonly_fields = ['fingerprint', 'response_body', 'locked_until', 'created_at']
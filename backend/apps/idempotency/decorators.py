@@ -0,0 +1,181 @@
+"""
+``@idempotent(scope)``: Idempotency-Key support for any POST action.
+
+The key comes from the ``Idempotency-Key`` header (or an ``idempotency_key``
+field in the body) and is scoped to the user and the action. The first request
+claims it by inserting an ``IdempotencyKey`` row; on a 2xx response the body is
+stored and later requests with the same key get it back as ``200`` with an
+``Idempotent-Replayed: true`` header, without running the action or
+serializing anything again. Non-2xx responses and exceptions drop the claim so
+the client can fix the request and retry with the same key.
+
+The claim store is the fast path, not the guarantee. The actions also save
+the key on the row they create (``Order``/``Payment.idempotency_key``, unique
+per user/order), so a retry after the stored response expired, or after a
+claim was taken over past ``IDEMPOTENCY_LOCK_TIMEOUT``, hits that constraint
+and gets the existing object back. The claim is completed in its own
+statement after the action's transaction, and only while this request still
+owns it (same ``locked_until``), so a stale request never overwrites the
+claim of the one that took it over.
+
+A duplicate that arrives while the first request is still running gets
+``409`` straight away; reusing a key for a different request (method, path or
+body) is rejected with ``422``.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from utils.otel_utils import add_span_event
+from utils.telemetry import idempotency_replay_counter
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+BODY_FIELD = 'idempotency_key'
+
+
+def request_key(request):
+    """The request's idempotency key, or ``None``."""
+    return request.headers.get(HEADER) or request.data.get(BODY_FIELD) or None
+
+
+def fingerprint(request) -> str:
+    """SHA-256 of method, path and body (minus the key itself)."""
+    data = request.data
+    if hasattr(data, 'lists'):
+        payload = {k: v[0] if len(v) == 1 else v for k, v in data.lists()}
+    else:
+        payload = dict(data) if isinstance(data, dict) else data
+    if isinstance(payload, dict):
+        payload.pop(BODY_FIELD, None)
+    body = json.dumps(payload, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def _claim(user, scope, key, digest, ttl):
+    """Claim ``key`` for this request.
+
+    Returns ``(claim, None)`` when this request should run the action, or
+    ``(None, existing)`` when another request holds or completed it
+    (``existing`` may be ``None`` if that claim vanished meanwhile).
+    """
+    now = timezone.now()
+    locked_until = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+    expires_at = now + ttl
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user, scope=scope, key=key, fingerprint=digest,
+                locked_until=locked_until, expires_at=expires_at,
+            ), None
+    except IntegrityError:
+        pass
+
+    existing = IdempotencyKey.objects.filter(user=user, scope=scope, key=key).first()
+    if existing is None:
+        return None, None
+    abandoned = existing.status == IdempotencyKey.STATUS_IN_FLIGHT and existing.locked_until <= now
+    if existing.expires_at > now and not abandoned:
+        return None, existing
+
+    # Expired or abandoned: take it over, unless someone else just did.
+    taken = IdempotencyKey.objects.filter(
+        pk=existing.pk, status=existing.status,
+        locked_until=existing.locked_until, expires_at=existing.expires_at,
+    ).update(
+        fingerprint=digest, status=IdempotencyKey.STATUS_IN_FLIGHT,
+        response_status=None, response_body=None,
+        locked_until=locked_until, expires_at=expires_at,
+    )
+    if not taken:
+        return None, None
+    existing.refresh_from_db()
+    return existing, None
+
+
+def _owned(claim):
+    """The claim, while it is still held by the request that made it."""
+    return IdempotencyKey.objects.filter(
+        pk=claim.pk, status=IdempotencyKey.STATUS_IN_FLIGHT, locked_until=claim.locked_until,
+    )
+
+
+def _in_progress():
+    return Response(
+        {'error': 'A request with this Idempotency-Key is still in progress'},
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
+def _replay(scope, claim):
+    try:
+        idempotency_replay_counter.add(1, {'scope': scope})
+    except Exception:
+        pass
+    add_span_event('idempotency.replayed', {'scope': scope, 'status_code': claim.response_status})
+    response = Response(claim.response_body, status=status.HTTP_200_OK)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(scope, ttl=None):
+    """Make a DRF view method honour ``Idempotency-Key`` (see module docstring).
+
+    ``scope`` names the action (e.g. ``'orders.create_from_cart'``); keys are
+    unique per user and scope. ``ttl`` (seconds) defaults to
+    ``IDEMPOTENCY_KEY_TTL``. Requests without a key, or from anonymous users,
+    run the action as usual.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            key = request_key(request)
+            if not key or not request.user.is_authenticated:
+                return view(self, request, *args, **kwargs)
+            key = str(key)
+            if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+                return Response(
+                    {'error': 'Invalid Idempotency-Key', 'detail': 'must be at most 255 characters'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            digest = fingerprint(request)
+            lifetime = timedelta(seconds=ttl if ttl is not None else settings.IDEMPOTENCY_KEY_TTL)
+            claim, existing = _claim(request.user, scope, key, digest, lifetime)
+            if claim is None:
+                if existing is not None and existing.fingerprint != digest:
+                    return Response(
+                        {'error': 'Idempotency-Key was already used for a different request'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                if existing is not None and existing.status == IdempotencyKey.STATUS_COMPLETED:
+                    return _replay(scope, existing)
+                return _in_progress()
+
+            try:
+                response = view(self, request, *args, **kwargs)
+            except BaseException:
+                _owned(claim).delete()
+                raise
+            if status.is_success(response.status_code):
+                # One statement, outside the action's transaction: the row locks
+                # it took (stock) are already released.
+                _owned(claim).update(
+                    status=IdempotencyKey.STATUS_COMPLETED,
+                    response_status=response.status_code,
+                    response_body=getattr(response, 'data', None),
+                )
+            else:
+                _owned(claim).delete()
+            return response
+        return wrapper
+    return decorator
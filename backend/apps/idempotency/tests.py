@@ -0,0 +1,112 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.accounts.models import User
+from apps.idempotency.decorators import fingerprint, idempotent
+from apps.idempotency.models import IdempotencyKey
+
+
+def _drf(request):
+    return Request(request, parsers=[JSONParser()])
+
+
+class EchoViewSet(viewsets.ViewSet):
+    calls = 0
+
+    @idempotent('tests.echo')
+    def create(self, request):
+        EchoViewSet.calls += 1
+        if request.data.get('taken_over'):
+            # Another request took the claim over after IDEMPOTENCY_LOCK_TIMEOUT.
+            IdempotencyKey.objects.update(locked_until=timezone.now() + timedelta(seconds=60))
+        if request.data.get('fail'):
+            return Response({'error': 'nope'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'call': EchoViewSet.calls, 'amount': request.data.get('amount')}, status=status.HTTP_201_CREATED)
+
+
+class IdempotentDecoratorTests(TestCase):
+    def setUp(self):
+        EchoViewSet.calls = 0
+        self.factory = APIRequestFactory()
+        self.view = EchoViewSet.as_view({'post': 'create'})
+        self.user = User.objects.create_user(username='idem', email='idem@example.com', password='password123')
+
+    def _post(self, data, key='key-1', user=None):
+        request = self.factory.post('/echo/', data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        force_authenticate(request, user=user or self.user)
+        return self.view(request)
+
+    def test_replays_stored_response_without_running_the_action(self):
+        first = self._post({'amount': '5.00'})
+        second = self._post({'amount': '5.00'})
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((second.status_code, second.data), (200, {'call': 1, 'amount': '5.00'}))
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(EchoViewSet.calls, 1)
+
+        other = User.objects.create_user(username='idem2', email='idem2@example.com', password='password123')
+        self.assertEqual(self._post({'amount': '5.00'}, user=other).status_code, 201)
+
+    def test_key_reused_for_a_different_request_is_rejected(self):
+        self._post({'amount': '5.00'})
+        response = self._post({'amount': '6.00'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(EchoViewSet.calls, 1)
+
+    def test_fingerprint_ignores_where_the_key_was_sent(self):
+        with_field = self.factory.post('/echo/', {'amount': '1', 'idempotency_key': 'k'}, format='json')
+        without = self.factory.post('/echo/', {'amount': '1'}, format='json', HTTP_IDEMPOTENCY_KEY='k')
+        self.assertEqual(
+            fingerprint(_drf(with_field)),
+            fingerprint(_drf(without)),
+        )
+
+    def test_failed_response_releases_the_key(self):
+        self.assertEqual(self._post({'fail': True}).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self._post({'fail': True}).status_code, 400)
+        self.assertEqual(EchoViewSet.calls, 2)
+
+    def test_concurrent_duplicate_is_refused_while_the_first_runs(self):
+        now = timezone.now()
+        request = self.factory.post('/echo/', {'amount': '5.00'}, format='json')
+        IdempotencyKey.objects.create(
+            user=self.user, scope='tests.echo', key='key-1', fingerprint=fingerprint(_drf(request)),
+            locked_until=now + timedelta(seconds=30), expires_at=now + timedelta(hours=1),
+        )
+        self.assertEqual(self._post({'amount': '5.00'}).status_code, 409)
+        self.assertEqual(EchoViewSet.calls, 0)
+
+    def test_stale_request_leaves_a_taken_over_claim_alone(self):
+        self.assertEqual(self._post({'taken_over': True}).status_code, 201)
+        claim = IdempotencyKey.objects.get()
+        self.assertEqual((claim.status, claim.response_body), (IdempotencyKey.STATUS_IN_FLIGHT, None))
+
+    def test_expired_and_abandoned_claims_are_taken_over(self):
+        self._post({'amount': '5.00'})
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self._post({'amount': '7.00'}).data['call'], 2)
+
+        IdempotencyKey.objects.update(
+            status=IdempotencyKey.STATUS_IN_FLIGHT, locked_until=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(self._post({'amount': '7.00'}).data['call'], 3)
+        self.assertEqual(IdempotencyKey.objects.get().status, IdempotencyKey.STATUS_COMPLETED)
+
+    def test_purge_deletes_expired_keys(self):
+        self._post({'amount': '1'}, key='old')
+        self._post({'amount': '1'}, key='new')
+        IdempotencyKey.objects.filter(key='old').update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('purge_idempotency_keys', '--batch-size', '1', stdout=out)
+        self.assertIn('Deleted 1', out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
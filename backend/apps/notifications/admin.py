@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, NotificationArchive
 
 
 @admin.register(Notification)
@@ -7,3 +7,18 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ['user', 'notification_type', 'title', 'is_read', 'created_at']
     list_filter = ['notification_type', 'is_read', 'created_at']
     search_fields = ['user__email', 'title', 'message']
+
+
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    """Read-only: rows are moved here by ``archive_notifications``."""
+    list_display = ['user', 'notification_type', 'title', 'created_at', 'archived_at']
+    list_filter = ['notification_type']
+    search_fields = ['user__email', 'title']
+    raw_id_fields = ['user']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
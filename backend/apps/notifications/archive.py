@@ -0,0 +1,65 @@
+"""
+Retention for ``notifications``: read notifications older than
+``NOTIFICATION_RETENTION_DAYS`` move to ``notifications_archive``.
+
+The hot table then holds unread and recent notifications only, so the
+per-user indexes the list and badge queries use stay small enough to remain
+in memory. ``archive_batch()`` moves the oldest ``batch_size`` eligible rows
+(found through the partial ``notifications_read_created_idx``) with one
+``INSERT ... SELECT`` and one ``DELETE`` in a short transaction, so a large
+backlog is worked off without long locks; ``manage.py archive_notifications``
+runs batches until none are left. Only read notifications move, so cached
+unread counts are unaffected.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationArchive
+
+
+def retention_cutoff(days=None):
+    days = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90) if days is None else days
+    return timezone.now() - timedelta(days=days)
+
+
+def eligible(cutoff):
+    return Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size=1000) -> int:
+    """Move up to ``batch_size`` of the oldest eligible notifications; returns how many."""
+    connection = connections[router.db_for_write(Notification)]
+    with transaction.atomic(using=connection.alias):
+        ids = list(eligible(cutoff).order_by('created_at').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return 0
+        quote = connection.ops.quote_name
+        columns = [field.column for field in Notification._meta.concrete_fields]
+        placeholders = ', '.join(['%s'] * len(ids))
+        archived_at = NotificationArchive._meta.get_field('archived_at').get_db_prep_save(
+            timezone.now(), connection,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {archive} ({columns}, {archived_at}) SELECT {columns}, %s FROM {table} '
+                'WHERE {pk} IN ({ids})'.format(
+                    archive=quote(NotificationArchive._meta.db_table),
+                    columns=', '.join(quote(column) for column in columns),
+                    archived_at=quote('archived_at'),
+                    table=quote(Notification._meta.db_table),
+                    pk=quote(Notification._meta.pk.column),
+                    ids=placeholders,
+                ),
+                [archived_at, *ids],
+            )
+            cursor.execute(
+                'DELETE FROM {table} WHERE {pk} IN ({ids})'.format(
+                    table=quote(Notification._meta.db_table), pk=quote(Notification._meta.pk.column),
+                    ids=placeholders,
+                ),
+                ids,
+            )
+    return len(ids)
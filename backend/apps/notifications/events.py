@@ -0,0 +1,78 @@
+"""
+Events pushed to a user's live stream (``apps.notifications.stream``).
+
+Every user has one pub/sub channel. Two kinds of event go on it, each
+published once the writing transaction commits:
+
+- ``notification``: a new ``Notification`` row (fan-out rows have no id);
+- ``order_status``: a new ``OrderStatusHistory`` row on one of their orders.
+"""
+import logging
+
+from django.db import transaction
+
+from utils import pubsub
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION = 'notification'
+ORDER_STATUS = 'order_status'
+
+
+def user_channel(user_id) -> str:
+    return f'events:user:{user_id}'
+
+
+def notification_payload(notification) -> dict:
+    return {
+        'id': notification.pk,
+        'notification_type': notification.notification_type,
+        'title': notification.title,
+        'message': notification.message,
+        'url': notification.url,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+
+def order_status_payload(history, order) -> dict:
+    return {
+        'id': history.pk,
+        'order_id': order.pk,
+        'order_number': order.order_number,
+        'status': history.status,
+        'notes': history.notes,
+        'created_at': history.created_at.isoformat() if history.created_at else None,
+    }
+
+
+def _publish(messages):
+    try:
+        pubsub.publish_many(messages)
+    except Exception:
+        # Live updates are best effort; the data is already committed.
+        logger.warning('Could not publish %s stream events', len(messages), exc_info=True)
+
+
+def publish_on_commit(messages) -> None:
+    """Publish ``[(user_id, event, data)]`` after the current transaction commits."""
+    messages = [(user_channel(user_id), event, data) for user_id, event, data in messages]
+    if messages:
+        transaction.on_commit(lambda: _publish(messages))
+
+
+def notification_created(notification) -> None:
+    publish_on_commit([(notification.user_id, NOTIFICATION, notification_payload(notification))])
+
+
+def notifications_fanned_out(user_ids, values) -> None:
+    """Rows written by ``fanout._bulk_insert``: one event per recipient, same content."""
+    data = dict(values, id=None)
+    publish_on_commit([(user_id, NOTIFICATION, data) for user_id in user_ids])
+
+
+def order_status_changed(entries) -> None:
+    """``entries``: ``[(history, order)]`` for new status history rows."""
+    publish_on_commit([
+        (order.user_id, ORDER_STATUS, order_status_payload(history, order)) for history, order in entries
+    ])
@@ -0,0 +1,134 @@
+"""
+Notification fan-out to everyone who wishlisted a product.
+
+A restock or price drop on a popular product means one ``Notification`` per
+wishlisting user. ``notify_wishlisters()`` produces them off the request path:
+
+- saving a product queues it with ``utils.tasks.enqueue`` once the
+  transaction commits (a Celery worker, the in-process pool, or inline in
+  tests, per ``TASK_EXECUTOR``);
+- the task walks the product's ``WishlistItem`` rows joined to ``Wishlist``
+  in keyset chunks of ``NOTIFICATION_FANOUT_CHUNK`` (``product_id, id`` index,
+  so each chunk is an index range scan, not a re-sort of all recipients);
+- each chunk of recipients is one bulk insert (``_bulk_insert``), in its
+  own transaction, so a large fan-out never holds one long write transaction;
+  when it commits, the recipients' cached unread counts are dropped and the
+  notification is pushed to their live streams.
+
+``manage.py bench_notification_fanout`` measures it at 100k recipients.
+"""
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from apps.products.models import Product
+from apps.wishlist.models import WishlistItem
+from utils.tasks import enqueue
+
+from . import events, unread
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_RESTOCKED = 'product_restocked'
+PRICE_DROP = 'price_drop'
+
+
+def fanout_chunk_size() -> int:
+    return max(1, int(getattr(settings, 'NOTIFICATION_FANOUT_CHUNK', 1000)))
+
+
+def _content(product, notification_type, previous_price=None):
+    if notification_type == PRICE_DROP:
+        message = f"{product.name} from your wishlist is now ${product.price}"
+        if previous_price is not None:
+            message += f" (was ${previous_price})"
+        return f"Price drop: {product.name}", message + '.'
+    return f"{product.name} is back in stock", f"{product.name} from your wishlist is available again."
+
+
+def recipients(product_id, after_id=0, limit=None):
+    """``[(wishlist item id, user id)]`` for the product's wishlisters, by item id (one join)."""
+    rows = WishlistItem.objects.filter(product_id=product_id, id__gt=after_id).order_by('id').values_list(
+        'id', 'wishlist__user_id',
+    )
+    return list(rows[:limit] if limit else rows)
+
+
+def _bulk_insert(user_ids, values) -> None:
+    """Insert one notification per user: ``bulk_create`` without building model instances.
+
+    Only ``user_id`` differs between rows, so every other column is prepared
+    for the database once and the rows go through one parameterized
+    ``INSERT`` with ``executemany``. (``bulk_create`` spends most of a large
+    fan-out compiling per-value SQL, not in the database.)
+    """
+    connection = connections[router.db_for_write(Notification)]
+    now = timezone.now()
+    fields = [Notification._meta.get_field(name) for name in values] + [
+        Notification._meta.get_field('created_at'), Notification._meta.get_field('updated_at'),
+    ]
+    constants = [
+        field.get_db_prep_save(value, connection)
+        for field, value in zip(fields, list(values.values()) + [now, now])
+    ]
+    quote = connection.ops.quote_name
+    user_field = Notification._meta.get_field('user')
+    columns = [user_field.column] + [field.column for field in fields]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(Notification._meta.db_table),
+        ', '.join(quote(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [[user_id] + constants for user_id in user_ids])
+
+
+def notify_wishlisters(product_id, notification_type, previous_price=None, chunk_size=None) -> int:
+    """Create ``notification_type`` notifications for every wishlister; returns how many."""
+    product = Product.objects.filter(pk=product_id, is_active=True).only('id', 'name', 'slug', 'price').first()
+    if product is None:
+        return 0
+    title, message = _content(product, notification_type, previous_price)
+    url = f"/products/{product.slug}"
+    chunk_size = chunk_size or fanout_chunk_size()
+
+    created = 0
+    last_id = 0
+    while True:
+        chunk = recipients(product_id, after_id=last_id, limit=chunk_size)
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        user_ids = [user_id for _item_id, user_id in chunk]
+        values = {
+            'notification_type': notification_type, 'title': title, 'message': message,
+            'url': url, 'is_read': False,
+        }
+        with transaction.atomic():
+            _bulk_insert(user_ids, values)
+            unread.invalidate(user_ids)
+            events.notifications_fanned_out(user_ids, values)
+        created += len(chunk)
+    logger.info('Sent %s %s notifications for product %s', created, notification_type, product_id)
+    return created
+
+
+def queue_product_notifications(before, product) -> None:
+    """After a product save: queue restock / price-drop fan-outs for the change from ``before``.
+
+    ``before`` is the stored ``price``/``stock`` of the product (a dict).
+    """
+    if not product.is_active or not before:
+        return
+    before_price, before_stock = before['price'], before['stock']
+    queued = []
+    if before_stock <= 0 < int(product.stock):
+        queued.append((product.pk, PRODUCT_RESTOCKED))
+    if Decimal(str(product.price)) < before_price:
+        queued.append((product.pk, PRICE_DROP, str(before_price)))
+    for args in queued:
+        transaction.on_commit(lambda args=args: enqueue(notify_wishlisters, *args))
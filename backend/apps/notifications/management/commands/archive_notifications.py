@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.notifications.archive import archive_batch, eligible, retention_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        'Move read notifications older than --days into notifications_archive, '
+        'in batches of --batch-size rows, each in its own short transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive read notifications older than this (default: NOTIFICATION_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows moved per transaction (default: 1000)')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to sleep between batches, to leave room for other writers')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would move')
+
+    def handle(self, *args, **options):
+        cutoff = retention_cutoff(options['days'])
+        pending = eligible(cutoff).count()
+        self.stdout.write(f'{pending} read notifications created before {cutoff:%Y-%m-%d %H:%M} to archive')
+        if options['dry_run'] or not pending:
+            return
+
+        total = batches = 0
+        start = time.monotonic()
+        while options['max_batches'] is None or batches < options['max_batches']:
+            moved = archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            total += moved
+            batches += 1
+            elapsed = time.monotonic() - start
+            self.stdout.write(
+                f'Archived {total}/{pending} ({100 * total / pending:.1f}%) '
+                f'in {elapsed:.1f}s, {total / elapsed if elapsed else 0:.0f} rows/s'
+            )
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} notifications in {batches} batches'))
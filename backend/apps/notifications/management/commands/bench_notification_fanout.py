@@ -0,0 +1,105 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.accounts.models import User
+from apps.notifications.fanout import PRODUCT_RESTOCKED, _content, notify_wishlisters
+from apps.notifications.models import Notification
+from apps.products.models import Category, Product
+from apps.wishlist.models import Wishlist, WishlistItem
+from utils.benchmark import Rollback
+
+
+class _Discard(Exception):
+    """Rolls back one fan-out so every run inserts into the same table."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Fan a restock notification out to --recipients wishlisters with several '
+        'chunk sizes, against plain bulk_create and a row-at-a-time baseline on a '
+        'sample. Seeded rows are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=100_000)
+        parser.add_argument('--chunks', default='100,1000,5000', help='Comma-separated chunk sizes')
+        parser.add_argument('--baseline-sample', type=int, default=2000,
+                            help='Recipients notified one create() at a time for comparison')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, count):
+        category = Category.objects.create(name='Bench fanout', slug='bench-fanout')
+        product = Product.objects.create(
+            name='Bench fanout', slug='bench-fanout', description='', category=category,
+            sku='BENCH-FANOUT', price='10.00', stock=0,
+        )
+        User.objects.bulk_create(
+            (User(username=f'bench-fanout-{i}', email=f'bench-fanout-{i}@example.com', password='!')
+             for i in range(count)),
+            batch_size=5000,
+        )
+        user_ids = User.objects.filter(username__startswith='bench-fanout-').values_list('id', flat=True)
+        Wishlist.objects.bulk_create((Wishlist(user_id=user_id) for user_id in user_ids), batch_size=5000)
+        wishlist_ids = Wishlist.objects.filter(user__username__startswith='bench-fanout-').values_list('id', flat=True)
+        WishlistItem.objects.bulk_create(
+            (WishlistItem(wishlist_id=wishlist_id, product=product) for wishlist_id in wishlist_ids),
+            batch_size=5000,
+        )
+        return product
+
+    def _timed(self, fn):
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                created = fn()
+                elapsed = time.perf_counter() - start
+                raise _Discard
+        except _Discard:
+            pass
+        return created, elapsed
+
+    def _baseline(self, product, sample):
+        title, message = _content(product, PRODUCT_RESTOCKED)
+        users = WishlistItem.objects.filter(product=product).order_by('id').values_list(
+            'wishlist__user_id', flat=True,
+        )[:sample]
+        for user_id in users:
+            Notification.objects.create(user_id=user_id, notification_type=PRODUCT_RESTOCKED,
+                                        title=title, message=message)
+        return len(users)
+
+    def _bulk_create(self, product, chunk):
+        title, message = _content(product, PRODUCT_RESTOCKED)
+        users = list(WishlistItem.objects.filter(product=product).values_list('wishlist__user_id', flat=True))
+        Notification.objects.bulk_create(
+            (Notification(user_id=user_id, notification_type=PRODUCT_RESTOCKED, title=title, message=message)
+             for user_id in users),
+            batch_size=chunk,
+        )
+        return len(users)
+
+    def _run(self, options):
+        start = time.perf_counter()
+        product = self._seed(options['recipients'])
+        self.stdout.write(f"Seeded {options['recipients']} wishlisters in {time.perf_counter() - start:.1f}s")
+        self.stdout.write(f"{'mode':<18} {'notified':>10} {'seconds':>9} {'rows/s':>10}")
+
+        if options['baseline_sample']:
+            created, elapsed = self._timed(lambda: self._baseline(product, options['baseline_sample']))
+            self.stdout.write(f"{'create() per row':<18} {created:>10} {elapsed:>9.2f} {created / elapsed:>10.0f}")
+        created, elapsed = self._timed(lambda: self._bulk_create(product, 1000))
+        self.stdout.write(f"{'bulk_create 1000':<18} {created:>10} {elapsed:>9.2f} {created / elapsed:>10.0f}")
+        for chunk in [int(c) for c in options['chunks'].split(',') if c.strip()]:
+            created, elapsed = self._timed(
+                lambda: notify_wishlisters(product.pk, PRODUCT_RESTOCKED, chunk_size=chunk)
+            )
+            self.stdout.write(f"{f'chunk {chunk}':<18} {created:>10} {elapsed:>9.2f} {created / elapsed:>10.0f}")
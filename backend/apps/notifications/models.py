@@ -27,6 +27,42 @@ class Notification(TimeStampedModel):
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of a user's notifications.
+            models.Index(fields=['user', '-created_at', '-id'], name='notifications_user_created_idx'),
+            # Recounting a user's unread badge (apps.notifications.unread).
+            models.Index(fields=['user', 'is_read'], name='notifications_user_unread_idx'),
+            # archive_notifications: oldest read notifications first.
+            models.Index(fields=['created_at'], condition=models.Q(is_read=True),
+                         name='notifications_read_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.title}"
+
+
+class NotificationArchive(models.Model):
+    """Read notification moved out of ``notifications`` by ``archive_notifications``."""
+    id = models.BigIntegerField(primary_key=True)  # the notification's original id
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                             related_name='archived_notifications')
+    notification_type = models.CharField(max_length=50, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    is_read = models.BooleanField(default=True)
+    url = models.URLField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'notifications_archive'
+        verbose_name = 'Archived Notification'
+        verbose_name_plural = 'Archived Notifications'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='notifications_archive_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.title}"
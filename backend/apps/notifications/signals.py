@@ -0,0 +1,49 @@
+"""
+Signal handlers for the notifications app.
+
+Connected in ``NotificationsConfig.ready()``.
+"""
+from django.db.models.signals import post_delete, post_save
+
+from apps.orders.models import OrderStatusHistory
+from apps.products.models import Product
+
+from . import events, unread
+from .fanout import queue_product_notifications
+from .models import Notification
+
+
+def notify_on_product_change(sender, instance, created=False, raw=False, **kwargs):
+    # The stored row was captured by the products app's pre_save receiver.
+    before = getattr(instance, '_stored_state', None)
+    if raw or created or not before:
+        return
+    queue_product_notifications(before, instance)
+
+
+def count_notification(sender, instance, created=False, raw=False, **kwargs):
+    """post_save: keep the user's cached unread count in step."""
+    if raw:
+        return
+    if created:
+        if not instance.is_read:
+            unread.increment(instance.user_id)
+        events.notification_created(instance)
+    else:
+        unread.invalidate([instance.user_id])
+
+
+def uncount_notification(sender, instance, **kwargs):
+    unread.invalidate([instance.user_id])
+
+
+def publish_order_status(sender, instance, created=False, raw=False, **kwargs):
+    """post_save: push a new status history row to the order owner's stream."""
+    if created and not raw:
+        events.order_status_changed([(instance, instance.order)])
+
+
+post_save.connect(notify_on_product_change, sender=Product, dispatch_uid='notifications_product_save')
+post_save.connect(count_notification, sender=Notification, dispatch_uid='notifications_unread_save')
+post_delete.connect(uncount_notification, sender=Notification, dispatch_uid='notifications_unread_delete')
+post_save.connect(publish_order_status, sender=OrderStatusHistory, dispatch_uid='notifications_order_status_event')
@@ -0,0 +1,184 @@
+"""
+Server-Sent Events stream of a user's notifications and order status changes.
+
+``GET /api/v1/events/stream/`` is served by ``EventStreamApp``, a plain ASGI
+application mounted in ``config/asgi.py`` in front of Django: a stream is a
+long-lived response, and a Django view would hold a worker thread for each
+one. Under WSGI the path is not routed.
+
+- Authentication is the API token as an ``Authorization: Token <key>``
+  header or, for ``EventSource`` (which cannot send headers), a single-use
+  ``?ticket=`` from ``apps.notifications.tickets``. The API token itself is
+  never accepted in the URL.
+- Events come from the user's channel on the process ``Broker``
+  (``utils.pubsub``); see ``apps.notifications.events`` for what is sent.
+- A comment line is sent every ``SSE_HEARTBEAT_INTERVAL`` seconds, so
+  proxies keep the connection open and dead clients are noticed.
+- Each worker process serves at most ``SSE_MAX_CONNECTIONS`` streams;
+  beyond that the client gets ``503`` with ``Retry-After``, and the
+  ``retry`` field tells ``EventSource`` how long to wait before reconnecting.
+
+Events are not replayed after a reconnect; clients refetch the notification
+list and their orders when the stream opens.
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from utils.pubsub import get_broker
+
+from . import tickets
+from .events import user_channel
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = '/api/v1/events/stream/'
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key.decode('latin1').lower() == name:
+            return value.decode('latin1')
+    return None
+
+
+def _credentials(scope):
+    """``(API token, stream ticket)`` from the request; either may be ``None``."""
+    authorization = _header(scope, 'authorization') or ''
+    keyword, _, key = authorization.partition(' ')
+    if keyword.lower() == 'token' and key.strip():
+        return key.strip(), None
+    tickets = parse_qs(scope.get('query_string', b'').decode('latin1')).get('ticket')
+    return None, tickets[0] if tickets else None
+
+
+@sync_to_async
+def _authenticate(key=None, ticket=None):
+    """The active user owning API token ``key``, or redeeming ``ticket``; else ``None``."""
+    from django.contrib.auth import get_user_model
+    from rest_framework.authtoken.models import Token
+
+    close_old_connections()
+    try:
+        if key is not None:
+            user = Token.objects.select_related('user').get(key=key).user
+        else:
+            user_id = tickets.redeem(ticket)
+            if user_id is None:
+                return None
+            user = get_user_model().objects.get(pk=user_id)
+    except (Token.DoesNotExist, get_user_model().DoesNotExist):
+        return None
+    finally:
+        close_old_connections()
+    return user if user.is_active else None
+
+
+def format_event(event, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n".encode()
+
+
+class EventStreamApp:
+    """ASGI app for ``STREAM_PATH``; every other request goes to ``django_app``."""
+
+    def __init__(self, django_app, broker=None):
+        self.django_app = django_app
+        self.broker = broker
+        self.open_streams = 0
+
+    def _broker(self):
+        return self.broker or get_broker()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != STREAM_PATH:
+            return await self.django_app(scope, receive, send)
+        if scope['method'] != 'GET':
+            return await self._reject(send, 405, 'Method not allowed.', [(b'allow', b'GET')])
+
+        key, ticket = _credentials(scope)
+        if key is None and ticket is None:
+            return await self._reject(send, 401, 'Authentication credentials were not provided or are invalid.')
+
+        # Refuse before authenticating, so a refused client's ticket is not spent.
+        limit = int(getattr(settings, 'SSE_MAX_CONNECTIONS', 500))
+        if self.open_streams >= limit:
+            retry = int(getattr(settings, 'SSE_RETRY_AFTER', 10))
+            logger.warning('Event stream refused: %s streams open', self.open_streams)
+            return await self._reject(send, 503, 'Too many open event streams.',
+                                      [(b'retry-after', str(retry).encode())])
+
+        user = await _authenticate(key, ticket)
+        if user is None:
+            return await self._reject(send, 401, 'Authentication credentials were not provided or are invalid.')
+
+        self.open_streams += 1
+        try:
+            await self._stream(user, receive, send)
+        finally:
+            self.open_streams -= 1
+
+    async def _reject(self, send, status, detail, headers=()):
+        body = json.dumps({'detail': detail}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()),
+                        *headers],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _stream(self, user, receive, send):
+        heartbeat = float(getattr(settings, 'SSE_HEARTBEAT_INTERVAL', 15))
+        retry_ms = int(getattr(settings, 'SSE_RETRY_AFTER', 10)) * 1000
+        subscription = self._broker().subscribe(user_channel(user.pk))
+        disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+        getter = None
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),  # nginx: don't buffer the stream
+                ],
+            })
+            try:
+                await asyncio.wait_for(subscription.ready.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                pass
+            await send({'type': 'http.response.body', 'body': f"retry: {retry_ms}\n\n".encode(),
+                        'more_body': True})
+
+            while not disconnected.done():
+                getter = asyncio.ensure_future(subscription.get())
+                done, _ = await asyncio.wait({getter, disconnected}, timeout=heartbeat,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    message = getter.result()
+                    chunk = format_event(message['event'], message['data'])
+                else:
+                    getter.cancel()
+                    if disconnected in done:
+                        break
+                    chunk = b': heartbeat\n\n'
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        except OSError:
+            pass  # the client went away mid-write
+        finally:
+            subscription.close()
+            disconnected.cancel()
+            if getter is not None:
+                getter.cancel()
+
+    @staticmethod
+    async def _wait_for_disconnect(receive):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
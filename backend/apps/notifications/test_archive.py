@@ -0,0 +1,55 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.notifications.models import Notification, NotificationArchive
+
+
+class NotificationArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='archive', email='archive@example.com', password='password123')
+        old = timezone.now() - timedelta(days=120)
+        for i in range(5):
+            Notification.objects.create(user=self.user, notification_type='order_shipped',
+                                        title=f'Old read {i}', message='Shipped', is_read=True)
+        Notification.objects.create(user=self.user, notification_type='order_shipped',
+                                    title='Old unread', message='Shipped')
+        Notification.objects.update(created_at=old)
+        Notification.objects.create(user=self.user, notification_type='order_delivered',
+                                    title='Recent read', message='Delivered', is_read=True)
+
+    def _archive(self, *args):
+        out = StringIO()
+        call_command('archive_notifications', *args, stdout=out)
+        return out.getvalue()
+
+    def test_moves_old_read_notifications_in_batches(self):
+        original = Notification.objects.get(title='Old read 0')
+        output = self._archive('--dry-run')
+        self.assertIn('5 read notifications', output)
+        self.assertEqual(NotificationArchive.objects.count(), 0)
+
+        output = self._archive('--batch-size', '2', '--max-batches', '2')
+        self.assertIn('Archived 4/5 (80.0%)', output)
+        self.assertEqual(NotificationArchive.objects.count(), 4)
+
+        output = self._archive('--batch-size', '2')
+        self.assertIn('Archived 1 notifications in 1 batches', output)
+        self.assertEqual(
+            sorted(Notification.objects.values_list('title', flat=True)), ['Old unread', 'Recent read'],
+        )
+        archived = NotificationArchive.objects.get(pk=original.pk)
+        self.assertEqual((archived.user_id, archived.title, archived.created_at, archived.is_read),
+                         (self.user.pk, 'Old read 0', original.created_at, True))
+        self.assertIsNotNone(archived.archived_at)
+
+    def test_days_option_overrides_retention(self):
+        self._archive('--days', '200')
+        self.assertEqual(NotificationArchive.objects.count(), 0)
+        self._archive('--days', '0')
+        self.assertEqual(NotificationArchive.objects.count(), 6)
+        self.assertEqual(list(Notification.objects.values_list('title', flat=True)), ['Old unread'])
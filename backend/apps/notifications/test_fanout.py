@@ -0,0 +1,120 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Address, User
+from apps.cart.models import Cart, CartItem
+from apps.notifications.fanout import PRODUCT_RESTOCKED, notify_wishlisters, recipients
+from apps.notifications.models import Notification
+from apps.products.models import Category, Product
+from apps.orders.models import Order
+from apps.wishlist.models import Wishlist, WishlistItem
+from utils.tasks import enqueue
+
+
+class NotificationFanoutTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Fanout', slug='fanout')
+        self.product = Product.objects.create(
+            name='Blender', slug='blender', description='', category=category, sku='BLENDER',
+            price='50.00', stock=0,
+        )
+        other = Product.objects.create(
+            name='Toaster', slug='toaster', description='', category=category, sku='TOASTER',
+            price='20.00', stock=0,
+        )
+        self.users = []
+        for i in range(5):
+            user = User.objects.create_user(username=f'fan{i}', email=f'fan{i}@example.com', password='password123')
+            wishlist = Wishlist.objects.create(user=user)
+            WishlistItem.objects.create(wishlist=wishlist, product=self.product if i < 4 else other)
+            self.users.append(user)
+
+    def test_every_wishlister_is_notified_in_chunks(self):
+        # product, then per chunk: read + savepoint/insert/release, then the empty read
+        with self.assertNumQueries(1 + 4 * 2 + 1):
+            created = notify_wishlisters(self.product.pk, PRODUCT_RESTOCKED, chunk_size=2)
+        self.assertEqual(created, 4)
+        notifications = Notification.objects.order_by('user_id')
+        self.assertEqual([n.user_id for n in notifications], [u.id for u in self.users[:4]])
+        self.assertEqual(notifications[0].title, 'Blender is back in stock')
+        self.assertEqual(notifications[0].url, '/products/blender')
+        self.assertFalse(notifications[0].is_read)
+        self.assertIsNotNone(notifications[0].created_at)
+
+    def test_restock_and_price_drop_are_queued_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock = 3
+            self.product.price = '45.00'
+            self.product.save()
+        self.assertEqual(
+            sorted(Notification.objects.values_list('notification_type', flat=True).distinct()),
+            ['price_drop', 'product_restocked'],
+        )
+        self.assertEqual(
+            Notification.objects.filter(notification_type='price_drop').first().message,
+            'Blender from your wishlist is now $45.00 (was $50.00).',
+        )
+
+        Notification.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock = 5
+            self.product.price = '60.00'
+            self.product.save()
+        self.assertFalse(Notification.objects.exists())
+
+    @override_settings(TASK_EXECUTOR='celery')
+    def test_celery_executor_sends_registered_tasks_only(self):
+        with mock.patch('config.celery.notify_wishlisters.delay') as delay:
+            enqueue(notify_wishlisters, self.product.pk, PRODUCT_RESTOCKED)
+        delay.assert_called_once_with(self.product.pk, PRODUCT_RESTOCKED)
+        with self.assertRaises(ValueError):
+            enqueue(recipients, self.product.pk)
+
+
+class RestockFanoutTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Restock', slug='restock')
+        self.product = Product.objects.create(
+            name='Kettle', slug='kettle', description='', category=category, sku='KETTLE',
+            price='30.00', stock=1,
+        )
+        self.fans = []
+        for i in range(2):
+            user = User.objects.create_user(username=f'fan{i}', email=f'fan{i}@example.com', password='password123')
+            WishlistItem.objects.create(wishlist=Wishlist.objects.create(user=user), product=self.product)
+            self.fans.append(user)
+        self.buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password='password123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.buyer)
+
+    def _place_order(self):
+        address = Address.objects.create(
+            user=self.buyer, address_type='shipping', full_name='Buyer', phone='1',
+            address_line1='1 St', city='City', state='ST', postal_code='1', country='US',
+        )
+        cart = Cart.objects.create(user=self.buyer)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+        response = self.client.post('/api/v1/orders/create_from_cart/', {
+            'shipping_address': address.id, 'billing_address': address.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Order.objects.get(pk=response.data['id'])
+
+    def test_cancelling_the_order_for_the_last_unit_notifies_wishlisters(self):
+        order = self._place_order()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+        self.assertFalse(Notification.objects.exists())
+
+        # The fan-out is queued from the restock's own on-commit hook.
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(f'/api/v1/orders/{order.id}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(Notification.objects.filter(notification_type=PRODUCT_RESTOCKED).values_list('user_id', flat=True)),
+            [user.id for user in self.fans],
+        )
+        self.assertFalse(Notification.objects.filter(user=self.buyer).exists())
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.notifications import events
+from apps.notifications.models import Notification
+from apps.notifications.stream import STREAM_PATH, EventStreamApp
+from apps.orders.models import Order, OrderStatusHistory
+from utils import pubsub
+from utils.redis_client import get_redis
+
+
+def _scope(path=STREAM_PATH, token=None, method='GET', query_string=b''):
+    headers = [(b'authorization', f'Token {token}'.encode())] if token else []
+    return {'type': 'http', 'method': method, 'path': path, 'query_string': query_string, 'headers': headers}
+
+
+async def _not_found(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 404, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+class StreamEventPublishingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='live', email='live@example.com', password='password123')
+        self.channel = get_redis().pubsub(ignore_subscribe_messages=True)
+        self.channel.subscribe(events.user_channel(self.user.pk))
+        self.addCleanup(self.channel.close)
+
+    def _received(self):
+        messages = []
+        while True:
+            message = self.channel.get_message(timeout=0.01)
+            if message is None:
+                return messages
+            messages.append(json.loads(message['data']))
+
+    def test_notifications_and_status_changes_are_published_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(user=self.user, notification_type='order_confirmed',
+                                        title='Confirmed', message='Thanks')
+            self.assertEqual(self._received(), [])
+        [message] = self._received()
+        self.assertEqual(message['event'], 'notification')
+        self.assertEqual(message['data']['title'], 'Confirmed')
+
+        order = Order.objects.create(user=self.user, subtotal='1.00', total='1.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderStatusHistory.objects.create(order=order, status='pending', notes='Order created')
+        admin = User.objects.create_user(username='live-admin', email='live-admin@example.com',
+                                         password='password123', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/v1/orders/bulk_update_status/', {
+                'updates': [{'id': order.pk, 'status': 'confirmed'}],
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        statuses = [(m['event'], m['data']['status'], m['data']['order_number']) for m in self._received()]
+        self.assertEqual(statuses, [
+            ('order_status', 'pending', order.order_number),
+            ('order_status', 'confirmed', order.order_number),
+        ])
+
+
+@override_settings(SSE_HEARTBEAT_INTERVAL=0.05)
+class EventStreamAppTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sse', email='sse@example.com', password='password123')
+        self.token = Token.objects.create(user=self.user).key
+        self.app = EventStreamApp(_not_found, broker=pubsub.Broker())
+
+    def _call(self, scope, on_send=None):
+        sent = []
+
+        async def run():
+            disconnect = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                if on_send and on_send(message, sent):
+                    disconnect.set()
+            await asyncio.wait_for(self.app(scope, receive, send), 5)
+
+        async_to_sync(run)()
+        return sent
+
+    def test_streams_published_events_and_heartbeats(self):
+        def on_send(message, sent):
+            body = message.get('body', b'')
+            if body.startswith(b'retry:'):
+                pubsub.publish(events.user_channel(self.user.pk), 'notification', {'title': 'Hello'})
+            return body == b': heartbeat\n\n'
+
+        sent = self._call(_scope(token=self.token), on_send)
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        bodies = [message['body'] for message in sent[1:]]
+        self.assertEqual(bodies[:2], [b'retry: 10000\n\n', b'event: notification\ndata: {"title":"Hello"}\n\n'])
+        self.assertEqual(bodies[-1], b': heartbeat\n\n')
+        self.assertEqual(self.app.open_streams, 0)
+        self.assertEqual(self.app.broker.subscriber_count(), 0)
+
+    def test_rejects_anonymous_and_over_capacity_clients(self):
+        self.assertEqual(self._call(_scope())[0]['status'], 401)
+        self.assertEqual(self._call(_scope(token='nope'))[0]['status'], 401)
+        self.assertEqual(self._call(_scope(path='/api/v1/orders/'))[0]['status'], 404)
+        with self.settings(SSE_MAX_CONNECTIONS=0):
+            start = self._call(_scope(token=self.token))[0]
+        self.assertEqual(start['status'], 503)
+        self.assertIn((b'retry-after', b'10'), start['headers'])
+
+    def test_query_string_takes_single_use_tickets_not_api_tokens(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = client.post('/api/v1/notifications/stream_ticket/')
+        self.assertEqual(response.status_code, 200)
+        ticket = f"ticket={response.data['ticket']}".encode()
+
+        def on_send(message, sent):
+            return message.get('body', b'').startswith(b'retry:')
+
+        sent = self._call(_scope(query_string=ticket), on_send)
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(self._call(_scope(query_string=ticket))[0]['status'], 401)
+        self.assertEqual(self._call(_scope(query_string=f'token={self.token}'.encode()))[0]['status'], 401)
@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.notifications import unread
+from apps.notifications.fanout import PRODUCT_RESTOCKED, notify_wishlisters
+from apps.notifications.models import Notification
+from apps.products.models import Category, Product
+from apps.wishlist.models import Wishlist, WishlistItem
+
+
+class UnreadCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='badge', email='badge@example.com', password='password123')
+        self.client.force_authenticate(self.user)
+
+    def _notify(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(
+                user=self.user, notification_type='order_confirmed', title='Order', message='Confirmed', **kwargs,
+            )
+
+    def _count(self):
+        response = self.client.get('/api/v1/notifications/unread_count/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['unread_count']
+
+    def test_counter_follows_create_and_reads(self):
+        first = self._notify()
+        self.assertEqual(self._count(), 1)
+        self._notify()
+        self._notify(is_read=True)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread.unread_count(self.user.pk), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/v1/notifications/{first.pk}/mark_as_read/')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/v1/notifications/{first.pk}/mark_as_read/')
+        self.assertTrue(response.data['is_read'])
+        self.assertEqual(self._count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/v1/notifications/mark_all_as_read/')
+        self.assertEqual(self._count(), 0)
+        self.assertFalse(Notification.objects.filter(user=self.user, is_read=False).exists())
+
+    def test_missing_or_stale_entries_are_recounted(self):
+        self._notify()
+        self.assertEqual(self._count(), 1)
+        Notification.objects.filter(user=self.user).update(is_read=True)  # behind the counter's back
+        self.assertEqual(self._count(), 1)
+        cache.delete(unread.cache_key(self.user.pk))  # what expiry does
+        self.assertEqual(self._count(), 0)
+
+        notification = self._notify()
+        with self.captureOnCommitCallbacks(execute=True):
+            notification.delete()
+        self.assertEqual(self._count(), 0)
+
+    def test_fanout_drops_recipient_counters(self):
+        category = Category.objects.create(name='Badge', slug='badge')
+        product = Product.objects.create(
+            name='Kettle', slug='kettle', description='', category=category, sku='KETTLE', price='25.00', stock=0,
+        )
+        WishlistItem.objects.create(wishlist=Wishlist.objects.create(user=self.user), product=product)
+        self.assertEqual(self._count(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_wishlisters(product.pk, PRODUCT_RESTOCKED)
+        self.assertEqual(self._count(), 1)
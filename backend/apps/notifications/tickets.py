@@ -0,0 +1,40 @@
+"""
+Single-use tickets for opening the event stream.
+
+``EventSource`` cannot send an ``Authorization`` header, and an API token in a
+URL ends up in access logs, proxy logs and browser history, where it stays
+valid until revoked. So the client first asks
+``POST /api/v1/notifications/stream_ticket/`` (token in the header) for a
+ticket, and opens ``/api/v1/events/stream/?ticket=<ticket>`` with it. A
+ticket is good for one stream and for ``SSE_TICKET_TTL`` seconds.
+
+Tickets are kept in Redis (``utils.redis_client``), so any worker can redeem
+one; ``redeem()`` reads and deletes it in one transaction, so it opens at most
+one stream even when two requests race with it.
+"""
+import secrets
+from typing import Optional
+
+from django.conf import settings
+
+from utils.redis_client import get_redis
+
+
+def ticket_key(ticket) -> str:
+    return f'events:ticket:{ticket}'
+
+
+def issue(user_id) -> str:
+    """A new ticket for ``user_id``'s event stream."""
+    ticket = secrets.token_urlsafe(32)
+    get_redis().set(ticket_key(ticket), user_id, ex=getattr(settings, 'SSE_TICKET_TTL', 30))
+    return ticket
+
+
+def redeem(ticket) -> Optional[int]:
+    """The user id ``ticket`` was issued to, or ``None``; the ticket can't be used again."""
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.get(ticket_key(ticket))
+    pipe.delete(ticket_key(ticket))
+    user_id, _ = pipe.execute()
+    return int(user_id) if user_id is not None else None
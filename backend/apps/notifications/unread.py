@@ -0,0 +1,79 @@
+"""
+Per-user unread notification counts for the notification badge.
+
+The count lives in the ``NOTIFICATION_UNREAD_CACHE_ALIAS`` cache, so a badge
+poll is one cache read:
+
+- a notification created unread adds one once its transaction commits;
+- ``mark_as_read`` takes one off only when it actually flipped a row, so a
+  repeated click cannot push the count down twice;
+- ``mark_all_as_read`` sets it to zero;
+- bulk fan-out inserts, admin edits and deletes drop the entry instead.
+
+A missing entry is recounted from the database (an index range scan on
+``notifications_user_unread_idx``) and stored with
+``NOTIFICATION_UNREAD_CACHE_TIMEOUT``. Increments and decrements keep the
+original expiry, so every counter is reconciled against the table at least
+that often, whatever drift a lost update caused.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Notification
+
+
+def _cache():
+    return caches[getattr(settings, 'NOTIFICATION_UNREAD_CACHE_ALIAS', 'default')]
+
+
+def cache_key(user_id) -> str:
+    return f'notifications:unread:{user_id}'
+
+
+def count_from_db(user_id) -> int:
+    return Notification.objects.filter(user_id=user_id, is_read=False).count()
+
+
+def unread_count(user_id) -> int:
+    """The user's unread count, from the cache or recounted on a miss."""
+    cache = _cache()
+    count = cache.get(cache_key(user_id))
+    if count is None:
+        count = count_from_db(user_id)
+        # add(): an increment or reset that landed meanwhile wins.
+        cache.add(cache_key(user_id), count, timeout=getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TIMEOUT', 300))
+        count = cache.get(cache_key(user_id), count)
+    return max(0, int(count))
+
+
+def _adjust(user_id, delta) -> None:
+    cache = _cache()
+    try:
+        count = cache.incr(cache_key(user_id), delta)
+    except ValueError:
+        return  # not cached: the next read counts from the database
+    if count < 0:
+        cache.delete(cache_key(user_id))
+
+
+def increment(user_id, amount=1) -> None:
+    transaction.on_commit(lambda: _adjust(user_id, amount))
+
+
+def decrement(user_id, amount=1) -> None:
+    transaction.on_commit(lambda: _adjust(user_id, -amount))
+
+
+def reset(user_id) -> None:
+    """All of the user's notifications were marked read."""
+    transaction.on_commit(lambda: _cache().set(
+        cache_key(user_id), 0, timeout=getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TIMEOUT', 300),
+    ))
+
+
+def invalidate(user_ids) -> None:
+    """Forget the counts of ``user_ids``; they are recounted on the next read."""
+    keys = [cache_key(user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: _cache().delete_many(keys))
@@ -1,6 +1,9 @@
 from rest_framework import viewsets, permissions, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
+from django.utils import timezone
+from . import tickets, unread
 from .models import Notification
 from .serializers import NotificationSerializer
 
@@ -13,12 +16,29 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user).order_by('-created_at', '-id')
     
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Number of unread notifications, for the badge (served from the cache)."""
+        return Response({'unread_count': unread.unread_count(request.user.pk)})
+
+    @action(detail=False, methods=['post'])
+    def stream_ticket(self, request):
+        """Single-use ticket for opening the event stream with ``EventSource``."""
+        return Response({
+            'ticket': tickets.issue(request.user.pk),
+            'expires_in': settings.SSE_TICKET_TTL,
+        })
+
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
         """Mark notification as read."""
         notification = self.get_object()
+        now = timezone.now()
+        # Conditional update: only the request that flips the row lowers the count.
+        if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True, updated_at=now):
+            unread.decrement(request.user.pk)
+            notification.updated_at = now
         notification.is_read = True
-        notification.save()
         serializer = NotificationSerializer(notification)
         return Response(serializer.data)
     
@@ -26,4 +46,5 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def mark_all_as_read(self, request):
         """Mark all notifications as read."""
         Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        unread.reset(request.user.pk)
         return Response({'status': 'All notifications marked as read'})
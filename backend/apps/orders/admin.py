@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Order, OrderItem, OrderStatusHistory
+from .snapshots import write_snapshot
 
 
 class OrderItemInline(admin.TabularInline):
@@ -39,6 +40,11 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Items and history are edited inline; keep the read model in step.
+        write_snapshot(form.instance)
+
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
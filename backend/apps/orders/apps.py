@@ -5,3 +5,8 @@ class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.orders'
     verbose_name = 'Orders'
+
+    def ready(self):
+        from . import numbers
+        # Fail at startup, not on the first checkout, if the generator is misconfigured.
+        numbers.get_order_number_generator()
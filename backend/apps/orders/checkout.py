@@ -0,0 +1,330 @@
+"""
+Checkout as a pipeline of stages over cart lines materialized once.
+
+``CheckoutService.run()`` goes through:
+
+- ``load``: the cart's selected lines as ``CheckoutLine`` tuples (one query,
+  prices computed in SQL; no model instances).
+- ``validate``: addresses, money fields and line quantities.
+- ``price``: subtotal and server-side total.
+- ``persist``: order, order items, status history and the order snapshot;
+  ordered lines leave the cart.
+- ``stock``: conditional stock decrement, committing the cart's holds.
+
+``persist`` and ``stock`` share one transaction. The order carries the
+request's ``Idempotency-Key``; if the ``(user, idempotency_key)`` constraint
+rejects it, a retry already placed the order and ``AlreadyPlaced`` hands that
+order back instead. Each stage runs in its own
+span (``checkout.<stage>``) and its wall time is kept in ``timings`` (ms), which
+``manage.py bench_checkout`` aggregates.
+
+Failures raise ``CheckoutError`` carrying the response body the API returns.
+"""
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import List, NamedTuple, Optional
+
+from django.db import IntegrityError, transaction
+from rest_framework import status
+
+from apps.accounts.models import Address
+from apps.cart.models import Cart, CartItem, _unit_price
+from apps.products import reservations
+from apps.products.stock import InsufficientStock, StockLine, decrement_stock, describe_shortage
+from utils.decimal_utils import round_currency, validate_money_field
+from utils.logging_utils import log_stock_insufficient
+from utils.tracing import trace_operation
+
+from .models import Order, OrderItem, OrderStatusHistory
+from .snapshots import item_entry, primary_image, write_snapshot
+
+
+class CheckoutLine(NamedTuple):
+    item_id: int
+    product_id: int
+    variant_id: Optional[int]
+    quantity: int
+    unit_price: Decimal
+    # What the order snapshot records about the line at purchase.
+    product_name: str = ''
+    product_slug: str = ''
+    product_sku: str = ''
+    product_image: Optional[str] = None
+    variant_name: Optional[str] = None
+    variant_value: Optional[str] = None
+    variant_sku: Optional[str] = None
+
+    @property
+    def subtotal(self) -> Decimal:
+        return self.unit_price * self.quantity
+
+
+class CheckoutError(Exception):
+    """A checkout that can't proceed; ``body`` is the API error response."""
+
+    def __init__(self, reason, body, status_code=status.HTTP_400_BAD_REQUEST, attrs=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.body = body
+        self.status_code = status_code
+        self.attrs = attrs or {}
+
+
+class StockRejected(CheckoutError):
+    """Lines that can't be fulfilled; ``details`` is the per-line error list."""
+
+    def __init__(self, details):
+        super().__init__('insufficient_stock', {'error': 'Insufficient stock', 'details': details})
+        self.details = details
+
+
+class AlreadyPlaced(Exception):
+    """The order for this idempotency key exists already; ``order`` is it."""
+
+    def __init__(self, order):
+        super().__init__(order.pk)
+        self.order = order
+
+
+def _invalid_fields(field, message):
+    return {'error': 'Invalid checkout fields', 'details': {field: [message]}}
+
+
+class CheckoutService:
+    STAGES = ('load', 'validate', 'price', 'persist', 'stock')
+
+    def __init__(self, user, data, idempotency_key=None):
+        self.user = user
+        self.data = data
+        self.idempotency_key = idempotency_key
+        self.timings = {}
+        self.cart = None
+        self.lines: List[CheckoutLine] = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            with trace_operation(f'checkout.{name}', {'user.id': self.user.id}) as span:
+                yield span
+        finally:
+            self.timings[name] = (time.perf_counter() - start) * 1000.0
+
+    def run(self) -> Order:
+        with self.stage('load'):
+            self.load()
+        with self.stage('validate'):
+            self.validate()
+        with self.stage('price'):
+            self.price()
+        try:
+            with transaction.atomic():
+                with self.stage('persist'):
+                    order = self.persist()
+                with self.stage('stock'):
+                    self.take_stock(order)
+        except IntegrityError:
+            existing = self.existing_order()
+            if existing is None:
+                raise
+            raise AlreadyPlaced(existing)
+        return order
+
+    def existing_order(self) -> Optional[Order]:
+        """The order already placed with this request's idempotency key, if any."""
+        if not self.idempotency_key:
+            return None
+        return Order.objects.filter(user=self.user, idempotency_key=self.idempotency_key).first()
+
+    # -- load ------------------------------------------------------------------
+
+    def _selected_ids(self):
+        item_ids = self.data.get('item_ids', None)
+        if not isinstance(item_ids, list):
+            return None
+        if len(item_ids) == 0:
+            raise CheckoutError('no_items_selected', {'error': 'No items selected'})
+        try:
+            normalized_ids = [int(v) for v in item_ids]
+        except (TypeError, ValueError):
+            raise CheckoutError(
+                'invalid_item_ids',
+                {'error': 'Invalid item_ids', 'detail': 'item_ids must be a list of integers'},
+            )
+        normalized_ids = [i for i in normalized_ids if i > 0]
+        if not normalized_ids:
+            raise CheckoutError('no_items_selected', {'error': 'No items selected'})
+        return normalized_ids
+
+    def load(self):
+        """Resolve the cart and read the selected lines in one query."""
+        try:
+            self.cart = Cart.objects.only('id').get(user=self.user)
+        except Cart.DoesNotExist:
+            raise CheckoutError('cart_not_found', {'error': 'Cart not found'}, status.HTTP_404_NOT_FOUND)
+
+        selected_ids = self._selected_ids()
+        rows = CartItem.objects.filter(cart=self.cart)
+        if selected_ids is not None:
+            rows = rows.filter(id__in=selected_ids)
+        self.lines = [
+            CheckoutLine(*row)
+            for row in rows.annotate(
+                line_price=_unit_price(), image=primary_image()
+            ).order_by('id').values_list(
+                'id', 'product_id', 'variant_id', 'quantity', 'line_price',
+                'product__name', 'product__slug', 'product__sku', 'image',
+                'variant__name', 'variant__value', 'variant__sku',
+            )
+        ]
+
+        if selected_ids is not None:
+            missing_ids = sorted(set(selected_ids) - {line.item_id for line in self.lines})
+            if missing_ids:
+                raise CheckoutError(
+                    'some_items_missing',
+                    {'error': 'Some items not found in cart', 'missing_item_ids': missing_ids},
+                )
+        if not self.lines:
+            raise CheckoutError('cart_empty', {'error': 'Cart is empty'})
+
+    # -- validate ----------------------------------------------------------------
+
+    def _required_int(self, field_name):
+        raw = self.data.get(field_name, None)
+        if raw is None or raw == '':
+            raise ValueError(f"{field_name} is required")
+        try:
+            value = int(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"{field_name} must be an integer")
+        if value <= 0:
+            raise ValueError(f"{field_name} must be a positive integer")
+        return value
+
+    def _money(self, field_name):
+        raw = self.data.get(field_name, 0)
+        if raw is None or raw == '':
+            raw = 0
+        try:
+            return validate_money_field(raw, field_name, allow_zero=True)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"{field_name}: {str(e)}")
+
+    def validate(self):
+        try:
+            self.shipping_address_id = self._required_int('shipping_address')
+            self.billing_address_id = self._required_int('billing_address')
+
+            self.addresses = Address.objects.filter(user=self.user).in_bulk(
+                {self.shipping_address_id, self.billing_address_id}
+            )
+            for field, address_id in (('shipping_address', self.shipping_address_id),
+                                      ('billing_address', self.billing_address_id)):
+                if address_id not in self.addresses:
+                    raise CheckoutError(f'invalid_{field}', _invalid_fields(field, 'Invalid address'))
+
+            self.shipping_cost = self._money('shipping_cost')
+            self.tax = self._money('tax')
+            self.discount = self._money('discount')
+        except ValueError as e:
+            field = str(e).split(' ', 1)[0]
+            raise CheckoutError('invalid_checkout_fields', _invalid_fields(field, str(e)), attrs={'field': field})
+
+        invalid = [
+            {'cart_item_id': line.item_id, 'reason': 'invalid_quantity'}
+            for line in self.lines
+            if int(line.quantity or 0) <= 0
+        ]
+        if invalid:
+            raise StockRejected(invalid)
+
+    # -- price -------------------------------------------------------------------
+
+    def price(self):
+        self.subtotal = sum((line.subtotal for line in self.lines), Decimal('0'))
+        if self.discount > (self.subtotal + self.shipping_cost + self.tax):
+            raise CheckoutError('discount_exceeds_total', {
+                'error': 'Invalid pricing',
+                'details': {'discount': ['discount cannot exceed subtotal + shipping_cost + tax']},
+            })
+        # Compute total server-side with proper rounding (never trust client)
+        self.total = round_currency(self.subtotal + self.shipping_cost + self.tax - self.discount)
+        if self.total < 0:
+            raise CheckoutError('negative_total', {
+                'error': 'Invalid pricing',
+                'details': {'total': ['total cannot be negative']},
+            })
+
+    # -- persist -----------------------------------------------------------------
+
+    def persist(self) -> Order:
+        order = Order.objects.create(
+            user=self.user,
+            shipping_address_id=self.shipping_address_id,
+            billing_address_id=self.billing_address_id,
+            subtotal=self.subtotal,
+            shipping_cost=self.shipping_cost,
+            tax=self.tax,
+            discount=self.discount,
+            total=self.total,
+            notes=self.data.get('notes', ''),
+            idempotency_key=self.idempotency_key,
+        )
+        items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product_id=line.product_id,
+                variant_id=line.variant_id,
+                quantity=line.quantity,
+                price=line.unit_price,
+                subtotal=line.subtotal,
+            )
+            for line in self.lines
+        ])
+        history = OrderStatusHistory.objects.create(order=order, status='pending', notes='Order created')
+
+        item_ids = [item.pk for item in items]
+        if None in item_ids:
+            # Backends that don't return ids from bulk inserts (SQLite).
+            item_ids = list(order.items.order_by('id').values_list('id', flat=True))
+        write_snapshot(order, history=[history], addresses=self.addresses, items=[
+            item_entry(
+                item_id, line.quantity, line.unit_price, line.subtotal,
+                (line.product_id, line.product_name, line.product_slug, line.product_sku, line.product_image),
+                (line.variant_id, line.variant_name, line.variant_value, line.variant_sku)
+                if line.variant_id else None,
+            )
+            for item_id, line in zip(item_ids, self.lines)
+        ])
+        CartItem.objects.filter(id__in=[line.item_id for line in self.lines]).delete()
+        return order
+
+    # -- stock -------------------------------------------------------------------
+
+    def take_stock(self, order):
+        """Decrement stock last so row locks on hot SKUs are held only until commit.
+
+        Stock this cart reserved is usable; other carts' holds are not. A
+        shortfall rolls back the whole transaction.
+        """
+        lines = [StockLine(l.item_id, l.product_id, l.variant_id, int(l.quantity)) for l in self.lines]
+        try:
+            decrement_stock(
+                lines,
+                cart_id=self.cart.id,
+                order_id=order.id,
+            )
+        except InsufficientStock as exc:
+            for shortage in exc.shortages:
+                if shortage.available is not None:
+                    log_stock_insufficient(
+                        user_id=self.user.id,
+                        product_id=shortage.line.product_id,
+                        variant_id=shortage.line.variant_id,
+                        requested=shortage.line.quantity,
+                        available=shortage.available
+                    )
+            raise StockRejected([describe_shortage(shortage) for shortage in exc.shortages])
+        reservations.commit(self.cart, order, lines)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.snapshots import backfill_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Store the read-model snapshot of orders that have none (orders are no longer snapshotted on read).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Orders written per batch (default: 500)')
+
+    def handle(self, *args, **options):
+        written = backfill_snapshots(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote snapshots for {written} orders'))
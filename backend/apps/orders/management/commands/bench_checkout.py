@@ -0,0 +1,100 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.accounts.models import Address, User
+from apps.cart.models import Cart, CartItem
+from apps.orders.checkout import CheckoutService
+from apps.products.models import Category, Product, ProductVariant
+from utils.benchmark import Rollback, percentile
+
+
+class _Discard(Exception):
+    """Rolls back one checkout so every iteration starts from the same cart."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Run CheckoutService against carts of several sizes and report p50/p99 '
+        'per pipeline stage (load, validate, price, persist, stock). '
+        'Seeded rows and created orders are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='1,10,50,100,500',
+            help='Comma-separated cart sizes in lines (default: 1,10,50,100,500)',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        try:
+            with transaction.atomic():
+                self._run(sizes, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, count):
+        category = Category.objects.create(name='Bench checkout', slug='bench-checkout')
+        Product.objects.bulk_create(
+            Product(
+                name=f'Bench checkout {i}', slug=f'bench-checkout-{i}', category=category,
+                sku=f'BENCH-CHECKOUT-{i}', price='9.99', stock=1_000_000,
+            )
+            for i in range(count)
+        )
+        products = list(Product.objects.filter(category=category).order_by('id'))
+        # Every other line is a variant so both stock tables are exercised.
+        ProductVariant.objects.bulk_create(
+            ProductVariant(product=p, name='Size', value='M', sku=f'BENCH-CHECKOUT-{p.pk}-M',
+                           price_adjustment='1.00', stock=1_000_000)
+            for p in products[1::2]
+        )
+        variants = dict(ProductVariant.objects.filter(product__category=category).values_list('product_id', 'id'))
+        user = User.objects.create_user(
+            username='bench-checkout', email='bench-checkout@example.com', password='bench-checkout',
+        )
+        address = Address.objects.create(
+            user=user, address_type='shipping', full_name='Bench', phone='1',
+            address_line1='1 Bench St', city='City', state='ST', postal_code='1', country='US',
+        )
+        cart = Cart.objects.create(user=user)
+        return [(p.pk, variants.get(p.pk)) for p in products], user, address, cart
+
+    def _checkout(self, user, cart, lines, data):
+        try:
+            with transaction.atomic():
+                CartItem.objects.bulk_create(
+                    CartItem(cart=cart, product_id=product_id, variant_id=variant_id, quantity=2)
+                    for product_id, variant_id in lines
+                )
+                service = CheckoutService(user, data)
+                start = time.perf_counter()
+                service.run()
+                total = (time.perf_counter() - start) * 1000.0
+                raise _Discard
+        except _Discard:
+            pass
+        return dict(service.timings, total=total)
+
+    def _run(self, sizes, options):
+        lines, user, address, cart = self._seed(max(sizes))
+        data = {'shipping_address': address.id, 'billing_address': address.id, 'shipping_cost': '5.00'}
+        columns = CheckoutService.STAGES + ('total',)
+
+        self.stdout.write(f"{'lines':>6}  " + '  '.join(f'{c + " p50/p99":>20}' for c in columns))
+        for size in sizes:
+            samples = {column: [] for column in columns}
+            for iteration in range(options['warmup'] + options['repeat']):
+                timings = self._checkout(user, cart, lines[:size], data)
+                if iteration < options['warmup']:
+                    continue
+                for column in columns:
+                    samples[column].append(timings[column])
+            self.stdout.write(f'{size:>6}  ' + '  '.join(
+                f'{percentile(samples[c], 50):9.2f}/{percentile(samples[c], 99):8.2f}ms' for c in columns
+            ))
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.accounts.models import User
+from apps.orders.models import Order
+from apps.orders.numbers import ORDER_NUMBER_GENERATORS, SnowflakeOrderNumbers
+from utils.benchmark import Rollback, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare order number generators: cost per number, and insert throughput '
+        'into an orders table that already holds --existing rows numbered the same '
+        'way. Seeded rows are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--generators', default=','.join(ORDER_NUMBER_GENERATORS),
+            help='Comma-separated generator names (default: all)',
+        )
+        parser.add_argument('--existing', type=int, default=50_000, help='Rows already in the table')
+        parser.add_argument('--rows', type=int, default=20_000, help='Rows inserted and timed')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['generators'].split(',') if name.strip()]
+        self.stdout.write(
+            f"{'generator':<10} {'us/number':>10} {'rows/s':>10} {'batch p50':>10} {'batch p99':>10}"
+        )
+        for name in names:
+            generator = ORDER_NUMBER_GENERATORS[name]
+            # The benchmark only runs in this process, so any node id will do.
+            generate = generator(node_id=0) if generator is SnowflakeOrderNumbers else generator()
+            try:
+                with transaction.atomic():
+                    self._report(name, generate, options)
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def _insert(self, user, generate, count, batch_size):
+        """Insert ``count`` orders in batches; return per-batch wall times (ms)."""
+        samples = []
+        for start in range(0, count, batch_size):
+            batch = [
+                Order(order_number=generate(), user=user, subtotal='10.00', total='10.00')
+                for _ in range(min(batch_size, count - start))
+            ]
+            began = time.perf_counter()
+            Order.objects.bulk_create(batch)
+            samples.append((time.perf_counter() - began) * 1000.0)
+        return samples
+
+    def _report(self, name, generate, options):
+        began = time.perf_counter()
+        for _ in range(10_000):
+            generate()
+        per_number = (time.perf_counter() - began) * 1_000_000 / 10_000
+
+        user = User.objects.create_user(
+            username='bench-order-numbers', email='bench-order-numbers@example.com', password='bench',
+        )
+        self._insert(user, generate, options['existing'], options['batch_size'])
+        samples = self._insert(user, generate, options['rows'], options['batch_size'])
+        rate = options['rows'] / (sum(samples) / 1000.0) if samples else 0.0
+        self.stdout.write(
+            f'{name:<10} {per_number:>10.2f} {rate:>10.0f} '
+            f'{percentile(samples, 50):>8.2f}ms {percentile(samples, 99):>8.2f}ms'
+        )
@@ -1,9 +1,11 @@
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from apps.products.models import Product, ProductVariant
 from apps.accounts.models import Address
 from utils.models import TimeStampedModel
-import uuid
+
+from .numbers import next_order_number
 
 
 class Order(TimeStampedModel):
@@ -37,12 +39,19 @@ class Order(TimeStampedModel):
     notes = models.TextField(blank=True)
     tracking_number = models.CharField(max_length=255, blank=True)
     idempotency_key = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    # Denormalized read model: lines, status history and addresses as served
+    # by the order endpoints (see apps.orders.snapshots).
+    snapshot = models.JSONField(null=True, blank=True, editable=False, encoder=DjangoJSONEncoder)
     
     class Meta:
         db_table = 'orders'
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of a user's orders.
+            models.Index(fields=['user', '-created_at', '-id'], name='orders_user_created_idx'),
+        ]
         # Idempotency key should be unique per user
         unique_together = [['user', 'idempotency_key']]
         constraints = [
@@ -58,7 +67,7 @@ class Order(TimeStampedModel):
     
     def save(self, *args, **kwargs):
         if not self.order_number:
-            self.order_number = f"ORD-{uuid.uuid4().hex[:8].upper()}"
+            self.order_number = next_order_number()
         super().save(*args, **kwargs)
 
 
@@ -95,6 +104,10 @@ class OrderStatusHistory(TimeStampedModel):
         verbose_name = 'Order Status History'
         verbose_name_plural = 'Order Status Histories'
         ordering = ['-created_at']
+        indexes = [
+            # An order's timeline, newest first (snapshots, order detail).
+            models.Index(fields=['order', '-created_at', '-id'], name='order_status_history_order_idx'),
+        ]
     
     def __str__(self):
         return f"{self.order.order_number} - {self.status}"
@@ -0,0 +1,173 @@
+"""
+Order number generators.
+
+``ORDER_NUMBER_GENERATOR`` selects how ``Order.save`` numbers new orders:
+
+- ``'snowflake'`` (default when ``ORDER_NUMBER_NODE_ID`` is set): 41 bits of milliseconds since ``EPOCH_MS``,
+  10 bits of node id and a 12-bit per-millisecond sequence, written as 13
+  Crockford base32 characters. Numbers from one node are strictly increasing
+  and never repeat, and distinct nodes can't collide, so no database lookup or
+  retry is needed. New rows land at the right edge of the unique index instead
+  of at random leaf pages.
+- ``'ulid'`` (default otherwise): 48 bits of milliseconds and 80 random bits
+  (26 characters), incremented rather than redrawn within a millisecond.
+  Time-ordered without a node id; uniqueness across processes is
+  probabilistic, but with 80 random bits a collision is not a practical concern.
+- ``'random'``: the previous ``ORD-`` + 8 random hex characters, kept for
+  comparison (``manage.py bench_order_numbers``).
+
+The snowflake node id comes from ``ORDER_NUMBER_NODE_ID`` (0-1023) and must be
+distinct for every process that creates orders. It is never guessed: selecting
+``'snowflake'`` without one raises ``ImproperlyConfigured`` when the orders app
+loads, since a derived id (say, a hash of host and pid) can silently repeat
+across workers and hand out duplicate numbers.
+"""
+import os
+import secrets
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+PREFIX = 'ORD-'
+
+# Crockford base32: no I, L, O or U, so numbers read back unambiguously.
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+
+def encode_base32(value: int, width: int) -> str:
+    """Fixed-width base32, so string order matches numeric order."""
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+class RandomOrderNumbers:
+    """``ORD-`` + 8 random hex characters; relies on the unique index to catch collisions."""
+
+    def __call__(self) -> str:
+        return f"{PREFIX}{uuid.uuid4().hex[:8].upper()}"
+
+
+class SnowflakeOrderNumbers:
+    """Time-ordered 64-bit ids: ``timestamp | node | sequence``."""
+
+    EPOCH_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+    NODE_BITS = 10
+    SEQUENCE_BITS = 12
+    MAX_NODE = (1 << NODE_BITS) - 1
+    MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+    def __init__(self, node_id=None, clock=_now_ms):
+        if node_id is None:
+            node_id = getattr(settings, 'ORDER_NUMBER_NODE_ID', None)
+        if node_id is None:
+            raise ImproperlyConfigured(
+                "ORDER_NUMBER_GENERATOR='snowflake' needs ORDER_NUMBER_NODE_ID, unique per process; "
+                "use 'ulid' when node ids can't be assigned"
+            )
+        node_id = int(node_id)
+        if not 0 <= node_id <= self.MAX_NODE:
+            raise ValueError(f'ORDER_NUMBER_NODE_ID must be between 0 and {self.MAX_NODE}')
+        self.node_id = node_id
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_value(self) -> int:
+        with self._lock:
+            now = self._clock() - self.EPOCH_MS
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                # Same millisecond, or the clock stepped back: keep counting
+                # from the last timestamp, borrowing the next millisecond
+                # once its sequence is used up.
+                self._sequence += 1
+                if self._sequence > self.MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+            return (
+                (self._last_ms << (self.NODE_BITS + self.SEQUENCE_BITS))
+                | (self.node_id << self.SEQUENCE_BITS)
+                | self._sequence
+            )
+
+    def __call__(self) -> str:
+        return PREFIX + encode_base32(self.next_value(), 13)
+
+
+class UlidOrderNumbers:
+    """ULIDs, monotonic within a millisecond."""
+
+    RANDOM_BITS = 80
+
+    def __init__(self, clock=_now_ms):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._random = 0
+
+    def next_value(self) -> int:
+        with self._lock:
+            now = self._clock()
+            if now > self._last_ms:
+                self._last_ms = now
+                self._random = secrets.randbits(self.RANDOM_BITS)
+            else:
+                self._random += 1
+                if self._random >> self.RANDOM_BITS:
+                    self._last_ms += 1
+                    self._random = secrets.randbits(self.RANDOM_BITS)
+            return (self._last_ms << self.RANDOM_BITS) | self._random
+
+    def __call__(self) -> str:
+        return PREFIX + encode_base32(self.next_value(), 26)
+
+
+ORDER_NUMBER_GENERATORS = {
+    'snowflake': SnowflakeOrderNumbers,
+    'ulid': UlidOrderNumbers,
+    'random': RandomOrderNumbers,
+}
+
+# One generator per (backend, process): the sequence state must be shared by
+# every thread of a process and must not be inherited across a fork.
+_generators = {}
+_generators_lock = threading.Lock()
+
+
+def default_generator() -> str:
+    """``'snowflake'`` if this process has a node id, else ``'ulid'``."""
+    return 'snowflake' if getattr(settings, 'ORDER_NUMBER_NODE_ID', None) is not None else 'ulid'
+
+
+def get_order_number_generator(backend=None):
+    """Return the generator selected by ``ORDER_NUMBER_GENERATOR``."""
+    backend = backend or getattr(settings, 'ORDER_NUMBER_GENERATOR', None) or default_generator()
+    key = (backend, os.getpid())
+    generator = _generators.get(key)
+    if generator is None:
+        with _generators_lock:
+            generator = _generators.get(key)
+            if generator is None:
+                try:
+                    generator = ORDER_NUMBER_GENERATORS[backend]()
+                except KeyError:
+                    raise ValueError(f'Unknown ORDER_NUMBER_GENERATOR: {backend!r}')
+                _generators[key] = generator
+    return generator
+
+
+def next_order_number() -> str:
+    return get_order_number_generator()()
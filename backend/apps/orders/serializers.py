@@ -1,17 +1,6 @@
 from rest_framework import serializers
-from .models import Order, OrderItem, OrderStatusHistory
-from apps.products.serializers import ProductSerializer, ProductVariantSerializer
-from apps.accounts.serializers import AddressSerializer
-
-
-class OrderItemSerializer(serializers.ModelSerializer):
-    product_details = ProductSerializer(source='product', read_only=True)
-    variant_details = ProductVariantSerializer(source='variant', read_only=True)
-    
-    class Meta:
-        model = OrderItem
-        fields = ['id', 'product', 'variant', 'quantity', 'price', 'subtotal', 'product_details', 'variant_details']
-        read_only_fields = ['id', 'subtotal']
+from .models import Order, OrderStatusHistory
+from .snapshots import build_snapshot
 
 
 class OrderStatusHistorySerializer(serializers.ModelSerializer):
@@ -22,12 +11,33 @@ class OrderStatusHistorySerializer(serializers.ModelSerializer):
 
 
 class OrderSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True, read_only=True)
-    status_history = OrderStatusHistorySerializer(many=True, read_only=True)
-    shipping_address_details = AddressSerializer(source='shipping_address', read_only=True)
-    billing_address_details = AddressSerializer(source='billing_address', read_only=True)
-    
+    """Order columns plus ``items``, ``status_history`` and address details from ``Order.snapshot``.
+
+    Nothing beyond the order row is read (see ``apps.orders.snapshots``).
+    """
+
     class Meta:
         model = Order
-        fields = '__all__'
+        exclude = ['snapshot']
         read_only_fields = ['id', 'order_number', 'created_at', 'updated_at']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Orders not backfilled yet are built on the fly; reads never write.
+        snapshot = instance.snapshot if instance.snapshot is not None else build_snapshot(instance)
+        request = self.context.get('request')
+        items = snapshot['items']
+        if request is not None:
+            items = [self._absolute_image(item, request) for item in items]
+        data['items'] = items
+        data['status_history'] = snapshot['status_history']
+        data['shipping_address_details'] = snapshot['shipping_address']
+        data['billing_address_details'] = snapshot['billing_address']
+        return data
+
+    @staticmethod
+    def _absolute_image(item, request):
+        image = item['product_details'].get('image')
+        if not image:
+            return item
+        return {**item, 'product_details': {**item['product_details'], 'image': request.build_absolute_uri(image)}}
@@ -0,0 +1,188 @@
+"""
+Order snapshots: the read model behind order list and detail.
+
+``Order.snapshot`` holds what an order response embeds:
+
+- the lines, with product name, SKU and primary image and the variant label as
+  they were at purchase;
+- the status history;
+- the shipping and billing addresses.
+
+It is written at checkout and on every status change, so serving an order is
+one query on ``orders`` and never touches the catalog. Orders without one
+(created before snapshots existed, or directly through the ORM) are served a
+snapshot built on the fly, without writing it; ``manage.py
+backfill_order_snapshots`` stores them in batches.
+"""
+from decimal import Decimal
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from apps.accounts.models import Address
+from apps.accounts.serializers import AddressSerializer
+from apps.products.models import ProductImage
+from utils.decimal_utils import round_currency
+
+from .models import Order, OrderItem, OrderStatusHistory
+
+
+def primary_image(product_ref='product_id'):
+    """Subquery for the image name of a product's primary image."""
+    return Subquery(
+        ProductImage.objects.filter(product=OuterRef(product_ref), is_primary=True)
+        .order_by('order', 'id').values('image')[:1]
+    )
+
+
+def item_entry(item_id, quantity, price, subtotal, product, variant=None):
+    """One snapshot line.
+
+    ``product`` is ``(id, name, slug, sku, image name)`` and ``variant`` is
+    ``(id, name, value, sku)`` or ``None``.
+    """
+    product_id, name, slug, sku, image = product
+    entry = {
+        'id': item_id,
+        'product': product_id,
+        'variant': variant[0] if variant else None,
+        'quantity': quantity,
+        'price': str(round_currency(Decimal(price))),
+        'subtotal': str(round_currency(Decimal(subtotal))),
+        'product_details': {
+            'id': product_id,
+            'name': name,
+            'slug': slug,
+            'sku': sku,
+            'image': default_storage.url(image) if image else None,
+        },
+        'variant_details': None,
+    }
+    if variant:
+        variant_id, variant_name, value, variant_sku = variant
+        entry['variant_details'] = {
+            'id': variant_id,
+            'name': variant_name,
+            'value': value,
+            'sku': variant_sku,
+            'label': f'{variant_name}: {value}',
+        }
+    return entry
+
+
+def _items(order, previous):
+    """Line entries; lines already in ``previous`` keep their purchase-time details."""
+    kept = {item['id']: item for item in (previous or {}).get('items', [])}
+    rows = order.items.select_related('product', 'variant').annotate(
+        primary_image=primary_image()
+    ).order_by('id')
+
+    items = []
+    for item in rows:
+        product, variant = item.product, item.variant
+        entry = item_entry(
+            item.id, item.quantity, item.price, item.subtotal,
+            (product.id, product.name, product.slug, product.sku, item.primary_image),
+            (variant.id, variant.name, variant.value, variant.sku) if variant else None,
+        )
+        if item.id in kept:
+            entry['product_details'] = kept[item.id]['product_details']
+            entry['variant_details'] = kept[item.id]['variant_details']
+        items.append(entry)
+    return items
+
+
+def history_entries(rows):
+    """Serialize ``OrderStatusHistory`` rows for the snapshot (fields are built once)."""
+    from .serializers import OrderStatusHistorySerializer
+    return OrderStatusHistorySerializer(rows, many=True).data
+
+
+def build_snapshot(order, previous=None, items=None, history=None, addresses=None) -> dict:
+    """Snapshot dict for ``order``.
+
+    Parts the caller already has in memory can be passed in: ``items`` (from
+    ``item_entry``), ``history`` (``OrderStatusHistory`` rows, newest first)
+    and ``addresses`` (``{id: Address}``). Anything missing is read.
+    """
+    if addresses is None:
+        addresses = Address.objects.in_bulk({order.shipping_address_id, order.billing_address_id} - {None})
+    if history is None:
+        history = OrderStatusHistory.objects.filter(order=order).order_by('-created_at', '-id')
+    serialized = {pk: AddressSerializer(address).data for pk, address in addresses.items()}
+    return {
+        'items': items if items is not None else _items(order, previous),
+        'status_history': list(history_entries(history)),
+        'shipping_address': serialized.get(order.shipping_address_id),
+        'billing_address': serialized.get(order.billing_address_id),
+    }
+
+
+def write_snapshot(order, **parts) -> dict:
+    """Build and store ``order.snapshot`` (see ``build_snapshot`` for ``parts``)."""
+    order.snapshot = build_snapshot(order, previous=order.snapshot, **parts)
+    Order.objects.filter(pk=order.pk).update(snapshot=order.snapshot)
+    return order.snapshot
+
+
+def record_status(order, history) -> dict:
+    """Add a new ``OrderStatusHistory`` row to the snapshot without re-reading the order.
+
+    ``order`` must have been read with ``select_for_update()`` in the current
+    transaction; appending to an unlocked copy would lose entries that a
+    concurrent status change wrote meanwhile.
+    """
+    if order.snapshot is None:
+        return write_snapshot(order)
+    order.snapshot['status_history'].insert(0, history_entries([history])[0])
+    Order.objects.filter(pk=order.pk).update(snapshot=order.snapshot)
+    return order.snapshot
+
+
+def backfill_snapshots(batch_size=500) -> int:
+    """Store snapshots for orders that have none, ``batch_size`` orders at a time.
+
+    Each batch reads its lines, history and addresses in three queries. An
+    order that got a snapshot meanwhile (checkout, status change) is left as
+    it is. Returns how many snapshots were written.
+    """
+    written = 0
+    last_id = 0
+    while True:
+        orders = list(
+            Order.objects.filter(pk__gt=last_id, snapshot__isnull=True)
+            .order_by('pk').only('id', 'shipping_address_id', 'billing_address_id')[:batch_size]
+        )
+        if not orders:
+            return written
+        last_id = orders[-1].pk
+        ids = [order.pk for order in orders]
+
+        items, history = {}, {}
+        rows = OrderItem.objects.filter(order_id__in=ids).select_related('product', 'variant').annotate(
+            primary_image=primary_image()
+        ).order_by('id')
+        for item in rows:
+            product, variant = item.product, item.variant
+            items.setdefault(item.order_id, []).append(item_entry(
+                item.id, item.quantity, item.price, item.subtotal,
+                (product.id, product.name, product.slug, product.sku, item.primary_image),
+                (variant.id, variant.name, variant.value, variant.sku) if variant else None,
+            ))
+        for row in OrderStatusHistory.objects.filter(order_id__in=ids).order_by('-created_at', '-id'):
+            history.setdefault(row.order_id, []).append(row)
+        addresses = Address.objects.in_bulk(
+            {pk for order in orders for pk in (order.shipping_address_id, order.billing_address_id)} - {None}
+        )
+
+        with transaction.atomic():
+            for order in orders:
+                own = {
+                    pk: addresses[pk] for pk in (order.shipping_address_id, order.billing_address_id)
+                    if pk in addresses
+                }
+                snapshot = build_snapshot(
+                    order, items=items.get(order.pk, []), history=history.get(order.pk, []), addresses=own,
+                )
+                written += Order.objects.filter(pk=order.pk, snapshot__isnull=True).update(snapshot=snapshot)
@@ -0,0 +1,206 @@
+"""
+Order status changes, for one order or a fulfillment batch.
+
+``bulk_change_status`` does for N orders what ``update_status`` does for one,
+in a fixed number of statements:
+
+- one locking read of the orders, validated in memory;
+- one ``UPDATE`` per target status;
+- one ``bulk_create`` of history rows;
+- one payment ``UPDATE`` per target status;
+- for cancellations and refunds, one restock per target status;
+- one batched ``UPDATE`` (executemany) of the order snapshots;
+- one pipelined publish of the ``order_status`` stream events, on commit.
+
+It returns a result per requested order; invalid entries are reported and
+skipped, not fatal.
+"""
+from typing import Dict, List, Optional
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from apps.notifications.events import order_status_changed
+from apps.products.models import StockMovement
+from apps.products.stock import restock_orders
+from utils.logging_utils import log_bulk_order_status_change
+
+from .models import Order, OrderStatusHistory
+from .snapshots import history_entries
+
+STATUSES = dict(Order.STATUS_CHOICES)
+
+# Target order status -> (payment status to change, or None for all; new payment status).
+PAYMENT_STATUS_SYNC = {
+    'confirmed': (None, 'completed'),
+    'cancelled': ('pending', 'cancelled'),
+    'refunded': (None, 'refunded'),
+}
+
+# Target order status -> ledger reason for putting the order's stock back.
+RESTOCK_REASONS = {
+    'cancelled': StockMovement.REASON_CANCEL,
+    'refunded': StockMovement.REASON_REFUND,
+}
+
+# Current order status -> statuses it may move to. Orders only move forward;
+# shipped orders can no longer be cancelled, and a refund can follow any
+# status a payment may have been taken in. Refunded is final.
+ALLOWED_TRANSITIONS = {
+    'pending': {'confirmed', 'processing', 'cancelled', 'refunded'},
+    'confirmed': {'processing', 'shipped', 'cancelled', 'refunded'},
+    'processing': {'shipped', 'cancelled', 'refunded'},
+    'shipped': {'delivered', 'refunded'},
+    'delivered': {'refunded'},
+    'cancelled': {'refunded'},
+    'refunded': set(),
+}
+
+BULK_BATCH_SIZE = 500
+
+
+def transition_error(old_status: str, new_status: str) -> Optional[str]:
+    """Why ``old_status`` -> ``new_status`` is not allowed, or ``None``."""
+    if new_status not in STATUSES:
+        return 'invalid_status'
+    if new_status == old_status:
+        return 'already_in_status'
+    if new_status not in ALLOWED_TRANSITIONS.get(old_status, ()):
+        return 'invalid_transition'
+    return None
+
+
+def sync_payments(order_ids, new_status) -> int:
+    """Move the orders' payments along with a new order status, in one statement."""
+    from apps.payments.models import Payment
+
+    if new_status not in PAYMENT_STATUS_SYNC or not order_ids:
+        return 0
+    only_status, payment_status = PAYMENT_STATUS_SYNC[new_status]
+    payments = Payment.objects.filter(order_id__in=order_ids)
+    if only_status is not None:
+        payments = payments.filter(status=only_status)
+    return payments.update(status=payment_status, updated_at=timezone.now())
+
+
+def sync_stock(order_ids, new_status) -> int:
+    """Restock cancelled/refunded orders (once per order, see ``restock_orders``)."""
+    if new_status not in RESTOCK_REASONS or not order_ids:
+        return 0
+    return restock_orders(order_ids, RESTOCK_REASONS[new_status])
+
+
+def _failed(order_id, error):
+    return {'id': order_id, 'ok': False, 'error': error}
+
+
+def bulk_change_status(updates: List[dict], changed_by: int, notes: str = '') -> List[dict]:
+    """Apply ``[{'id', 'status', 'notes'?}, ...]``; returns one result per entry, in order.
+
+    A result is ``{'id', 'ok': True, 'old_status', 'new_status'}`` or
+    ``{'id', 'ok': False, 'error'}`` with ``error`` one of ``invalid_id``,
+    ``duplicate``, ``invalid_status``, ``not_found``, ``already_in_status`` or
+    ``invalid_transition`` (see ``ALLOWED_TRANSITIONS``).
+    """
+    results: List[Optional[dict]] = [None] * len(updates)
+    wanted: Dict[int, int] = {}
+    for index, update in enumerate(updates):
+        raw_id = update.get('id') if isinstance(update, dict) else None
+        try:
+            order_id = int(raw_id)
+        except (TypeError, ValueError):
+            results[index] = _failed(raw_id, 'invalid_id')
+            continue
+        if order_id in wanted:
+            results[index] = _failed(order_id, 'duplicate')
+            continue
+        if str(update.get('status', '')).strip().lower() not in STATUSES:
+            results[index] = _failed(order_id, 'invalid_status')
+            continue
+        wanted[order_id] = index
+
+    now = timezone.now()
+    with transaction.atomic():
+        orders = Order.objects.select_for_update().only('id', 'user_id', 'order_number', 'status', 'snapshot').in_bulk(list(wanted))
+        by_status: Dict[str, List[Order]] = {}
+        history = []
+        for order_id, index in wanted.items():
+            order = orders.get(order_id)
+            if order is None:
+                results[index] = _failed(order_id, 'not_found')
+                continue
+            update = updates[index]
+            new_status = str(update['status']).strip().lower()
+            error = transition_error(order.status, new_status)
+            if error:
+                results[index] = _failed(order_id, error)
+                continue
+            results[index] = {'id': order_id, 'ok': True, 'old_status': order.status, 'new_status': new_status}
+            history.append(OrderStatusHistory(
+                order=order,
+                status=new_status,
+                notes=update.get('notes') or notes or f'Status changed from {order.status} to {new_status}',
+            ))
+            by_status.setdefault(new_status, []).append(order)
+
+        if not history:
+            return results
+
+        for new_status, changed in by_status.items():
+            ids = [order.id for order in changed]
+            Order.objects.filter(pk__in=ids).update(status=new_status, updated_at=now)
+            sync_payments(ids, new_status)
+            sync_stock(ids, new_status)
+            log_bulk_order_status_change(
+                new_status=new_status,
+                changes=[
+                    {'order_id': order.id, 'user_id': order.user_id, 'old_status': results[wanted[order.id]]['old_status']}
+                    for order in changed
+                ],
+                changed_by=changed_by,
+            )
+
+        created = OrderStatusHistory.objects.bulk_create(history, batch_size=BULK_BATCH_SIZE)
+        if any(row.pk is None for row in created):
+            # Backends that don't return ids from bulk inserts (SQLite): the
+            # newest row per order is ours, the orders are locked.
+            latest = {
+                row.order_id: row
+                for row in OrderStatusHistory.objects.filter(
+                    order_id__in=[row.order_id for row in created], created_at__gte=now
+                ).order_by('id')
+            }
+            created = [latest[row.order_id] for row in created]
+
+        # bulk_create sends no post_save: push the status events here.
+        order_status_changed([(row, orders[row.order_id]) for row in created])
+
+        # Snapshots: prepend the new history entry (orders without one are built on read).
+        snapshotted = []
+        for row, entry in zip(created, history_entries(created)):
+            order = orders[row.order_id]
+            if order.snapshot is not None:
+                order.snapshot['status_history'].insert(0, entry)
+                snapshotted.append(order)
+        _write_snapshots(snapshotted)
+    return results
+
+
+def _write_snapshots(orders):
+    """Store each order's snapshot with one parameterized ``UPDATE`` run via executemany.
+
+    ``bulk_update`` would build a ``CASE WHEN`` over every row, which costs
+    more to compile than the writes themselves for JSON values.
+    """
+    if not orders:
+        return
+    connection = connections[router.db_for_write(Order)]
+    field = Order._meta.get_field('snapshot')
+    quote = connection.ops.quote_name
+    sql = 'UPDATE {} SET {} = %s WHERE {} = %s'.format(
+        quote(Order._meta.db_table), quote(field.column), quote(Order._meta.pk.column),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (field.get_db_prep_save(order.snapshot, connection), order.pk) for order in orders
+        ])
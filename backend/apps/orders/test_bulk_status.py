@@ -0,0 +1,109 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.orders.models import Order, OrderStatusHistory
+from apps.orders.snapshots import write_snapshot
+from apps.payments.models import Payment
+
+
+class BulkUpdateStatusTests(TestCase):
+    url = '/api/v1/orders/bulk_update_status/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(username='ops', email='ops@example.com', password='password123')
+        self.client.force_authenticate(user=self.admin)
+        self.customer = User.objects.create_user(username='buyer', email='buyer@example.com', password='password123')
+
+    def _orders(self, count, status='processing'):
+        orders = []
+        for i in range(count):
+            order = Order.objects.create(user=self.customer, subtotal='10.00', total='10.00', status=status)
+            OrderStatusHistory.objects.create(order=order, status=status, notes='seed')
+            write_snapshot(order)
+            Payment.objects.create(
+                order=order, payment_method='credit_card', transaction_id=f'TX-{order.pk}',
+                amount='10.00', status='pending',
+            )
+            orders.append(order)
+        return orders
+
+    def _post(self, updates, **extra):
+        return self.client.post(self.url, {'updates': updates, **extra}, format='json')
+
+    def test_reports_a_result_per_order_and_applies_the_valid_ones(self):
+        shipped, same = self._orders(2)
+        confirmed, = self._orders(1, status='pending')
+        response = self._post([
+            {'id': shipped.id, 'status': 'shipped', 'notes': 'Wave 12'},
+            {'id': confirmed.id, 'status': 'Confirmed'},
+            {'id': same.id, 'status': 'processing'},
+            {'id': 999999, 'status': 'shipped'},
+            {'id': shipped.id, 'status': 'delivered'},
+            {'id': 'x', 'status': 'shipped'},
+            {'id': same.id + 1000, 'status': 'teleported'},
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['updated'], response.data['failed']), (2, 5))
+        self.assertEqual(response.data['results'], [
+            {'id': shipped.id, 'ok': True, 'old_status': 'processing', 'new_status': 'shipped'},
+            {'id': confirmed.id, 'ok': True, 'old_status': 'pending', 'new_status': 'confirmed'},
+            {'id': same.id, 'ok': False, 'error': 'already_in_status'},
+            {'id': 999999, 'ok': False, 'error': 'not_found'},
+            {'id': shipped.id, 'ok': False, 'error': 'duplicate'},
+            {'id': 'x', 'ok': False, 'error': 'invalid_id'},
+            {'id': same.id + 1000, 'ok': False, 'error': 'invalid_status'},
+        ])
+
+        self.assertEqual(
+            dict(Order.objects.values_list('id', 'status')),
+            {shipped.id: 'shipped', confirmed.id: 'confirmed', same.id: 'processing'},
+        )
+        self.assertEqual(
+            dict(Payment.objects.values_list('order_id', 'status')),
+            {shipped.id: 'pending', confirmed.id: 'completed', same.id: 'pending'},
+        )
+        history = Order.objects.get(pk=shipped.pk).snapshot['status_history']
+        self.assertEqual([(h['status'], h['notes']) for h in history], [('shipped', 'Wave 12'), ('processing', 'seed')])
+        self.assertEqual(history[0]['id'], OrderStatusHistory.objects.filter(order=shipped).latest('id').id)
+
+        detail = self.client.get(f'/api/v1/orders/{confirmed.id}/').data
+        self.assertEqual(detail['status_history'][0]['notes'], 'Status changed from pending to confirmed')
+
+    def test_transitions_outside_the_allowed_map_are_skipped(self):
+        delivered, = self._orders(1, status='delivered')
+        cancelled, = self._orders(1, status='cancelled')
+        response = self._post([
+            {'id': delivered.id, 'status': 'pending'},
+            {'id': cancelled.id, 'status': 'shipped'},
+        ])
+        self.assertEqual(response.data['results'], [
+            {'id': delivered.id, 'ok': False, 'error': 'invalid_transition'},
+            {'id': cancelled.id, 'ok': False, 'error': 'invalid_transition'},
+        ])
+        self.assertEqual(
+            dict(Order.objects.values_list('id', 'status')),
+            {delivered.id: 'delivered', cancelled.id: 'cancelled'},
+        )
+
+    def test_statement_count_does_not_grow_with_the_batch(self):
+        def run(orders):
+            with CaptureQueriesContext(connection) as context:
+                response = self._post(
+                    [{'id': o.id, 'status': 'shipped'} for o in orders[::2]]
+                    + [{'id': o.id, 'status': 'cancelled'} for o in orders[1::2]]
+                )
+            self.assertEqual(response.data['updated'], len(orders))
+            return len(context.captured_queries)
+
+        self.assertEqual(run(self._orders(4)), run(self._orders(40)))
+        self.assertEqual(Payment.objects.filter(status='cancelled').count(), 22)
+
+    def test_rejects_bad_payloads_and_non_staff(self):
+        self.assertEqual(self._post([]).status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'updates': 'all'}, format='json').status_code, 400)
+        self.client.force_authenticate(user=self.customer)
+        self.assertEqual(self._post([{'id': 1, 'status': 'shipped'}]).status_code, 403)
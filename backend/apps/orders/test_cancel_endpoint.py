@@ -71,8 +71,8 @@ class OrderCancelEndpointTests(TestCase):
         self.payment.refresh_from_db()
         self.assertEqual(self.payment.status, 'cancelled')
 
-    def test_cannot_cancel_shipped_delivered_or_cancelled(self):
-        for status in ['shipped', 'delivered', 'cancelled']:
+    def test_cannot_cancel_shipped_delivered_cancelled_or_refunded(self):
+        for status in ['shipped', 'delivered', 'cancelled', 'refunded']:
             self.order.status = status
             self.order.save(update_fields=['status'])
             res = self.client.post(f'/api/v1/orders/{self.order.id}/cancel/', {}, format='json')
@@ -0,0 +1,83 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.accounts.models import Address, User
+from apps.cart.models import Cart, CartItem
+from apps.orders.checkout import CheckoutError, CheckoutService, StockRejected
+from apps.orders.models import Order
+from apps.products.models import Category, Product, ProductVariant
+
+
+class CheckoutServiceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='svc', email='svc@example.com', password='password123')
+        category = Category.objects.create(name='Service', slug='service')
+        self.product = Product.objects.create(
+            name='Mug', slug='mug', description='', category=category, sku='MUG', price='8.00', stock=10,
+        )
+        self.variant = ProductVariant.objects.create(
+            product=self.product, name='Size', value='XL', sku='MUG-XL', price_adjustment='2.50', stock=4,
+        )
+        address = Address.objects.create(
+            user=self.user, address_type='shipping', full_name='Svc', phone='1',
+            address_line1='1 St', city='City', state='ST', postal_code='1', country='US',
+        )
+        self.data = {'shipping_address': address.id, 'billing_address': address.id, 'tax': '1.00'}
+        self.cart = Cart.objects.create(user=self.user)
+        self.plain = CartItem.objects.create(cart=self.cart, product=self.product, quantity=2)
+        self.sized = CartItem.objects.create(cart=self.cart, product=self.product, variant=self.variant, quantity=1)
+
+    def test_lines_are_read_once_and_every_stage_is_timed(self):
+        service = CheckoutService(self.user, self.data)
+        with CaptureQueriesContext(connection) as context:
+            order = service.run()
+        line_reads = [
+            q['sql'] for q in context.captured_queries
+            if q['sql'].startswith('SELECT') and 'FROM "cart_items"' in q['sql']
+        ]
+        self.assertEqual(len(line_reads), 1)
+        self.assertEqual([line[:5] for line in service.lines], [
+            (self.plain.id, self.product.id, None, 2, Decimal('8.00')),
+            (self.sized.id, self.product.id, self.variant.id, 1, Decimal('10.50')),
+        ])
+        self.assertEqual(list(service.timings), list(CheckoutService.STAGES))
+        self.assertEqual(order.total, Decimal('27.50'))
+        self.assertEqual(list(order.items.order_by('id').values_list('price', flat=True)),
+                         [Decimal('8.00'), Decimal('10.50')])
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_failures_stop_the_pipeline_at_their_stage(self):
+        service = CheckoutService(self.user, dict(self.data, item_ids=[self.plain.id, 999]))
+        with self.assertRaises(CheckoutError) as ctx:
+            service.run()
+        self.assertEqual(ctx.exception.body, {'error': 'Some items not found in cart', 'missing_item_ids': [999]})
+        self.assertEqual(list(service.timings), ['load'])
+
+        service = CheckoutService(self.user, dict(self.data, discount='100.00'))
+        with self.assertRaises(CheckoutError) as ctx:
+            service.run()
+        self.assertEqual(ctx.exception.reason, 'discount_exceeds_total')
+        self.assertEqual(list(service.timings), ['load', 'validate', 'price'])
+
+    def test_stock_shortfall_rolls_back_persisted_rows(self):
+        self.sized.quantity = 5
+        self.sized.save()
+        with self.assertRaises(StockRejected) as ctx:
+            CheckoutService(self.user, self.data).run()
+        self.assertEqual(ctx.exception.details[0]['available'], 4)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.count(), 2)
+
+    def test_bench_command_reports_each_stage(self):
+        out = StringIO()
+        call_command('bench_checkout', '--sizes', '1,3', '--repeat', '2', '--warmup', '0', stdout=out)
+        header, *rows = out.getvalue().splitlines()
+        for stage in CheckoutService.STAGES:
+            self.assertIn(f'{stage} p50/p99', header)
+        self.assertEqual([row.split()[0] for row in rows], ['1', '3'])
+        self.assertFalse(Order.objects.exists())
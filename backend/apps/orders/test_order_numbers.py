@@ -0,0 +1,87 @@
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.accounts.models import User
+from apps.orders.models import Order
+from apps.orders.numbers import (
+    SnowflakeOrderNumbers, UlidOrderNumbers, default_generator, encode_base32,
+)
+
+
+class _Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class OrderNumberGeneratorTests(SimpleTestCase):
+    def test_snowflake_numbers_increase_across_threads(self):
+        generate = SnowflakeOrderNumbers(node_id=7)
+        numbers = []
+
+        def worker():
+            numbers.extend(generate() for _ in range(2000))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(numbers)), 8000)
+        self.assertTrue(all(len(n) == 17 and n.startswith('ORD-') for n in numbers))
+
+    def test_snowflake_survives_clock_skew_and_sequence_overflow(self):
+        clock = _Clock(SnowflakeOrderNumbers.EPOCH_MS + 1000)
+        generate = SnowflakeOrderNumbers(node_id=1, clock=clock)
+        values = [generate.next_value() for _ in range(SnowflakeOrderNumbers.MAX_SEQUENCE + 3)]
+        clock.now -= 500
+        values += [generate.next_value() for _ in range(3)]
+        self.assertEqual(values, sorted(set(values)))
+        self.assertEqual(values[-1] >> 22, 1001)
+
+    def test_nodes_never_collide(self):
+        clock = _Clock(SnowflakeOrderNumbers.EPOCH_MS)
+        a = SnowflakeOrderNumbers(node_id=1, clock=clock)
+        b = SnowflakeOrderNumbers(node_id=2, clock=clock)
+        self.assertFalse({a() for _ in range(100)} & {b() for _ in range(100)})
+        with self.assertRaises(ValueError):
+            SnowflakeOrderNumbers(node_id=1024)
+
+    @override_settings(ORDER_NUMBER_NODE_ID=None)
+    def test_snowflake_requires_an_explicit_node_id(self):
+        with self.assertRaises(ImproperlyConfigured):
+            SnowflakeOrderNumbers()
+        self.assertEqual(default_generator(), 'ulid')
+        with override_settings(ORDER_NUMBER_NODE_ID='3'):
+            self.assertEqual(SnowflakeOrderNumbers().node_id, 3)
+            self.assertEqual(default_generator(), 'snowflake')
+
+    def test_ulid_is_monotonic_within_a_millisecond(self):
+        generate = UlidOrderNumbers(clock=_Clock(1_700_000_000_000))
+        numbers = [generate() for _ in range(100)]
+        self.assertEqual(numbers, sorted(set(numbers)))
+        self.assertEqual(len(numbers[0]), 30)
+
+    def test_encoding_preserves_order(self):
+        values = [0, 31, 32, 1 << 40, (1 << 63) + 5]
+        self.assertEqual([encode_base32(v, 13) for v in values], sorted(encode_base32(v, 13) for v in values))
+
+
+class OrderSaveNumberTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='numbers', email='numbers@example.com', password='password123')
+
+    def _order(self):
+        return Order.objects.create(user=self.user, subtotal='1.00', total='1.00')
+
+    def test_orders_are_numbered_in_creation_order(self):
+        numbers = [self._order().order_number for _ in range(5)]
+        self.assertEqual(numbers, sorted(numbers))
+
+    @override_settings(ORDER_NUMBER_GENERATOR='random')
+    def test_generator_is_selected_by_setting(self):
+        self.assertRegex(self._order().order_number, r'^ORD-[0-9A-F]{8}$')
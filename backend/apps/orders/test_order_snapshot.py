@@ -0,0 +1,111 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Address, User
+from apps.cart.models import Cart, CartItem
+from apps.orders.models import Order, OrderItem
+from apps.products.models import Category, Product, ProductImage, ProductVariant
+
+
+class OrderSnapshotTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='snap', email='snap@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Snap', slug='snap')
+        self.product = Product.objects.create(
+            name='Kettle', slug='kettle', description='', category=category, sku='KETTLE', price='30.00', stock=20,
+        )
+        ProductImage.objects.create(product=self.product, image='products/kettle.jpg', is_primary=True)
+        self.variant = ProductVariant.objects.create(
+            product=self.product, name='Color', value='Black', sku='KETTLE-BLK', price_adjustment='5.00', stock=10,
+        )
+        self.address = Address.objects.create(
+            user=self.user, address_type='shipping', full_name='Snap User', phone='1',
+            address_line1='1 St', city='Snapville', state='ST', postal_code='1', country='US',
+        )
+
+    def _checkout(self):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+        CartItem.objects.create(cart=cart, product=self.product, variant=self.variant, quantity=2)
+        response = self.client.post('/api/v1/orders/create_from_cart/', {
+            'shipping_address': self.address.id, 'billing_address': self.address.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def test_details_are_kept_as_they_were_at_purchase(self):
+        order_id = self._checkout()
+        self.product.name = 'Renamed kettle'
+        self.product.save()
+        self.variant.delete()
+        self.address.city = 'Elsewhere'
+        self.address.save()
+
+        data = self.client.get(f'/api/v1/orders/{order_id}/').data
+        plain, coloured = data['items']
+        self.assertEqual(plain['product_details']['name'], 'Kettle')
+        self.assertEqual(plain['product_details']['image'], 'http://testserver/media/products/kettle.jpg')
+        self.assertIsNone(plain['variant_details'])
+        self.assertEqual(coloured['variant_details']['label'], 'Color: Black')
+        self.assertEqual((coloured['price'], coloured['subtotal']), ('35.00', '70.00'))
+        self.assertEqual(data['shipping_address_details']['city'], 'Snapville')
+
+    def test_list_and_detail_read_only_the_orders_table(self):
+        for _ in range(3):
+            order_id = self._checkout()
+        with self.assertNumQueries(1):
+            detail = self.client.get(f'/api/v1/orders/{order_id}/')
+        self.assertEqual(len(detail.data['items']), 2)
+        # COUNT(*) plus the page.
+        with self.assertNumQueries(2):
+            listing = self.client.get('/api/v1/orders/')
+        self.assertEqual(len(listing.data['results']), 3)
+
+    def test_status_changes_are_appended_to_the_snapshot(self):
+        order_id = self._checkout()
+        self.client.post(f'/api/v1/orders/{order_id}/cancel/', {'notes': 'Changed my mind'}, format='json')
+        history = Order.objects.get(pk=order_id).snapshot['status_history']
+        self.assertEqual([(h['status'], h['notes']) for h in history], [
+            ('cancelled', 'Changed my mind'), ('pending', 'Order created'),
+        ])
+
+    def test_order_without_snapshot_is_served_but_only_the_backfill_writes_it(self):
+        order = Order.objects.create(
+            user=self.user, shipping_address=self.address, billing_address=self.address,
+            subtotal='30.00', total='30.00',
+        )
+        OrderItem.objects.create(order=order, product=self.product, quantity=1, price='30.00')
+        data = self.client.get(f'/api/v1/orders/{order.id}/').data
+        self.assertEqual(data['items'][0]['product_details']['sku'], 'KETTLE')
+        order.refresh_from_db()
+        self.assertIsNone(order.snapshot)
+
+        out = StringIO()
+        call_command('backfill_order_snapshots', '--batch-size', '1', stdout=out)
+        self.assertIn('Wrote snapshots for 1 orders', out.getvalue())
+        order.refresh_from_db()
+        self.assertEqual(order.snapshot['items'][0]['product'], self.product.id)
+        self.assertEqual(order.snapshot['shipping_address']['city'], 'Snapville')
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/v1/orders/{order.id}/')
+
+    def test_status_change_keeps_history_written_since_the_order_was_read(self):
+        order_id = self._checkout()
+        staff = User.objects.create_user(
+            username='snap-staff', email='snap-staff@example.com', password='password123', is_staff=True,
+        )
+        stale = Order.objects.get(pk=order_id)
+        self.client.post(f'/api/v1/orders/{order_id}/cancel/', format='json')
+        # A full save of a stale copy used to write its old snapshot back.
+        stale.tracking_number = 'TRACK'
+        stale.save(update_fields=['tracking_number'])
+
+        self.client.force_authenticate(user=staff)
+        self.client.post(f'/api/v1/orders/{order_id}/update_status/', {'status': 'refunded'}, format='json')
+        history = Order.objects.get(pk=order_id).snapshot['status_history']
+        self.assertEqual([h['status'] for h in history], ['refunded', 'cancelled', 'pending'])
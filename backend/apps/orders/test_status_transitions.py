@@ -104,6 +104,22 @@ class OrderStatusTransitionsTests(TestCase):
         })
         self.assertEqual(response.status_code, 400)
 
+    def test_update_status_rejects_transitions_outside_the_allowed_map(self):
+        """Test that orders can't move backwards or out of a final status"""
+        self.client.force_authenticate(user=self.admin)
+
+        for old_status, new_status in [('delivered', 'pending'), ('cancelled', 'shipped'), ('refunded', 'confirmed')]:
+            self.order.status = old_status
+            self.order.save(update_fields=['status'])
+            response = self.client.post(f'/api/v1/orders/{self.order.id}/update_status/', {
+                'status': new_status,
+            })
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['error'], f'Cannot change order status from {old_status} to {new_status}')
+            self.order.refresh_from_db()
+            self.assertEqual(self.order.status, old_status)
+        self.assertFalse(OrderStatusHistory.objects.filter(order=self.order).exists())
+
 
 class PaymentStatusUpdatesTests(TestCase):
     def setUp(self):
@@ -1,4 +1,3 @@
-from decimal import Decimal, InvalidOperation
 import time
 from typing import Optional
 
@@ -7,13 +6,14 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.throttling import UserRateThrottle
 from django.db import transaction
-from .models import Order, OrderItem, OrderStatusHistory
+from apps.idempotency.decorators import idempotent, request_key
+from .checkout import AlreadyPlaced, CheckoutError, CheckoutService, StockRejected
+from .models import Order, OrderStatusHistory
 from .serializers import OrderSerializer
-from apps.cart.models import Cart
-from apps.accounts.models import Address
-from apps.products.models import Product, ProductVariant
-from utils.decimal_utils import validate_money_field, round_currency
-from utils.logging_utils import log_checkout_failure, log_stock_insufficient, log_order_status_change
+from .snapshots import record_status
+from .status import bulk_change_status, sync_payments, sync_stock, transition_error
+from apps.cart.store import get_cart_store
+from utils.logging_utils import log_checkout_failure, log_order_status_change
 from utils.otel_utils import add_span_event, record_span_error, set_span_attributes
 from utils.telemetry import (
     api_error_counter,
@@ -25,6 +25,10 @@ from utils.telemetry import (
 )
 
 
+# Orders per bulk_update_status request.
+BULK_STATUS_MAX_ORDERS = 5000
+
+
 class CheckoutRateThrottle(UserRateThrottle):
     scope = 'checkout'
     
@@ -41,6 +45,22 @@ class CheckoutRateThrottle(UserRateThrottle):
         return super().allow_request(request, view)
 
 
+def _stock_error_response(user_id, stock_errors):
+    log_checkout_failure(
+        user_id=user_id,
+        error_type='insufficient_stock',
+        error_message='One or more items have insufficient stock',
+        context={'stock_errors': stock_errors}
+    )
+    return Response(
+        {
+            'error': 'Insufficient stock',
+            'details': stock_errors,
+        },
+        status=status.HTTP_400_BAD_REQUEST,
+    )
+
+
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -52,21 +72,13 @@ class OrderViewSet(viewsets.ModelViewSet):
         else:
             queryset = Order.objects.filter(user=self.request.user)
         
-        return queryset.select_related(
-            'user',
-            'shipping_address',
-            'billing_address'
-        ).prefetch_related(
-            'items__product__category',
-            'items__product__brand',
-            'items__product__images',
-            'items__variant',
-            'status_history'
-        ).order_by('-created_at', '-id')
+        # Lines, history and addresses come from Order.snapshot: one query, no joins.
+        return queryset.order_by('-created_at', '-id')
     
     @action(detail=False, methods=['post'], throttle_classes=[CheckoutRateThrottle])
+    @idempotent('orders.create_from_cart')
     def create_from_cart(self, request):
-        """Create order from cart with idempotency support."""
+        """Create order from cart; retries with the same Idempotency-Key replay the response."""
         start_time = time.monotonic()
         base_attrs = {
             "endpoint": "orders.create_from_cart",
@@ -128,338 +140,68 @@ class OrderViewSet(viewsets.ModelViewSet):
             except Exception:
                 pass
 
-        # Check for idempotency key
-        idempotency_key = request.headers.get('Idempotency-Key') or request.data.get('idempotency_key')
-        
-        if idempotency_key:
-            # Check if order with this idempotency key already exists
-            existing_order = Order.objects.filter(
-                user=request.user,
-                idempotency_key=idempotency_key
-            ).first()
-            
-            if existing_order:
-                # Return existing order (idempotent response)
-                serializer = OrderSerializer(existing_order)
-                _record_success(order_id=existing_order.id, idempotent=True)
-                return Response(serializer.data, status=status.HTTP_200_OK)
-        
+        # Backstop for keys whose stored response has expired or been purged:
+        # the order carries the key, so a late retry gets that order back.
+        idempotency_key = request_key(request)
+        service = CheckoutService(
+            request.user, request.data, idempotency_key=str(idempotency_key) if idempotency_key else None,
+        )
+        existing_order = service.existing_order()
+        if existing_order is not None:
+            _record_success(order_id=existing_order.id, idempotent=True)
+            return Response(OrderSerializer(existing_order).data, status=status.HTTP_200_OK)
+
+        # Write any buffered cart changes back so the order sees what the user sees.
+        cart_store = get_cart_store()
+        cart_store.flush(request.user.id)
+
         try:
-            cart = Cart.objects.get(user=request.user)
-
-            item_ids = request.data.get('item_ids', None)
-            items_qs = cart.items.all()
-            if isinstance(item_ids, list):
-                if len(item_ids) == 0:
-                    _record_failure("no_items_selected")
-                    return Response({'error': 'No items selected'}, status=status.HTTP_400_BAD_REQUEST)
-
-                try:
-                    normalized_ids = [int(v) for v in item_ids]
-                except (TypeError, ValueError):
-                    _record_failure("invalid_item_ids")
-                    return Response(
-                        {'error': 'Invalid item_ids', 'detail': 'item_ids must be a list of integers'},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                normalized_ids = [i for i in normalized_ids if i > 0]
-                if not normalized_ids:
-                    _record_failure("no_items_selected")
-                    return Response({'error': 'No items selected'}, status=status.HTTP_400_BAD_REQUEST)
-
-                existing_ids = set(
-                    cart.items.filter(id__in=normalized_ids).values_list('id', flat=True)
-                )
-                missing_ids = sorted(set(normalized_ids) - existing_ids)
-                if missing_ids:
-                    _record_failure("some_items_missing")
-                    return Response(
-                        {
-                            'error': 'Some items not found in cart',
-                            'missing_item_ids': missing_ids,
-                        },
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                items_qs = items_qs.filter(id__in=normalized_ids)
-
-            if not items_qs.exists():
-                _record_failure("cart_empty")
-                return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            with transaction.atomic():
-                def parse_required_int(field_name: str) -> int:
-                    raw = request.data.get(field_name, None)
-                    if raw is None or raw == '':
-                        raise ValueError(f"{field_name} is required")
-                    try:
-                        value = int(raw)
-                    except (TypeError, ValueError):
-                        raise ValueError(f"{field_name} must be an integer")
-                    if value <= 0:
-                        raise ValueError(f"{field_name} must be a positive integer")
-                    return value
-
-                def parse_money(field_name: str) -> Decimal:
-                    """Parse and validate money field from request data."""
-                    raw = request.data.get(field_name, 0)
-                    if raw is None or raw == '':
-                        raw = 0
-                    try:
-                        # Use the centralized validation utility
-                        value = validate_money_field(raw, field_name, allow_zero=True)
-                        return value
-                    except (ValueError, TypeError) as e:
-                        raise ValueError(f"{field_name}: {str(e)}")
-
-                try:
-                    shipping_address_id = parse_required_int('shipping_address')
-                    billing_address_id = parse_required_int('billing_address')
-
-                    if not Address.objects.filter(id=shipping_address_id, user=request.user).exists():
-                        _record_failure("invalid_shipping_address")
-                        return Response(
-                            {
-                                'error': 'Invalid checkout fields',
-                                'details': {'shipping_address': ['Invalid address']},
-                            },
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-                    if not Address.objects.filter(id=billing_address_id, user=request.user).exists():
-                        _record_failure("invalid_billing_address")
-                        return Response(
-                            {
-                                'error': 'Invalid checkout fields',
-                                'details': {'billing_address': ['Invalid address']},
-                            },
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-
-                    shipping_cost = parse_money('shipping_cost')
-                    tax = parse_money('tax')
-                    discount = parse_money('discount')
-                except ValueError as e:
-                    field = str(e).split(' ', 1)[0]
-                    _record_failure("invalid_checkout_fields", {"field": field})
-                    return Response(
-                        {'error': 'Invalid checkout fields', 'details': {field: [str(e)]}},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                items_qs = items_qs.select_related('product', 'variant')
-
-                # Stock enforcement (validate + decrement inside the transaction)
-                product_ids = {ci.product_id for ci in items_qs}
-                variant_ids = {ci.variant_id for ci in items_qs if ci.variant_id}
-
-                products_by_id = {
-                    p.id: p
-                    for p in Product.objects.select_for_update().filter(id__in=product_ids)
-                }
-                variants_by_id = {
-                    v.id: v
-                    for v in ProductVariant.objects.select_for_update().filter(id__in=variant_ids)
-                }
-
-                stock_errors = []
-                for cart_item in items_qs:
-                    quantity = int(cart_item.quantity or 0)
-                    if quantity <= 0:
-                        stock_errors.append(
-                            {
-                                'cart_item_id': cart_item.id,
-                                'reason': 'invalid_quantity',
-                            }
-                        )
-                        continue
-
-                    if cart_item.variant_id:
-                        variant = variants_by_id.get(cart_item.variant_id)
-                        if not variant:
-                            stock_errors.append(
-                                {
-                                    'cart_item_id': cart_item.id,
-                                    'variant_id': cart_item.variant_id,
-                                    'reason': 'variant_not_found',
-                                }
-                            )
-                            continue
-                        available = int(variant.stock or 0)
-                        if quantity > available:
-                            # Log insufficient stock
-                            log_stock_insufficient(
-                                user_id=request.user.id,
-                                product_id=cart_item.product_id,
-                                variant_id=cart_item.variant_id,
-                                requested=quantity,
-                                available=available
-                            )
-                            stock_errors.append(
-                                {
-                                    'cart_item_id': cart_item.id,
-                                    'product_id': cart_item.product_id,
-                                    'variant_id': cart_item.variant_id,
-                                    'available': available,
-                                    'requested': quantity,
-                                    'reason': 'insufficient_stock',
-                                }
-                            )
-                    else:
-                        product = products_by_id.get(cart_item.product_id)
-                        if not product:
-                            stock_errors.append(
-                                {
-                                    'cart_item_id': cart_item.id,
-                                    'product_id': cart_item.product_id,
-                                    'reason': 'product_not_found',
-                                }
-                            )
-                            continue
-                        available = int(product.stock or 0)
-                        if quantity > available:
-                            # Log insufficient stock
-                            log_stock_insufficient(
-                                user_id=request.user.id,
-                                product_id=cart_item.product_id,
-                                variant_id=None,
-                                requested=quantity,
-                                available=available
-                            )
-                            stock_errors.append(
-                                {
-                                    'cart_item_id': cart_item.id,
-                                    'product_id': cart_item.product_id,
-                                    'available': available,
-                                    'requested': quantity,
-                                    'reason': 'insufficient_stock',
-                                }
-                            )
-
-                if stock_errors:
-                    # Log overall checkout failure
-                    log_checkout_failure(
-                        user_id=request.user.id,
-                        error_type='insufficient_stock',
-                        error_message='One or more items have insufficient stock',
-                        context={'stock_errors': stock_errors}
-                    )
-                    return Response(
-                        {
-                            'error': 'Insufficient stock',
-                            'details': stock_errors,
-                        },
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                for cart_item in items_qs:
-                    quantity = int(cart_item.quantity)
-                    if cart_item.variant_id:
-                        variant = variants_by_id[cart_item.variant_id]
-                        variant.stock = int(variant.stock) - quantity
-                        variant.save(update_fields=['stock'])
-                    else:
-                        product = products_by_id[cart_item.product_id]
-                        product.stock = int(product.stock) - quantity
-                        product.save(update_fields=['stock'])
-
-                subtotal = sum((i.subtotal for i in items_qs), Decimal('0'))
-                if discount > (subtotal + shipping_cost + tax):
-                    _record_failure("discount_exceeds_total")
-                    return Response(
-                        {
-                            'error': 'Invalid pricing',
-                            'details': {
-                                'discount': ['discount cannot exceed subtotal + shipping_cost + tax']
-                            },
-                        },
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                # Compute total server-side with proper rounding (never trust client)
-                total = round_currency(subtotal + shipping_cost + tax - discount)
-                if total < 0:
-                    _record_failure("negative_total")
-                    return Response(
-                        {
-                            'error': 'Invalid pricing',
-                            'details': {'total': ['total cannot be negative']},
-                        },
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                # Create order
-                order = Order.objects.create(
-                    user=request.user,
-                    shipping_address_id=shipping_address_id,
-                    billing_address_id=billing_address_id,
-                    subtotal=subtotal,
-                    shipping_cost=shipping_cost,
-                    tax=tax,
-                    discount=discount,
-                    total=total,
-                    notes=request.data.get('notes', ''),
-                    idempotency_key=idempotency_key  # Save idempotency key
-                )
-                
-                # Create order items from cart
-                order_items = [
-                    OrderItem(
-                        order=order,
-                        product=cart_item.product,
-                        variant=cart_item.variant,
-                        quantity=cart_item.quantity,
-                        price=cart_item.price,
-                        subtotal=cart_item.price * cart_item.quantity
-                    )
-                    for cart_item in items_qs
-                ]
-                OrderItem.objects.bulk_create(order_items)
-                
-                # Create status history
-                OrderStatusHistory.objects.create(
-                    order=order,
-                    status='pending',
-                    notes='Order created'
-                )
-                
-                # Remove ordered items from cart
-                items_qs.delete()
-            
-            serializer = OrderSerializer(order)
-            _record_success(order_id=order.id, idempotent=False)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-            
-        except Cart.DoesNotExist:
-            _record_failure("cart_not_found")
-            return Response(
-                {'error': 'Cart not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-    
+            order = service.run()
+        except AlreadyPlaced as exc:
+            _record_success(order_id=exc.order.id, idempotent=True)
+            return Response(OrderSerializer(exc.order).data, status=status.HTTP_200_OK)
+        except StockRejected as exc:
+            return _stock_error_response(request.user.id, exc.details)
+        except CheckoutError as exc:
+            _record_failure(exc.reason, exc.attrs)
+            return Response(exc.body, status=exc.status_code)
+        cart_store.forget(request.user.id)
+        set_span_attributes({
+            f"checkout.{stage}_ms": round(elapsed, 3) for stage, elapsed in service.timings.items()
+        })
+
+        serializer = OrderSerializer(order)
+        _record_success(order_id=order.id, idempotent=False)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """Cancel order."""
         order = self.get_object()
-        
-        if order.status in ['shipped', 'delivered', 'cancelled']:
-            return Response(
-                {'error': 'Cannot cancel order in current status'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
+
         with transaction.atomic():
+            # Lock the row so the status check and the snapshot's history see
+            # any concurrent status change.
+            order = Order.objects.select_for_update().get(pk=order.pk)
+            if transition_error(order.status, 'cancelled'):
+                return Response(
+                    {'error': 'Cannot cancel order in current status'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             order.status = 'cancelled'
-            order.save()
+            order.save(update_fields=['status', 'updated_at'])
 
-            OrderStatusHistory.objects.create(
+            history = OrderStatusHistory.objects.create(
                 order=order,
                 status='cancelled',
                 notes=request.data.get('notes', 'Cancelled by customer')
             )
+            record_status(order, history)
 
-            # Keep payments consistent with the order state.
-            order.payments.filter(status='pending').update(status='cancelled')
+            # Keep payments and stock consistent with the order state.
+            sync_payments([order.id], 'cancelled')
+            sync_stock([order.id], 'cancelled')
         
         serializer = OrderSerializer(order)
         return Response(serializer.data)
@@ -480,38 +222,67 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        if new_status == order.status:
-            return Response(
-                {'error': 'Order is already in this status'},
-                status=status.HTTP_400_BAD_REQUEST
+        with transaction.atomic():
+            # Lock the row so the snapshot's history sees any concurrent status change.
+            order = Order.objects.select_for_update().get(pk=order.pk)
+            if new_status == order.status:
+                return Response(
+                    {'error': 'Order is already in this status'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if transition_error(order.status, new_status):
+                return Response(
+                    {'error': f'Cannot change order status from {order.status} to {new_status}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            old_status = order.status
+            order.status = new_status
+            order.save(update_fields=['status', 'updated_at'])
+
+            # Log status change
+            log_order_status_change(
+                user_id=order.user_id,
+                order_id=order.id,
+                old_status=old_status,
+                new_status=new_status,
+                changed_by=request.user.id
             )
-        
-        old_status = order.status
-        order.status = new_status
-        order.save()
-        
-        # Log status change
-        log_order_status_change(
-            user_id=order.user_id,
-            order_id=order.id,
-            old_status=old_status,
-            new_status=new_status,
-            changed_by=request.user.id
-        )
-        
-        OrderStatusHistory.objects.create(
-            order=order,
-            status=new_status,
-            notes=notes or f'Status changed from {old_status} to {new_status}'
-        )
-        
-        # Update associated payment status based on order status
-        if new_status == 'confirmed' and order.payments.exists():
-            order.payments.update(status='completed')
-        elif new_status == 'cancelled' and order.payments.filter(status='pending').exists():
-            order.payments.filter(status='pending').update(status='cancelled')
-        elif new_status == 'refunded' and order.payments.exists():
-            order.payments.update(status='refunded')
+
+            history = OrderStatusHistory.objects.create(
+                order=order,
+                status=new_status,
+                notes=notes or f'Status changed from {old_status} to {new_status}'
+            )
+            record_status(order, history)
+
+            # Update associated payment status based on order status
+            sync_payments([order.id], new_status)
+            sync_stock([order.id], new_status)
         
         serializer = OrderSerializer(order)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsStaffOrInAdminGroupStrict])
+    def bulk_update_status(self, request):
+        """Change the status of many orders at once (admin only); one result per order."""
+        updates = request.data.get('updates')
+        if not isinstance(updates, list) or not updates:
+            return Response(
+                {'error': 'Invalid updates', 'detail': 'updates must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(updates) > BULK_STATUS_MAX_ORDERS:
+            return Response(
+                {'error': 'Invalid updates', 'detail': f'At most {BULK_STATUS_MAX_ORDERS} orders per request'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = bulk_change_status(updates, changed_by=request.user.id, notes=request.data.get('notes', ''))
+        updated = sum(1 for result in results if result['ok'])
+        set_span_attributes({
+            "app.operation": "orders.bulk_update_status",
+            "orders.requested": len(updates),
+            "orders.updated": updated,
+        })
+        return Response({'updated': updated, 'failed': len(results) - updated, 'results': results})
@@ -45,6 +45,14 @@ class Payment(TimeStampedModel):
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
         ordering = ['-payment_date']
+        constraints = [
+            # Backstop for Idempotency-Key retries whose stored response expired.
+            models.UniqueConstraint(
+                fields=['order', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='unique_order_payment_idempotency_key',
+            ),
+        ]
     
     def __str__(self):
         return f"Payment {self.transaction_id} - {self.order.order_number}"
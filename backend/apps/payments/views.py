@@ -8,6 +8,8 @@ from rest_framework.response import Response
 from rest_framework.throttling import UserRateThrottle
 from rest_framework import serializers
 
+from django.db import IntegrityError, transaction
+from apps.idempotency.decorators import idempotent, request_key
 from apps.orders.models import Order
 from utils.logging_utils import log_payment_failure
 from utils.otel_utils import add_span_event, record_span_error, set_span_attributes
@@ -26,6 +28,19 @@ class PaymentRateThrottle(UserRateThrottle):
     scope = 'payment'
 
 
+def _existing_payment(user, idempotency_key):
+    return Payment.objects.filter(order__user=user, idempotency_key=idempotency_key).first()
+
+
+def _replay_payment(payment, base_attrs):
+    try:
+        payment_success_counter.add(1, {**base_attrs, "idempotent": True})
+    except Exception:
+        pass
+    add_span_event("payment.idempotent_hit", {"payment_id": payment.id})
+    return Response(PaymentSerializer(payment).data, status=status.HTTP_200_OK)
+
+
 class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -50,29 +65,20 @@ class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
         ).order_by('-created_at', '-id')
 
     @action(detail=False, methods=['post'], throttle_classes=[PaymentRateThrottle])
+    @idempotent('payments.create_for_order')
     def create_for_order(self, request):
-        """Create payment for order with idempotency support."""
+        """Create payment for order; retries with the same Idempotency-Key replay the response."""
         start_time = time.monotonic()
         base_attrs = {"endpoint": "payments.create_for_order"}
 
-        # Check for idempotency key
-        idempotency_key = request.headers.get('Idempotency-Key') or request.data.get('idempotency_key')
-        
+        # Backstop for keys whose stored response has expired or been purged:
+        # the payment carries the key, so a late retry gets that payment back.
+        idempotency_key = request_key(request)
+        idempotency_key = str(idempotency_key) if idempotency_key else None
         if idempotency_key:
-            # Check if payment with this idempotency key already exists
-            existing_payment = Payment.objects.filter(
-                order__user=request.user,
-                idempotency_key=idempotency_key
-            ).first()
-            
-            if existing_payment:
-                # Return existing payment (idempotent response)
-                try:
-                    payment_success_counter.add(1, {**base_attrs, "idempotent": True})
-                except Exception:
-                    pass
-                add_span_event("payment.idempotent_hit", {"payment_id": existing_payment.id})
-                return Response(PaymentSerializer(existing_payment).data, status=status.HTTP_200_OK)
+            existing_payment = _existing_payment(request.user, idempotency_key)
+            if existing_payment is not None:
+                return _replay_payment(existing_payment, base_attrs)
 
         serializer = CreatePaymentSerializer(data=request.data, context={'request': request})
         try:
@@ -125,14 +131,22 @@ class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        payment = Payment.objects.create(
-            order=order,
-            payment_method=payment_method,
-            transaction_id=f"TX-{uuid.uuid4().hex}",
-            amount=order.total,
-            status='pending',
-            idempotency_key=idempotency_key,  # Save idempotency key
-        )
+        try:
+            with transaction.atomic():
+                payment = Payment.objects.create(
+                    order=order,
+                    payment_method=payment_method,
+                    transaction_id=f"TX-{uuid.uuid4().hex}",
+                    amount=order.total,
+                    status='pending',
+                    idempotency_key=idempotency_key,
+                )
+        except IntegrityError:
+            # A concurrent retry with the same key created it first.
+            existing_payment = _existing_payment(request.user, idempotency_key) if idempotency_key else None
+            if existing_payment is None:
+                raise
+            return _replay_payment(existing_payment, base_attrs)
 
         try:
             payment_created_counter.add(1, {**base_attrs, "payment_method": payment_method})
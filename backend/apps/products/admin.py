@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Category, Brand, Product, ProductImage, ProductVariant, ProductAttribute
+from .models import (
+    Category, Brand, Product, ProductImage, ProductVariant, ProductAttribute, StockMovement, StockReservation,
+)
 
 
 class ProductImageInline(admin.TabularInline):
@@ -65,3 +67,29 @@ class ProductImageAdmin(admin.ModelAdmin):
     list_display = ['product', 'is_primary', 'order']
     list_filter = ['is_primary']
     search_fields = ['product__name', 'alt_text']
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['product', 'variant', 'quantity', 'status', 'cart', 'order', 'expires_at']
+    list_filter = ['status']
+    search_fields = ['product__name', 'product__sku']
+    raw_id_fields = ['product', 'variant', 'cart', 'order']
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    """Read-only: the ledger is append-only; adjust stock on the product instead."""
+    list_display = ['created_at', 'product', 'variant', 'quantity', 'reason', 'order']
+    list_filter = ['reason']
+    search_fields = ['product__name', 'product__sku']
+    raw_id_fields = ['product', 'variant', 'order']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,194 @@
+"""
+Versioned read-through cache for public catalog responses.
+
+Payloads are stored under the current catalog version. Catalog edits (a
+product, category, brand or related row saved through the ORM, see
+``signals.py``) bump the version, which makes every previously cached entry
+unreachable at once; the cache backend evicts the orphans on its own (LRU for
+local memory, TTL for Redis).
+
+Detail entries also record the version of their own product. High-volume
+writes that change one product's detail but not the list cards (stock moving
+without running out or coming back, rating aggregates) call
+``invalidate_products()``, which bumps only those products' versions, so
+checkout and review traffic doesn't keep the whole catalog cold. List cards
+show ratings, which may therefore lag by up to ``CATALOG_CACHE_TIMEOUT``.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from utils.telemetry import cache_hit_counter, cache_miss_counter
+
+
+VERSION_KEY = 'catalog:version'
+
+
+def product_version_key(pk) -> str:
+    return f'catalog:product:{pk}:version'
+
+
+def get_catalog_cache():
+    """Return the cache backend configured for catalog responses."""
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def catalog_cache_enabled() -> bool:
+    return bool(getattr(settings, 'CATALOG_CACHE_ENABLED', False))
+
+
+def _initial_version() -> int:
+    # Seed from the clock so a version key lost to eviction or a cache
+    # restart can never fall back onto versions that were used before.
+    return int(time.time() * 1000)
+
+
+def _get_version(key) -> int:
+    cache = get_catalog_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key) or _initial_version()
+    return int(version)
+
+
+def get_catalog_version() -> int:
+    """Return the current catalog version, initialising it if missing."""
+    return _get_version(VERSION_KEY)
+
+
+def get_product_version(pk) -> int:
+    """Return the current version of one product's detail entries."""
+    return _get_version(product_version_key(pk))
+
+
+def _bump(*keys) -> None:
+    cache = get_catalog_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), timeout=None)
+
+
+def _bump_catalog_version() -> None:
+    _bump(VERSION_KEY)
+
+
+def invalidate_catalog() -> None:
+    """Invalidate every cached catalog response.
+
+    The version is bumped immediately and again once the surrounding
+    transaction commits, so a reader that re-populated the cache from
+    pre-commit data cannot keep serving it.
+    """
+    _bump_catalog_version()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(_bump_catalog_version)
+
+
+def invalidate_products(pks) -> None:
+    """Invalidate the cached detail responses of products ``pks`` only.
+
+    For writes that leave list cards as they were; bumped now and on commit,
+    like ``invalidate_catalog()``.
+    """
+    keys = [product_version_key(pk) for pk in set(pks)]
+    if not keys:
+        return
+    _bump(*keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(*keys))
+
+
+def build_cache_key(namespace: str, request) -> str:
+    """Build a cache key from the request's host, path and query string.
+
+    Query parameters are sorted so equivalent filter sets, orderings and
+    pages share an entry regardless of parameter order.
+    """
+    query = sorted(
+        (key, tuple(sorted(values)))
+        for key, values in request.query_params.lists()
+    )
+    raw = f"{request.scheme}://{request.get_host()}{request.path}?{query!r}"
+    digest = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    return f"catalog:{namespace}:{digest}"
+
+
+def _record(counter, attrs: dict) -> None:
+    try:
+        counter.add(1, attrs)
+    except Exception:
+        pass
+
+
+class CatalogCacheMixin:
+    """Serve ``list`` and ``retrieve`` from the versioned catalog cache.
+
+    Detail entries are stored as ``{'product': pk, 'version': ..., 'data': ...}``
+    and only served while that product's version is unchanged. The version is
+    read before the response is built, so a miss first resolves the lookup
+    value to a pk: from ``catalog:<namespace>:pk:<value>``, or with one
+    indexed query.
+    """
+
+    cache_namespace = 'products'
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response('list', super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response('retrieve', super().retrieve, request, *args, **kwargs)
+
+    def _cached_response(self, action_name, handler, request, *args, **kwargs):
+        if not catalog_cache_enabled():
+            return handler(request, *args, **kwargs)
+
+        cache = get_catalog_cache()
+        version = get_catalog_version()
+        key = build_cache_key(f"{self.cache_namespace}:{action_name}", request)
+        attrs = {"cache": "catalog", "view": f"{self.cache_namespace}.{action_name}"}
+        detail = action_name == 'retrieve'
+
+        entry = cache.get(key, version=version)
+        if detail and entry is not None and entry['version'] != get_product_version(entry['product']):
+            entry = None
+        if entry is not None:
+            _record(cache_hit_counter, attrs)
+            return Response(entry['data'] if detail else entry, headers={'X-Cache': 'HIT'})
+
+        _record(cache_miss_counter, attrs)
+        if detail:
+            lookup_value = kwargs[self.lookup_url_kwarg or self.lookup_field]
+            pk = self._cached_pk(cache, lookup_value)
+            product_version = get_product_version(pk) if pk is not None else None
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+            if not detail:
+                cache.set(key, response.data, timeout=timeout, version=version)
+            elif response.data['id'] == pk:
+                entry = {'product': pk, 'version': product_version, 'data': response.data}
+                cache.set(key, entry, timeout=timeout, version=version)
+            else:
+                # The lookup value moved to another product; cache it next time.
+                cache.set(self._pk_key(lookup_value), response.data['id'], timeout=None)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def _pk_key(self, value):
+        return f"catalog:{self.cache_namespace}:pk:{value}"
+
+    def _cached_pk(self, cache, value):
+        key = self._pk_key(value)
+        pk = cache.get(key)
+        if pk is None:
+            pk = self.get_queryset().filter(**{self.lookup_field: value}).values_list('pk', flat=True).first()
+            if pk is not None:
+                cache.set(key, pk, timeout=None)
+        return pk
@@ -0,0 +1,244 @@
+"""
+Facet counts for product listings.
+
+``FacetEngine.compute()`` returns category, brand, price band, availability
+and attribute counts for a filtered product queryset in one SQL statement:
+a CTE over the filtered rows with one grouped branch per facet, combined
+with ``UNION ALL``.
+
+Counts are cached per filter signature under a generation number. A change
+that alters what a product contributes (it runs out or comes back, is
+(de)activated, created or deleted, or moves between price, category, brand or
+attribute buckets) starts a new generation with one atomic ``incr``; stock
+moving without crossing zero leaves the counts alone. Cached counts are never
+patched in place, so concurrent saves can't lose each other's updates.
+"""
+import hashlib
+import json
+import time
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from .models import Category, Brand, Product, ProductAttribute
+
+
+FACET_CATEGORY = 'category'
+FACET_BRAND = 'brand'
+FACET_PRICE = 'price'
+FACET_AVAILABILITY = 'availability'
+FACET_ATTRIBUTE = 'attribute'
+
+# Query parameters that do not change which products are counted.
+NON_FILTER_PARAMS = {'page', 'page_size', 'ordering', 'cursor', 'format'}
+
+ATTRIBUTE_SEPARATOR = '\x1f'
+GENERATION_KEY = 'facets:generation'
+
+
+def _price_band_labels(bounds: List[Decimal]) -> List[str]:
+    labels = [f"{low}-{high}" for low, high in zip(bounds, bounds[1:])]
+    labels.append(f"{bounds[-1]}+")
+    return labels
+
+
+class FacetEngine:
+    def __init__(self, cache=None, price_bands=None, timeout=None):
+        self.cache = cache or caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+        bands = price_bands or getattr(settings, 'PRODUCT_FACET_PRICE_BANDS', [0, 25, 50, 100, 250, 500])
+        self.price_bounds = [Decimal(str(b)) for b in bands]
+        self.price_labels = _price_band_labels(self.price_bounds)
+        self.timeout = timeout or getattr(settings, 'PRODUCT_FACET_CACHE_TIMEOUT', 600)
+
+    # -- signatures and cache keys -------------------------------------
+
+    @staticmethod
+    def filter_params(query_params) -> Dict[str, List[str]]:
+        """Reduce request query params to the ones that select products."""
+        return {
+            key: sorted(values)
+            for key, values in query_params.lists()
+            if key not in NON_FILTER_PARAMS
+        }
+
+    @staticmethod
+    def signature(params: Dict[str, List[str]]) -> str:
+        raw = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _generation(self) -> int:
+        generation = self.cache.get(GENERATION_KEY)
+        if generation is None:
+            # Clock-seeded so a lost key never revives an older generation.
+            self.cache.add(GENERATION_KEY, int(time.time() * 1000), timeout=None)
+            generation = self.cache.get(GENERATION_KEY) or int(time.time() * 1000)
+        return int(generation)
+
+    def _entry_key(self, generation: int, signature: str) -> str:
+        return f"facets:{generation}:{signature}"
+
+    def invalidate(self) -> None:
+        """Drop every cached facet entry by starting a new generation."""
+        try:
+            self.cache.incr(GENERATION_KEY)
+        except ValueError:
+            self.cache.set(GENERATION_KEY, int(time.time() * 1000), timeout=None)
+
+    # -- computing -------------------------------------------------------
+
+    def _price_case(self, column: str):
+        # Bounds are Decimals parsed from settings, so inlining them is safe
+        # and keeps the comparison numeric on every backend.
+        sql, params = 'CASE', []
+        for high, label in zip(self.price_bounds[1:], self.price_labels):
+            sql += f' WHEN {column} < {high} THEN %s'
+            params.append(label)
+        sql += ' ELSE %s END'
+        params.append(self.price_labels[-1])
+        return sql, params
+
+    def compute(self, queryset) -> Dict[str, Dict[str, list]]:
+        """Count every facet for ``queryset`` in a single statement."""
+        base = queryset.order_by().values('id', 'category_id', 'brand_id', 'price', 'stock')
+        base_sql, base_params = base.query.get_compiler(using=queryset.db).as_sql()
+        connection = connections[queryset.db]
+        qn = connection.ops.quote_name
+        categories = qn(Category._meta.db_table)
+        brands = qn(Brand._meta.db_table)
+        attributes = qn(ProductAttribute._meta.db_table)
+        price_case, price_params = self._price_case('f.price')
+
+        sql = (
+            f"WITH filtered AS ({base_sql}) "
+            f"SELECT %s, CAST(f.category_id AS TEXT), c.name, COUNT(*) FROM filtered f "
+            f"JOIN {categories} c ON c.id = f.category_id GROUP BY f.category_id, c.name "
+            f"UNION ALL "
+            f"SELECT %s, CAST(f.brand_id AS TEXT), b.name, COUNT(*) FROM filtered f "
+            f"JOIN {brands} b ON b.id = f.brand_id GROUP BY f.brand_id, b.name "
+            f"UNION ALL "
+            f"SELECT %s, {price_case}, NULL, COUNT(*) FROM filtered f GROUP BY 2 "
+            f"UNION ALL "
+            f"SELECT %s, CASE WHEN f.stock > 0 THEN 'in_stock' ELSE 'out_of_stock' END, NULL, COUNT(*) "
+            f"FROM filtered f GROUP BY 2 "
+            f"UNION ALL "
+            f"SELECT %s, a.name, a.value, COUNT(DISTINCT f.id) FROM filtered f "
+            f"JOIN {attributes} a ON a.product_id = f.id GROUP BY a.name, a.value"
+        )
+        params = [
+            *base_params,
+            FACET_CATEGORY,
+            FACET_BRAND,
+            FACET_PRICE, *price_params,
+            FACET_AVAILABILITY,
+            FACET_ATTRIBUTE,
+        ]
+
+        counts = {facet: {} for facet in (
+            FACET_CATEGORY, FACET_BRAND, FACET_PRICE, FACET_AVAILABILITY, FACET_ATTRIBUTE,
+        )}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            for facet, key, label, count in cursor.fetchall():
+                if facet == FACET_ATTRIBUTE:
+                    key, label = f"{key}{ATTRIBUTE_SEPARATOR}{label}", None
+                counts[facet][key] = [label, int(count)]
+        return counts
+
+    def get_counts(self, query_params, get_queryset) -> dict:
+        """Return rendered facet counts for the filters in ``query_params``.
+
+        ``get_queryset`` builds the filtered queryset and is only called on a
+        cache miss, so a hit costs no queries at all (filter validation
+        included).
+        """
+        params = self.filter_params(query_params)
+        signature = self.signature(params)
+        generation = self._generation()
+        key = self._entry_key(generation, signature)
+
+        counts = self.cache.get(key)
+        if counts is None:
+            counts = self.compute(get_queryset())
+            self.cache.set(key, counts, timeout=self.timeout)
+        return self.render(counts)
+
+    def render(self, counts) -> dict:
+        def ordered(bucket):
+            return sorted(bucket.items(), key=lambda item: (-item[1][1], item[0]))
+
+        attributes = {}
+        for key, (_, count) in ordered(counts[FACET_ATTRIBUTE]):
+            name, value = key.split(ATTRIBUTE_SEPARATOR, 1)
+            attributes.setdefault(name, []).append({'value': value, 'count': count})
+
+        price_bands = []
+        bounds = self.price_bounds + [None]
+        for low, high, label in zip(bounds, bounds[1:], self.price_labels):
+            entry = counts[FACET_PRICE].get(label)
+            if entry:
+                price_bands.append({
+                    'key': label,
+                    'min': str(low),
+                    'max': str(high) if high is not None else None,
+                    'count': entry[1],
+                })
+
+        return {
+            'categories': [
+                {'id': int(key), 'name': label, 'count': count}
+                for key, (label, count) in ordered(counts[FACET_CATEGORY])
+            ],
+            'brands': [
+                {'id': int(key), 'name': label, 'count': count}
+                for key, (label, count) in ordered(counts[FACET_BRAND])
+            ],
+            'price_bands': price_bands,
+            'availability': {
+                'in_stock': counts[FACET_AVAILABILITY].get('in_stock', [None, 0])[1],
+                'out_of_stock': counts[FACET_AVAILABILITY].get('out_of_stock', [None, 0])[1],
+            },
+            'attributes': [
+                {'name': name, 'values': values} for name, values in attributes.items()
+            ],
+        }
+
+    # -- invalidation on product changes --------------------------------
+
+    @staticmethod
+    def _availability(state: Optional[dict]) -> Optional[bool]:
+        """The availability bucket a product snapshot is counted in (``None``: not counted)."""
+        if state is None or not state.get('is_active'):
+            return None
+        return state['stock'] > 0
+
+    def apply_product_change(self, before: Optional[dict], after: Optional[dict]) -> None:
+        """Account for a stock/``is_active`` change between two product snapshots.
+
+        ``before``/``after`` are ``snapshot()`` dicts; ``None`` stands for "not
+        counted" (created or deleted). Starts a new generation only if the
+        product entered, left or changed its availability bucket.
+        """
+        if self._availability(before) != self._availability(after):
+            self.invalidate()
+
+
+# Fields whose change only moves a product in or out of the counts.
+INCREMENTAL_FIELDS = ('stock', 'is_active')
+# Fields whose change moves a product between buckets.
+BUCKET_FIELDS = ('price', 'category_id', 'brand_id', 'is_featured')
+SNAPSHOT_FIELDS = ('id',) + INCREMENTAL_FIELDS + BUCKET_FIELDS
+
+
+def snapshot(product: Product) -> dict:
+    # to_python() so an unsaved '45.00' compares equal to the stored Decimal.
+    return {
+        field: Product._meta.get_field(field).to_python(getattr(product, field))
+        for field in SNAPSHOT_FIELDS
+    }
+
+
+def get_facet_engine() -> FacetEngine:
+    return FacetEngine()
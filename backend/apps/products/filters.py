@@ -0,0 +1,62 @@
+import django_filters
+from rest_framework import filters
+
+from .models import Product
+from .search import get_search_engine
+from .tree import get_category_tree
+
+
+class ProductFilter(django_filters.FilterSet):
+    category_tree = django_filters.CharFilter(method='filter_category_tree')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'brand', 'is_featured']
+
+    def filter_category_tree(self, queryset, name, value):
+        """Products in the category with slug ``value`` or any subcategory."""
+        node = get_category_tree().get_by_slug(value)
+        if node is None:
+            return queryset.none()
+        if not node.path:
+            return queryset.filter(category_id__in=get_category_tree().descendant_ids(node.id))
+        return queryset.filter(category__path__startswith=node.path)
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """``?search=`` backed by the full-text engine.
+
+    A query that exactly matches a SKU short-circuits to that product through
+    the unique index. Without a usable engine this falls back to DRF's
+    ``icontains`` matching over ``search_fields``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+
+        if ' ' not in query:
+            sku_match = queryset.filter(sku__in={query, query.upper()})
+            if sku_match.exists():
+                return sku_match
+
+        engine = get_search_engine(queryset.db)
+        if engine is None:
+            return super().filter_queryset(request, queryset, view)
+        return engine.search(queryset, query)
+
+
+class SearchRankOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter that sorts search results by relevance by default.
+
+    An explicit ``?ordering=`` still wins over the rank.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get(self.ordering_param):
+            return super().get_ordering(request, queryset, view)
+        ordering = list(self.get_default_ordering(view) or [])
+        if 'search_rank' in queryset.query.extra_select:
+            return ['-search_rank', *ordering]
+        return ordering
@@ -0,0 +1,109 @@
+"""
+Stock ledger: every change to stock as an append-only ``StockMovement``.
+
+``Product.stock`` and ``ProductVariant.stock`` stay the columns checkout
+decrements and the catalog reads; they are a cache of the ledger. Whatever
+writes one writes the other in the same transaction:
+
+- checkout (``stock.decrement_stock``): one ``checkout`` movement per
+  product/variant, negative;
+- cancellation and refund (``stock.restock_orders``): what the order's
+  movements took out, put back once;
+- saving a Product/ProductVariant with a different ``stock`` (admin, API):
+  an ``initial`` or ``adjustment`` movement for the difference.
+
+The level the ledger implies is the item's latest ``StockSnapshot`` plus the
+``SUM`` of its movements after that snapshot, so it never scans an item's full
+history. ``take_snapshot()`` (``manage.py snapshot_stock_ledger``) folds new
+movements into snapshots; ``manage.py reconcile_stock`` compares the cached
+columns with the ledger in bulk.
+
+Snapshots are taken up to the newest movement older than ``STOCK_SNAPSHOT_LAG``
+seconds: ids are assigned at insert, so a movement in a transaction that is
+still open could otherwise commit with an id below the snapshot's mark.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from typing import Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ProductVariant, StockMovement, StockSnapshot
+
+
+def record_movements(entries: Iterable[Tuple[int, Optional[int], int]], reason: str, order_id=None) -> int:
+    """Append one movement per ``(product_id, variant_id)`` of ``(product_id, variant_id, quantity)`` entries."""
+    totals = defaultdict(int)
+    for product_id, variant_id, quantity in entries:
+        totals[(product_id, variant_id or None)] += quantity
+    movements = [
+        StockMovement(product_id=product_id, variant_id=variant_id, quantity=quantity,
+                      reason=reason, order_id=order_id)
+        for (product_id, variant_id), quantity in totals.items()
+        if quantity
+    ]
+    StockMovement.objects.bulk_create(movements)
+    return len(movements)
+
+
+def _for_item(queryset, model):
+    """Ledger rows of the ``model`` row referenced by ``OuterRef('pk')``."""
+    if model is ProductVariant:
+        return queryset.filter(variant=OuterRef('pk'))
+    return queryset.filter(product=OuterRef('pk'), variant__isnull=True)
+
+
+def with_ledger_level(queryset):
+    """Annotate Product/ProductVariant rows with ``ledger_level``: snapshot + later movements."""
+    model = queryset.model
+    latest = _for_item(StockSnapshot.objects, model).order_by('-movement_id')
+    group = 'variant' if model is ProductVariant else 'product'
+    moved = _for_item(StockMovement.objects, model).filter(
+        id__gt=OuterRef('ledger_mark'),
+    ).values(group).annotate(total=Sum('quantity')).values('total')
+    return queryset.annotate(
+        ledger_mark=Coalesce(Subquery(latest.values('movement_id')[:1]), Value(0)),
+        ledger_base=Coalesce(Subquery(latest.values('level')[:1]), Value(0)),
+    ).annotate(
+        ledger_level=F('ledger_base') + Coalesce(Subquery(moved, output_field=IntegerField()), Value(0)),
+    )
+
+
+def snapshot_lag() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'STOCK_SNAPSHOT_LAG', 60))
+
+
+def take_snapshot(lag: Optional[timedelta] = None, batch_size: int = 1000) -> Tuple[int, int]:
+    """Fold movements since the last run into snapshots; returns ``(mark, items written)``."""
+    if lag is None:
+        lag = snapshot_lag()
+    previous = StockSnapshot.objects.aggregate(mark=Max('movement_id'))['mark'] or 0
+    mark = StockMovement.objects.filter(
+        id__gt=previous, created_at__lte=timezone.now() - lag,
+    ).aggregate(mark=Max('id'))['mark']
+    if mark is None:
+        return previous, 0
+
+    # Every item's latest snapshot is at or before ``previous``, so its level
+    # plus the movements in (previous, mark] is the level at ``mark``.
+    window = StockMovement.objects.filter(id__gt=previous, id__lte=mark)
+    latest = StockSnapshot.objects.order_by('-movement_id').values('level')
+    per_product = window.filter(variant__isnull=True).values('product_id').annotate(
+        base=Subquery(latest.filter(product=OuterRef('product_id'), variant__isnull=True)[:1]),
+    )
+    per_variant = window.filter(variant__isnull=False).values('product_id', 'variant_id').annotate(
+        base=Subquery(latest.filter(variant=OuterRef('variant_id'))[:1]),
+    )
+    snapshots = [
+        StockSnapshot(product_id=row['product_id'], variant_id=row.get('variant_id'),
+                      level=(row['base'] or 0) + row['total'], movement_id=mark)
+        for rows in (per_product, per_variant)
+        for row in rows.annotate(total=Sum('quantity')).order_by()
+    ]
+    with transaction.atomic():
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=batch_size)
+    return mark, len(snapshots)
@@ -0,0 +1,84 @@
+from urllib.parse import parse_qs, urlparse
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.pagination import Cursor
+from rest_framework.test import APIRequestFactory
+
+from apps.products.models import Category, Product
+from apps.products.views import ProductViewSet
+from utils.benchmark import Rollback, format_row, measure
+from utils.pagination import KeysetCursorPagination
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare page-number and cursor pagination latency on the product list '
+        'for the first and a deep page. Seeded rows are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=25000, help='Products to seed (default: 25000)')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--page', type=int, default=1000, help='Deep page to measure (default: 1000)')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic(), override_settings(CATALOG_CACHE_ENABLED=False, ALLOWED_HOSTS=['*']):
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, rows):
+        category = Category.objects.create(name='Bench pagination', slug='bench-pagination')
+        Product.objects.bulk_create(
+            (
+                Product(
+                    name=f'Bench {i}', slug=f'bench-pagination-{i}', description='', category=category,
+                    sku=f'BENCH-PAGE-{i}', price='10.00', stock=1,
+                )
+                for i in range(rows)
+            ),
+            batch_size=1000,
+        )
+
+    def _cursor_for_page(self, page, page_size):
+        """Encode the cursor a client would hold after walking to ``page``."""
+        if page <= 1:
+            return ''
+        paginator = KeysetCursorPagination()
+        paginator.base_url = 'http://localhost/api/v1/products/'
+        boundary = (
+            Product.objects.filter(is_active=True)
+            .order_by(*paginator.ordering)
+            .values('created_at', 'id')[(page - 1) * page_size - 1]
+        )
+        position = paginator._get_position_from_instance(boundary, paginator.ordering)
+        url = paginator.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+        return parse_qs(urlparse(url).query)['cursor'][0]
+
+    def _run(self, options):
+        rows, page_size, deep_page = options['rows'], options['page_size'], options['page']
+        deep_page = max(1, min(deep_page, rows // page_size))
+        self._seed(rows)
+
+        factory = APIRequestFactory()
+        view = ProductViewSet.as_view({'get': 'list'})
+
+        def request(params):
+            def call():
+                response = view(factory.get('/api/v1/products/', params, HTTP_HOST='localhost'))
+                assert response.status_code == 200, response.status_code
+            return call
+
+        self.stdout.write(f'{rows} products, page_size={page_size}, deep page={deep_page}')
+        for label, page in (('page 1', 1), (f'page {deep_page}', deep_page)):
+            stats = measure(request({'page': page, 'page_size': page_size}), repeat=options['repeat'])
+            self.stdout.write(format_row(f'page-number {label}', stats))
+        for label, page in (('page 1', 1), (f'page {deep_page}', deep_page)):
+            cursor = self._cursor_for_page(page, page_size)
+            stats = measure(request({'cursor': cursor, 'page_size': page_size}), repeat=options['repeat'])
+            self.stdout.write(format_row(f'cursor {label}', stats))
@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from apps.products.models import (
+    Category, Brand, Product, ProductImage, ProductVariant, ProductAttribute,
+)
+from apps.products.serializers import ProductListSerializer, ProductSerializer
+from utils.benchmark import Rollback, format_row, measure
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare payload size and serialization time of a product list page with '
+        'the full ProductSerializer and the compact ProductListSerializer. '
+        'Seeded rows are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=200, help='Products to seed (default: 200)')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=30)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, count):
+        category = Category.objects.create(name='Bench list', slug='bench-list')
+        brand = Brand.objects.create(name='Bench list brand', slug='bench-list-brand')
+        products = Product.objects.bulk_create(
+            Product(
+                name=f'Bench list {i}', slug=f'bench-list-{i}', category=category, brand=brand,
+                sku=f'BENCH-LIST-{i}', price='19.99', compare_price='24.99', cost_price='9.00',
+                stock=i % 7, description='Lorem ipsum dolor sit amet. ' * 80,
+                short_description='Short description ' * 10,
+            )
+            for i in range(count)
+        )
+        if not products or products[0].pk is None:
+            products = list(Product.objects.filter(category=category))
+        ProductImage.objects.bulk_create(
+            ProductImage(product=p, image=f'products/bench-{p.pk}-{n}.jpg', is_primary=n == 0, order=n)
+            for p in products for n in range(4)
+        )
+        ProductVariant.objects.bulk_create(
+            ProductVariant(product=p, name='Size', value=size, sku=f'BENCH-LIST-{p.pk}-{size}', stock=3)
+            for p in products for size in ('S', 'M', 'L')
+        )
+        ProductAttribute.objects.bulk_create(
+            ProductAttribute(product=p, name=name, value='value')
+            for p in products for name in ('Material', 'Origin', 'Care', 'Fit')
+        )
+
+    def _run(self, options):
+        self._seed(options['products'])
+        page_size = options['page_size']
+        renderer = JSONRenderer()
+
+        def full():
+            queryset = Product.objects.filter(is_active=True).select_related(
+                'category', 'brand'
+            ).prefetch_related('images', 'variants', 'attributes').order_by('-created_at', '-id')
+            return renderer.render(ProductSerializer(queryset[:page_size], many=True).data)
+
+        def compact():
+            queryset = Product.objects.filter(is_active=True).select_related(
+                'category', 'brand'
+            ).prefetch_related(
+                Prefetch('images', queryset=ProductImage.objects.filter(is_primary=True), to_attr='primary_images')
+            ).defer('description', 'short_description').order_by('-created_at', '-id')
+            return renderer.render(ProductListSerializer(queryset[:page_size], many=True).data)
+
+        self.stdout.write(f'{page_size} products per page')
+        for label, fn in (('ProductSerializer', full), ('ProductListSerializer', compact)):
+            size = len(fn())
+            stats = measure(fn, repeat=options['repeat'])
+            self.stdout.write(f'{format_row(label, stats)}  payload={size} bytes')
@@ -0,0 +1,117 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction, DatabaseError
+
+from apps.products.models import Category, Product
+from apps.products.stock import InsufficientStock, StockLine, decrement_stock
+from utils.benchmark import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Run N parallel checkouts against one SKU with the legacy '
+        'select_for_update/save decrement and with the conditional bulk UPDATE, '
+        'and report throughput, latency and oversell. Needs a database that '
+        'other threads can see (not an in-memory SQLite test database); seeded '
+        'rows are committed and deleted afterwards. On SQLite writers are '
+        'serialized by the database lock and select_for_update is a no-op, so '
+        'row-lock contention is only representative on PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent checkouts (default: 16)')
+        parser.add_argument('--checkouts', type=int, default=200, help='Checkouts per strategy (default: 200)')
+        parser.add_argument('--stock', type=int, default=None, help='Initial stock (default: checkouts // 2)')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per checkout (default: 1)')
+        parser.add_argument(
+            '--work-ms', type=float, default=2.0,
+            help='Other work per checkout transaction, e.g. order inserts (default: 2)',
+        )
+
+    def handle(self, *args, **options):
+        stock = options['stock'] if options['stock'] is not None else options['checkouts'] // 2
+        category = Category.objects.create(name='Bench stock', slug=f'bench-stock-{uuid.uuid4().hex[:8]}')
+        try:
+            self.stdout.write(
+                f"{options['checkouts']} checkouts x {options['quantity']} unit(s), "
+                f"{options['workers']} workers, initial stock {stock}"
+            )
+            for label, strategy in (('select_for_update + save', self._locked), ('conditional UPDATE', self._conditional)):
+                product = Product.objects.create(
+                    name='Bench stock', slug=f'bench-stock-{uuid.uuid4().hex}', category=category,
+                    sku=f'BENCH-STOCK-{uuid.uuid4().hex[:12]}', price='1.00', stock=stock,
+                )
+                self._run(label, strategy, product, stock, options)
+        finally:
+            Product.objects.filter(category=category).delete()
+            category.delete()
+
+    @staticmethod
+    def _locked(product_id, quantity, work):
+        with transaction.atomic():
+            product = Product.objects.select_for_update().get(pk=product_id)
+            if product.stock < quantity:
+                return False
+            work()
+            product.stock -= quantity
+            product.save(update_fields=['stock'])
+        return True
+
+    @staticmethod
+    def _conditional(product_id, quantity, work):
+        try:
+            with transaction.atomic():
+                work()
+                decrement_stock([StockLine(product_id, product_id, None, quantity)])
+        except InsufficientStock:
+            return False
+        return True
+
+    def _run(self, label, strategy, product, stock, options):
+        quantity = options['quantity']
+        pending = list(range(options['checkouts']))
+        lock = threading.Lock()
+        latencies, outcomes = [], {'ok': 0, 'rejected': 0, 'errors': 0}
+
+        def work():
+            time.sleep(options['work_ms'] / 1000.0)
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        if not pending:
+                            return
+                        pending.pop()
+                    start = time.perf_counter()
+                    try:
+                        outcome = 'ok' if strategy(product.pk, quantity, work) else 'rejected'
+                    except DatabaseError:
+                        outcome = 'errors'
+                    elapsed = (time.perf_counter() - start) * 1000.0
+                    with lock:
+                        latencies.append(elapsed)
+                        outcomes[outcome] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['workers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        product.refresh_from_db(fields=['stock'])
+        sold = outcomes['ok'] * quantity
+        oversold = max(0, sold - stock)
+        self.stdout.write(
+            f"{label:<26} {len(latencies) / wall:8.1f} checkouts/s  "
+            f"p50={percentile(latencies, 50):8.2f}ms  p99={percentile(latencies, 99):8.2f}ms  "
+            f"ok={outcomes['ok']} rejected={outcomes['rejected']} errors={outcomes['errors']}  "
+            f"final_stock={product.stock} oversold={oversold}"
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.cache import invalidate_catalog
+from apps.products.models import Category
+from apps.products.tree import invalidate_category_tree
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized path and depth of every category from its parent'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild (default: default)')
+
+    def handle(self, *args, **options):
+        total = Category.objects.db_manager(options['database']).rebuild_tree()
+        invalidate_category_tree()
+        invalidate_catalog()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt paths for {total} categories'))
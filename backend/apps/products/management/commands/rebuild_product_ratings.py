@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.ratings import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute product rating aggregates (count, sum, per-star histogram) from approved reviews.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Products rewritten per batch (default: 1000)')
+
+    def handle(self, *args, **options):
+        written = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt ratings for {written} products'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.models import Product
+from apps.products.search import install_search_engine
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the product full-text index structures if needed (Postgres: column, '
+        'GIN index and trigger; SQLite: FTS5 table) and rebuild the index from the '
+        'products table. Search requests never create them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild (default: default)')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        engine = install_search_engine(using)
+        if engine is None:
+            raise CommandError('No full-text search engine is available for this database.')
+
+        engine.index_products()
+        total = Product.objects.using(using).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} products with {engine.__class__.__name__}'
+        ))
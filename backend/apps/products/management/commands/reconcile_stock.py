@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from apps.products.cache import invalidate_catalog, invalidate_products
+from apps.products.facets import get_facet_engine
+from apps.products.ledger import record_movements, with_ledger_level
+from apps.products.models import Product, ProductVariant, StockMovement
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare Product.stock and ProductVariant.stock with the levels implied by '
+        'the stock ledger, in batches of rows. Reports mismatches; --fix rewrites '
+        'the stock columns from the ledger, --backfill records adjustment movements '
+        'so the ledger matches the columns (for stock that predates the ledger).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows compared per query (default: 1000)')
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument('--fix', action='store_true', help='Set stock to the ledger level')
+        group.add_argument('--backfill', action='store_true', help='Record movements to match current stock')
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in (Product, ProductVariant):
+            mismatched = 0
+            for rows in self._mismatches(model, options['batch_size']):
+                mismatched += len(rows)
+                for pk, stock, level in rows[:10]:
+                    self.stdout.write(f'{model.__name__} {pk}: stock={stock} ledger={level}')
+                if options['fix']:
+                    self._fix(model, rows)
+                elif options['backfill']:
+                    self._backfill(model, rows)
+            self.stdout.write(f'{model.__name__}: {mismatched} mismatched')
+            total += mismatched
+
+        if total and not (options['fix'] or options['backfill']):
+            self.stdout.write(self.style.WARNING(f'{total} rows differ from the ledger'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Reconciled ({total} rows differed)'))
+
+    def _mismatches(self, model, batch_size):
+        """Yield lists of ``(pk, stock, ledger_level)`` that differ, one list per batch of rows."""
+        last_pk = 0
+        while True:
+            batch = list(model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                return
+            last_pk = batch[-1]
+            rows = list(
+                with_ledger_level(model.objects.filter(pk__in=batch))
+                .exclude(stock=F('ledger_level'))
+                .order_by('pk')
+                .values_list('pk', 'stock', 'ledger_level')
+            )
+            if rows:
+                yield rows
+
+    def _fix(self, model, rows):
+        with transaction.atomic():
+            for pk, _stock, level in rows:
+                model.objects.filter(pk=pk).update(stock=max(level, 0))
+        if model is ProductVariant:
+            invalidate_products(ProductVariant.objects.filter(pk__in=[r[0] for r in rows]).values_list(
+                'product_id', flat=True))
+            return
+        invalidate_products(pk for pk, _stock, _level in rows)
+        # Only products that ran out or came back change list cards and facets.
+        if any((stock > 0) != (level > 0) for _pk, stock, level in rows):
+            invalidate_catalog()
+            get_facet_engine().invalidate()
+
+    def _backfill(self, model, rows):
+        if model is ProductVariant:
+            products = dict(ProductVariant.objects.filter(pk__in=[r[0] for r in rows]).values_list('pk', 'product_id'))
+            entries = [(products[pk], pk, stock - level) for pk, stock, level in rows]
+        else:
+            entries = [(pk, None, stock - level) for pk, stock, level in rows]
+        record_movements(entries, StockMovement.REASON_ADJUSTMENT)
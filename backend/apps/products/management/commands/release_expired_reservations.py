@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = (
+        'Release stock reservations whose hold has expired. Runs once, or every '
+        '--interval seconds as a long-running sweeper.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows updated per statement (default: 1000)')
+        parser.add_argument('--interval', type=float, default=0, help='Repeat every N seconds (default: run once)')
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_expired(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Released {released} expired reservations'))
+            if options['interval'] <= 0:
+                return
+            time.sleep(options['interval'])
@@ -1,15 +1,53 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from utils.models import TimeStampedModel
 
 
+CATEGORY_PATH_SEPARATOR = '/'
+
+
+class CategoryManager(models.Manager):
+    def rebuild_tree(self):
+        """Recompute every category's ``path`` and ``depth`` from ``parent``."""
+        rows = {row['id']: row['parent_id'] for row in self.values('id', 'parent_id')}
+        paths = {}
+
+        def path_of(category_id, seen=()):
+            if category_id not in paths:
+                parent_id = rows[category_id]
+                if parent_id is None or parent_id in seen:
+                    prefix = ''
+                else:
+                    prefix = path_of(parent_id, seen + (category_id,))
+                paths[category_id] = f"{prefix}{category_id}{CATEGORY_PATH_SEPARATOR}"
+            return paths[category_id]
+
+        categories = list(self.only('id', 'path', 'depth'))
+        for category in categories:
+            category.path = path_of(category.id)
+            category.depth = category.path.count(CATEGORY_PATH_SEPARATOR) - 1
+        self.bulk_update(categories, ['path', 'depth'], batch_size=500)
+        return len(categories)
+
+
 class Category(TimeStampedModel):
-    """Product category model."""
+    """Product category model.
+
+    ``path`` materializes the position in the tree as the ids from the root
+    down to the category itself (``"1/4/9/"``), so a whole subtree is a
+    single indexed prefix match.
+    """
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(max_length=100, unique=True)
     description = models.TextField(blank=True)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    path = models.CharField(max_length=255, db_index=True, editable=False, default='')
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = CategoryManager()
     
     class Meta:
         db_table = 'categories'
@@ -20,6 +58,51 @@ class Category(TimeStampedModel):
     def __str__(self):
         return self.name
 
+    def is_descendant_of(self, other):
+        return bool(other.path) and self.path.startswith(other.path)
+
+    def save(self, *args, **kwargs):
+        parent = self.parent
+        if self.pk is not None and parent is not None and (
+            parent.pk == self.pk or (self.path and parent.is_descendant_of(self))
+        ):
+            raise ValueError('A category cannot be moved under itself or one of its descendants.')
+
+        with transaction.atomic(using=kwargs.get('using')):
+            old_path = self.path
+            super().save(*args, **kwargs)
+            new_path = f"{parent.path if parent else ''}{self.pk}{CATEGORY_PATH_SEPARATOR}"
+            if new_path == old_path:
+                return
+            new_depth = new_path.count(CATEGORY_PATH_SEPARATOR) - 1
+            if old_path:
+                # Re-root the whole subtree in one statement.
+                Category.objects.filter(path__startswith=old_path).update(
+                    path=Concat(Value(new_path), Substr('path', len(old_path) + 1),
+                                output_field=models.CharField()),
+                    depth=F('depth') + (new_depth - self.depth),
+                )
+            else:
+                Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+            self.path, self.depth = new_path, new_depth
+
+    def ancestors(self, include_self=False):
+        """Categories from the root down to this one, in one primary-key query."""
+        ids = [int(part) for part in self.path.split(CATEGORY_PATH_SEPARATOR) if part]
+        if not include_self:
+            ids = [pk for pk in ids if pk != self.pk]
+        return Category.objects.filter(pk__in=ids).order_by('depth')
+
+    def descendants(self, include_self=False):
+        """Every category below this one, in one indexed prefix query."""
+        if not self.path:
+            # Not materialized yet (see ``rebuild_category_tree``).
+            return Category.objects.filter(pk=self.pk) if include_self else Category.objects.none()
+        queryset = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+
 
 class Brand(TimeStampedModel):
     """Product brand model."""
@@ -57,12 +140,29 @@ class Product(TimeStampedModel):
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False)
     views_count = models.PositiveIntegerField(default=0)
+    # Approved-review aggregates, kept by apps.products.ratings from the
+    # review signals in apps.reviews.signals (never edited directly).
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         db_table = 'products'
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the storefront list.
+            models.Index(fields=['-created_at', '-id'], name='products_created_id_idx'),
+            # Storefront count and pages (WHERE is_active). Partial, because
+            # a bare boolean column cannot lead an index SQLite will search.
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_active=True),
+                         name='products_active_created_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -128,3 +228,129 @@ class ProductAttribute(TimeStampedModel):
     
     def __str__(self):
         return f"{self.product.name} - {self.name}"
+
+
+class StockReservation(TimeStampedModel):
+    """Quantity held for a cart or an order until ``expires_at``.
+
+    Active, unexpired holds are subtracted from stock to give the
+    available-to-sell figure (see ``apps.products.reservations``).
+    """
+    STATUS_ACTIVE = 'active'
+    STATUS_COMMITTED = 'committed'
+    STATUS_RELEASED = 'released'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, 'Active'),
+        (STATUS_COMMITTED, 'Committed'),
+        (STATUS_RELEASED, 'Released'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    variant = models.ForeignKey(
+        ProductVariant, on_delete=models.CASCADE, null=True, blank=True, related_name='reservations'
+    )
+    cart = models.ForeignKey(
+        'cart.Cart', on_delete=models.CASCADE, null=True, blank=True, related_name='stock_reservations'
+    )
+    order = models.ForeignKey(
+        'orders.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_reservations'
+    )
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'stock_reservations'
+        verbose_name = 'Stock Reservation'
+        verbose_name_plural = 'Stock Reservations'
+        indexes = [
+            # Available-to-sell: SUM(quantity) of active holds per product/variant.
+            # ``quantity`` is a trailing key column rather than ``include`` so the
+            # index is covering on every backend (SQLite has no INCLUDE).
+            models.Index(
+                fields=['product', 'variant', 'status', 'expires_at', 'quantity'],
+                name='reservations_active_idx',
+            ),
+            # Sweeper: oldest active holds first.
+            models.Index(fields=['status', 'expires_at'], name='reservations_sweep_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id}/{self.variant_id or '-'} ({self.status})"
+
+
+class StockMovement(models.Model):
+    """One change to a product's or variant's stock; never updated or deleted.
+
+    ``quantity`` is signed: sales are negative, restocks positive. ``stock``
+    on Product/ProductVariant is a cache of the sum of movements (see
+    ``apps.products.ledger``).
+    """
+    REASON_INITIAL = 'initial'
+    REASON_CHECKOUT = 'checkout'
+    REASON_CANCEL = 'cancel'
+    REASON_REFUND = 'refund'
+    REASON_ADJUSTMENT = 'adjustment'
+    REASON_CHOICES = [
+        (REASON_INITIAL, 'Initial stock'),
+        (REASON_CHECKOUT, 'Checkout'),
+        (REASON_CANCEL, 'Order cancelled'),
+        (REASON_REFUND, 'Order refunded'),
+        (REASON_ADJUSTMENT, 'Adjustment'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    # Set for movements of a variant's stock; product-level stock otherwise.
+    variant = models.ForeignKey(
+        ProductVariant, on_delete=models.CASCADE, null=True, blank=True, related_name='stock_movements'
+    )
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    order = models.ForeignKey(
+        'orders.Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'stock_movements'
+        verbose_name = 'Stock Movement'
+        verbose_name_plural = 'Stock Movements'
+        indexes = [
+            # Level = snapshot + SUM(quantity) of later movements, per product/variant.
+            models.Index(fields=['product', 'variant', 'id'], name='stock_movements_item_idx'),
+            models.Index(fields=['variant', 'id'], name='stock_movements_variant_idx'),
+            # Restocking an order: what its checkout took out.
+            models.Index(fields=['order'], name='stock_movements_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity:+d} {self.product_id}/{self.variant_id or '-'} ({self.reason})"
+
+
+class StockSnapshot(models.Model):
+    """Stock level of a product/variant after every movement up to ``movement_id``.
+
+    Written by ``manage.py snapshot_stock_ledger``; each run shares one
+    ``movement_id`` and only covers items that moved since the previous run.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    variant = models.ForeignKey(
+        ProductVariant, on_delete=models.CASCADE, null=True, blank=True, related_name='stock_snapshots'
+    )
+    level = models.IntegerField()
+    movement_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'stock_snapshots'
+        verbose_name = 'Stock Snapshot'
+        verbose_name_plural = 'Stock Snapshots'
+        indexes = [
+            # Latest snapshot of an item.
+            models.Index(fields=['product', 'variant', '-movement_id'], name='stock_snapshots_item_idx'),
+            models.Index(fields=['variant', '-movement_id'], name='stock_snapshots_variant_idx'),
+            models.Index(fields=['movement_id'], name='stock_snapshots_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}/{self.variant_id or '-'} = {self.level} @ {self.movement_id}"
@@ -0,0 +1,87 @@
+"""
+Per-product rating aggregates over approved reviews.
+
+``Product`` carries ``rating_count``, ``rating_sum`` and a histogram
+``rating_1`` .. ``rating_5``, so listings show ratings without aggregating
+reviews per card. They are adjusted in place with ``F()`` updates whenever a
+review starts or stops counting (created, re-rated, approved, unapproved,
+moved or deleted; see ``apps.reviews.signals``), and rebuilt from scratch by
+``manage.py rebuild_product_ratings``.
+"""
+from collections import defaultdict
+from typing import Optional, Tuple
+
+from django.db.models import Count, F, Q, Sum
+
+from .cache import invalidate_catalog, invalidate_products
+from .models import Product
+
+STARS = (1, 2, 3, 4, 5)
+RATING_FIELDS = ['rating_count', 'rating_sum'] + [f'rating_{star}' for star in STARS]
+
+# What a review contributes: ``(product_id, rating)``, or ``None`` if it doesn't count.
+Contribution = Optional[Tuple[int, int]]
+
+
+def contribution(product_id, rating, is_approved) -> Contribution:
+    if not is_approved or rating not in STARS:
+        return None
+    return (product_id, rating)
+
+
+def apply_change(before: Contribution, after: Contribution) -> None:
+    """Move a review's contribution from ``before`` to ``after`` (one ``UPDATE`` per product touched)."""
+    if before == after:
+        return
+    deltas = defaultdict(lambda: defaultdict(int))
+    for counted, sign in ((before, -1), (after, 1)):
+        if counted is None:
+            continue
+        product_id, rating = counted
+        deltas[product_id]['rating_count'] += sign
+        deltas[product_id]['rating_sum'] += sign * rating
+        deltas[product_id][f'rating_{rating}'] += sign
+    for product_id, fields in deltas.items():
+        changes = {field: F(field) + delta for field, delta in fields.items() if delta}
+        if changes:
+            Product.objects.filter(pk=product_id).update(**changes)
+    invalidate_products(deltas)
+
+
+def summary(product) -> dict:
+    """The ``rating`` object of product payloads."""
+    count = product.rating_count
+    return {
+        'count': count,
+        'average': round(product.rating_sum / count, 2) if count else None,
+        'histogram': {str(star): getattr(product, f'rating_{star}') for star in STARS},
+    }
+
+
+def rebuild(batch_size: int = 1000) -> int:
+    """Recompute every product's aggregates from approved reviews; returns products written."""
+    from apps.reviews.models import Review
+
+    written = 0
+    last_pk = 0
+    while True:
+        pks = list(Product.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        last_pk = pks[-1]
+        rows = {
+            row['product_id']: row
+            for row in Review.objects.filter(product_id__in=pks, is_approved=True).values('product_id').annotate(
+                rating_count=Count('id'),
+                rating_sum=Sum('rating'),
+                **{f'rating_{star}': Count('id', filter=Q(rating=star)) for star in STARS},
+            ).order_by()
+        }
+        products = [
+            Product(pk=pk, **{field: (rows.get(pk) or {}).get(field) or 0 for field in RATING_FIELDS})
+            for pk in pks
+        ]
+        Product.objects.bulk_update(products, RATING_FIELDS)
+        written += len(products)
+    invalidate_catalog()
+    return written
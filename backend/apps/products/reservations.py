@@ -0,0 +1,126 @@
+"""
+Stock reservations: time-limited holds on product/variant quantity.
+
+A hold belongs to a cart (placed when the shopper starts checkout) and is
+committed to the order that consumes it, or released when it expires or the
+cart is emptied. Available-to-sell is ``stock`` minus the ``SUM`` of active,
+unexpired holds, read through the ``reservations_active_idx`` index; no
+counter is kept that could drift.
+
+``reserve()`` inserts the holds and commits them *before* checking
+availability, then withdraws them if the total now exceeds stock. Two shoppers
+racing for the last unit therefore both see each other's hold and neither can
+oversell, without either locking the product row. (The losing side may be
+refused spuriously under contention; retrying resolves it.)
+
+Expired holds stop counting immediately; ``release_expired()`` (run by the
+``release_expired_reservations`` command) only flips their status so the
+active index stays small.
+"""
+from datetime import timedelta
+from typing import List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Product, ProductVariant, StockReservation
+from .stock import InsufficientStock, StockLine, StockShortage, available_to_sell
+
+
+def reservation_ttl() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'STOCK_RESERVATION_TTL', 15 * 60))
+
+
+def availability(lines: List[StockLine], exclude_cart_id=None) -> dict:
+    """``{(product_id, variant_id): available-to-sell}`` for the lines' products/variants."""
+    products = available_to_sell(Product, {l.product_id for l in lines if not l.variant_id}, exclude_cart_id)
+    variants = available_to_sell(ProductVariant, {l.variant_id for l in lines if l.variant_id}, exclude_cart_id)
+    result = {}
+    for line in lines:
+        if line.variant_id:
+            result[(line.product_id, line.variant_id)] = variants.get(line.variant_id)
+        else:
+            result[(line.product_id, None)] = products.get(line.product_id)
+    return result
+
+
+def reserve(lines: List[StockLine], cart=None, order=None, ttl=None) -> List[StockReservation]:
+    """Hold ``lines`` for ``cart``/``order`` until now + ``ttl``, all or nothing.
+
+    A cart's previous active holds are replaced. Raises ``InsufficientStock``
+    (with available-to-sell figures) and leaves no holds behind if any line
+    can't be covered.
+    """
+    expires_at = timezone.now() + (ttl or reservation_ttl())
+    with transaction.atomic():
+        if cart is not None:
+            release(cart=cart)
+        StockReservation.objects.bulk_create([
+            StockReservation(
+                product_id=line.product_id, variant_id=line.variant_id, cart=cart, order=order,
+                quantity=line.quantity, expires_at=expires_at,
+            )
+            for line in lines
+        ])
+    holds = StockReservation.objects.filter(
+        cart=cart, order=order, status=StockReservation.STATUS_ACTIVE, expires_at=expires_at
+    )
+
+    # Our holds are committed (outside any caller transaction): anything a
+    # concurrent reserve() committed first is visible here too.
+    available = availability(lines)
+    shortages = []
+    for line in lines:
+        left = available[(line.product_id, line.variant_id)]
+        if left is None or left < 0:
+            shortages.append(StockShortage(line, None if left is None else left + line.quantity))
+    if shortages:
+        holds.delete()
+        raise InsufficientStock(shortages)
+    return list(holds)
+
+
+def release(cart=None, order=None) -> int:
+    """Release the active holds of a cart and/or order; returns how many."""
+    if cart is None and order is None:
+        return 0
+    holds = StockReservation.objects.filter(status=StockReservation.STATUS_ACTIVE)
+    if cart is not None:
+        holds = holds.filter(cart=cart)
+    if order is not None:
+        holds = holds.filter(order=order)
+    return holds.update(status=StockReservation.STATUS_RELEASED, updated_at=timezone.now())
+
+
+def commit(cart, order, lines: List[StockLine]) -> int:
+    """Mark the cart's holds on ``lines`` as consumed by ``order`` (stock was decremented).
+
+    Holds on lines left in the cart (a partial checkout) stay active.
+    """
+    if not lines:
+        return 0
+    checked_out = Q()
+    for line in lines:
+        checked_out |= Q(product_id=line.product_id, variant_id=line.variant_id)
+    return StockReservation.objects.filter(
+        checked_out, cart=cart, status=StockReservation.STATUS_ACTIVE
+    ).update(status=StockReservation.STATUS_COMMITTED, order=order, updated_at=timezone.now())
+
+
+def release_expired(now=None, batch_size=1000) -> int:
+    """Flip expired active holds to released in batches; returns how many."""
+    now = now or timezone.now()
+    total = 0
+    while True:
+        ids = list(
+            StockReservation.objects.filter(
+                status=StockReservation.STATUS_ACTIVE, expires_at__lte=now
+            ).order_by('expires_at').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        total += StockReservation.objects.filter(
+            pk__in=ids, status=StockReservation.STATUS_ACTIVE
+        ).update(status=StockReservation.STATUS_RELEASED, updated_at=now)
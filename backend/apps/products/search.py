@@ -0,0 +1,276 @@
+"""
+Full-text product search.
+
+Two engines share one interface and are picked from the database vendor:
+
+* ``PostgresSearchEngine`` keeps a weighted ``tsvector`` column on the
+  products table behind a GIN index and ranks with ``ts_rank``.
+* ``SQLiteSearchEngine`` keeps an FTS5 virtual table keyed by product id
+  and ranks with ``bm25``, so search stays testable without Postgres.
+
+The index structures are schema, created outside the request path: by
+``manage.py rebuild_search_index`` (which also fills them) and after
+``migrate``. ``get_search_engine()`` only checks that they exist; until they
+do, search falls back to ``icontains``. The Postgres vector is kept current by
+a trigger; the FTS5 table by ``Product`` save/delete signals. Query terms are
+matched as prefixes and combined with AND.
+"""
+import re
+import time
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from .models import Product
+
+
+TERM_RE = re.compile(r'[^\W_]+', re.UNICODE)
+MAX_TERMS = 8
+
+
+def tokenize(query: str) -> List[str]:
+    """Split a free-text query into lower-cased search terms."""
+    return TERM_RE.findall((query or '').lower())[:MAX_TERMS]
+
+
+class BaseSearchEngine:
+    """Interface shared by the vendor specific engines."""
+
+    vendor = None
+    # The database keeps the index current on writes (no signal needed).
+    indexed_by_trigger = False
+
+    def __init__(self, using: str = DEFAULT_DB_ALIAS):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    @property
+    def table(self) -> str:
+        return self.connection.ops.quote_name(Product._meta.db_table)
+
+    def install(self) -> None:
+        """Create the index structures if they do not exist yet (schema change)."""
+        raise NotImplementedError
+
+    def is_installed(self) -> bool:
+        """Whether the index structures exist; a catalog lookup, no DDL."""
+        raise NotImplementedError
+
+    def index_products(self, product_ids: Optional[Iterable[int]] = None) -> None:
+        """(Re)index the given products, or every product when ``None``."""
+        raise NotImplementedError
+
+    def remove_products(self, product_ids: Iterable[int]) -> None:
+        raise NotImplementedError
+
+    def search(self, queryset, query: str):
+        """Filter ``queryset`` to matches and annotate ``search_rank``."""
+        raise NotImplementedError
+
+
+class SQLiteSearchEngine(BaseSearchEngine):
+    vendor = 'sqlite'
+    fts_table = 'product_search'
+    # bm25 column weights: name, sku, short_description, description
+    weights = (10.0, 10.0, 4.0, 1.0)
+
+    def install(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} "
+                "USING fts5(name, sku, short_description, description, tokenize = 'unicode61')"
+            )
+
+    def is_installed(self) -> bool:
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.fts_table])
+            return cursor.fetchone() is not None
+
+    def index_products(self, product_ids: Optional[Iterable[int]] = None) -> None:
+        with self.connection.cursor() as cursor:
+            if product_ids is None:
+                cursor.execute(f"DELETE FROM {self.fts_table}")
+                where, params = '', []
+            else:
+                ids = [int(pk) for pk in product_ids]
+                if not ids:
+                    return
+                placeholders = ', '.join(['%s'] * len(ids))
+                cursor.execute(f"DELETE FROM {self.fts_table} WHERE rowid IN ({placeholders})", ids)
+                where, params = f" WHERE id IN ({placeholders})", ids
+            cursor.execute(
+                f"INSERT INTO {self.fts_table} (rowid, name, sku, short_description, description) "
+                f"SELECT id, name, sku, short_description, description FROM {self.table}{where}",
+                params,
+            )
+
+    def remove_products(self, product_ids: Iterable[int]) -> None:
+        ids = [int(pk) for pk in product_ids]
+        if not ids:
+            return
+        placeholders = ', '.join(['%s'] * len(ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.fts_table} WHERE rowid IN ({placeholders})", ids)
+
+    def search(self, queryset, query: str):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(w) for w in self.weights)
+        return queryset.extra(
+            tables=[self.fts_table],
+            where=[f"{self.fts_table}.rowid = {self.table}.id", f"{self.fts_table} MATCH %s"],
+            params=[match],
+            # bm25() is lower-is-better; negate it so rank sorts like ts_rank.
+            select={'search_rank': f"-bm25({self.fts_table}, {weights})"},
+        )
+
+
+class PostgresSearchEngine(BaseSearchEngine):
+    vendor = 'postgresql'
+    column = 'search_vector'
+    index_name = 'products_search_vector_gin'
+    function_name = 'products_search_vector_update'
+    trigger_name = 'products_search_vector_trigger'
+    config = 'simple'
+    indexed_by_trigger = True
+
+    def _document_sql(self, row: str = '') -> str:
+        config = self.config
+        return (
+            f"setweight(to_tsvector('{config}', coalesce({row}name, '')), 'A') || "
+            f"setweight(to_tsvector('{config}', coalesce({row}sku, '')), 'A') || "
+            f"setweight(to_tsvector('{config}', coalesce({row}short_description, '')), 'B') || "
+            f"setweight(to_tsvector('{config}', coalesce({row}description, '')), 'C')"
+        )
+
+    def install(self) -> None:
+        """Add the column, its GIN index and the trigger that maintains it.
+
+        Adding a nullable column only touches the catalog; the index is built
+        ``CONCURRENTLY`` when not inside a transaction, so writes go on.
+        """
+        concurrently = '' if self.connection.in_atomic_block else 'CONCURRENTLY '
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {self.table} ADD COLUMN IF NOT EXISTS {self.column} tsvector")
+            cursor.execute(
+                f"CREATE INDEX {concurrently}IF NOT EXISTS {self.index_name} "
+                f"ON {self.table} USING gin ({self.column})"
+            )
+            cursor.execute(
+                f"CREATE OR REPLACE FUNCTION {self.function_name}() RETURNS trigger AS $$ "
+                f"BEGIN NEW.{self.column} := {self._document_sql('NEW.')}; RETURN NEW; END "
+                f"$$ LANGUAGE plpgsql"
+            )
+            cursor.execute(f"DROP TRIGGER IF EXISTS {self.trigger_name} ON {self.table}")
+            cursor.execute(
+                f"CREATE TRIGGER {self.trigger_name} "
+                f"BEFORE INSERT OR UPDATE OF name, sku, short_description, description ON {self.table} "
+                f"FOR EACH ROW EXECUTE FUNCTION {self.function_name}()"
+            )
+
+    def is_installed(self) -> bool:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = %s AND tgrelid = %s::regclass) "
+                "AND EXISTS (SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = %s AND i.indisvalid)",
+                [self.trigger_name, Product._meta.db_table, self.index_name],
+            )
+            return cursor.fetchone()[0]
+
+    def index_products(self, product_ids: Optional[Iterable[int]] = None) -> None:
+        sql = f"UPDATE {self.table} SET {self.column} = {self._document_sql()}"
+        params = []
+        if product_ids is not None:
+            ids = [int(pk) for pk in product_ids]
+            if not ids:
+                return
+            sql += " WHERE id = ANY(%s)"
+            params = [ids]
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def remove_products(self, product_ids: Iterable[int]) -> None:
+        # The vector lives on the product row and is deleted with it.
+        return None
+
+    def search(self, queryset, query: str):
+        terms = tokenize(query)
+        if not terms:
+            return queryset.none()
+        tsquery = ' & '.join(f"{term}:*" for term in terms)
+        return queryset.extra(
+            where=[f"{self.table}.{self.column} @@ to_tsquery('{self.config}', %s)"],
+            params=[tsquery],
+            select={'search_rank': f"ts_rank({self.table}.{self.column}, to_tsquery('{self.config}', %s))"},
+            select_params=[tsquery],
+        )
+
+
+ENGINES = {
+    SQLiteSearchEngine.vendor: SQLiteSearchEngine,
+    PostgresSearchEngine.vendor: PostgresSearchEngine,
+}
+
+# (alias, database name) -> True, or the monotonic time a missing schema was seen.
+_available = {}
+
+# Seconds before a database whose index structures were missing is checked again.
+RECHECK_INTERVAL = 60
+
+
+def _sqlite_has_fts5(connection) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        return any('FTS5' in row[0] for row in cursor.fetchall())
+
+
+def _engine_class(connection):
+    engine_class = ENGINES.get(connection.vendor)
+    if engine_class is SQLiteSearchEngine and not _sqlite_has_fts5(connection):
+        return None
+    return engine_class
+
+
+def _cache_key(connection):
+    return (connection.alias, str(connection.settings_dict.get('NAME')))
+
+
+def get_search_engine(using: str = DEFAULT_DB_ALIAS) -> Optional[BaseSearchEngine]:
+    """Return the engine for the given database if its index structures exist.
+
+    Never changes the schema (see ``install_search_engine()``). Returns
+    ``None`` when search is disabled (``PRODUCT_SEARCH_ENGINE='none'``), the
+    database has no supported full-text support or the index has not been
+    installed yet; callers then fall back to ``icontains`` matching.
+    """
+    if getattr(settings, 'PRODUCT_SEARCH_ENGINE', 'auto') == 'none':
+        return None
+    connection = connections[using]
+    key = _cache_key(connection)
+    state = _available.get(key)
+    if state is None or (state is not True and time.monotonic() - state >= RECHECK_INTERVAL):
+        engine_class = _engine_class(connection)
+        installed = engine_class is not None and engine_class(using).is_installed()
+        _available[key] = state = True if installed else time.monotonic()
+    return ENGINES[connection.vendor](using) if state is True else None
+
+
+def install_search_engine(using: str = DEFAULT_DB_ALIAS) -> Optional[BaseSearchEngine]:
+    """Create the index structures for the given database; returns the engine or ``None``."""
+    if getattr(settings, 'PRODUCT_SEARCH_ENGINE', 'auto') == 'none':
+        return None
+    connection = connections[using]
+    engine_class = _engine_class(connection)
+    if engine_class is None:
+        return None
+    engine = engine_class(using)
+    engine.install()
+    _available[_cache_key(connection)] = True
+    return engine
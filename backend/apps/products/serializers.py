@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.utils.text import slugify
 from .models import Category, Brand, Product, ProductImage, ProductVariant, ProductAttribute
+from .ratings import RATING_FIELDS, summary as rating_summary
+from .tree import get_category_tree
 
 
 def _unique_slug(model, base: str, slug_field_name: str = 'slug') -> str:
@@ -15,7 +17,16 @@ def _unique_slug(model, base: str, slug_field_name: str = 'slug') -> str:
     return slug
 
 
+def _category_tree(context):
+    # Read the tree version once per response, not once per object.
+    if 'category_tree' not in context:
+        context['category_tree'] = get_category_tree()
+    return context['category_tree']
+
+
 class CategorySerializer(serializers.ModelSerializer):
+    breadcrumbs = serializers.SerializerMethodField()
+
     class Meta:
         model = Category
         fields = '__all__'
@@ -23,6 +34,16 @@ class CategorySerializer(serializers.ModelSerializer):
             'slug': {'required': False, 'allow_blank': True},
         }
 
+    def get_breadcrumbs(self, obj):
+        return _category_tree(self.context).breadcrumbs(obj.pk)
+
+    def validate_parent(self, parent):
+        if parent is not None and self.instance is not None and (
+            parent.pk == self.instance.pk or parent.is_descendant_of(self.instance)
+        ):
+            raise serializers.ValidationError('A category cannot be moved under itself or one of its descendants.')
+        return parent
+
     def create(self, validated_data):
         slug = (validated_data.get('slug') or '').strip()
         if not slug:
@@ -93,10 +114,13 @@ class ProductSerializer(serializers.ModelSerializer):
     brand_name = serializers.CharField(source='brand.name', read_only=True)
     is_on_sale = serializers.BooleanField(read_only=True)
     discount_percentage = serializers.IntegerField(read_only=True)
+    rating = serializers.SerializerMethodField()
+    # Column plus pending counter shards when the queryset was annotated.
+    views_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
-        fields = '__all__'
+        exclude = RATING_FIELDS
         extra_kwargs = {
             'slug': {'required': False, 'allow_blank': True},
         }
@@ -112,3 +136,56 @@ class ProductSerializer(serializers.ModelSerializer):
         if 'slug' in validated_data and not slug:
             validated_data['slug'] = _unique_slug(Product, validated_data.get('name', instance.name))
         return super().update(instance, validated_data)
+
+    def get_rating(self, obj):
+        return rating_summary(obj)
+
+    def get_views_count(self, obj):
+        return getattr(obj, 'views_count_total', obj.views_count)
+
+
+class ProductListSerializer(serializers.ModelSerializer):
+    """Compact product card for list and grid responses.
+
+    Expects ``primary_images`` to be prefetched (see
+    ``ProductViewSet.get_queryset``); large text columns are not read.
+    """
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    brand_name = serializers.CharField(source='brand.name', read_only=True, default=None)
+    is_on_sale = serializers.BooleanField(read_only=True)
+    discount_percentage = serializers.IntegerField(read_only=True)
+    in_stock = serializers.SerializerMethodField()
+    primary_image = serializers.SerializerMethodField()
+    rating = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'slug', 'sku', 'price', 'compare_price', 'is_on_sale',
+            'discount_percentage', 'in_stock', 'category', 'category_name', 'brand',
+            'brand_name', 'is_featured', 'primary_image', 'rating', 'created_at',
+        ]
+        read_only_fields = fields
+
+    def get_in_stock(self, obj):
+        return obj.stock > 0
+
+    def get_rating(self, obj):
+        return rating_summary(obj)
+
+    def get_primary_image(self, obj):
+        images = getattr(obj, 'primary_images', None)
+        if images is None:
+            images = [image for image in obj.images.all() if image.is_primary]
+        if not images or not images[0].image:
+            return None
+        url = images[0].image.url
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class ProductDetailSerializer(ProductSerializer):
+    category_breadcrumbs = serializers.SerializerMethodField()
+
+    def get_category_breadcrumbs(self, obj):
+        return _category_tree(self.context).breadcrumbs(obj.category_id)
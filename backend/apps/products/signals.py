@@ -0,0 +1,142 @@
+"""
+Signal handlers for the products app.
+
+Connected in ``ProductsConfig.ready()``.
+"""
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .cache import invalidate_catalog
+from .facets import BUCKET_FIELDS, INCREMENTAL_FIELDS, SNAPSHOT_FIELDS, get_facet_engine, snapshot
+from .ledger import record_movements
+from .models import Category, Brand, Product, ProductImage, ProductVariant, ProductAttribute, StockMovement
+from .search import get_search_engine, install_search_engine
+from .tree import invalidate_category_tree
+
+
+# Every model whose data is embedded in a catalog response.
+CATALOG_MODELS = (Category, Brand, Product, ProductImage, ProductVariant, ProductAttribute)
+
+
+def invalidate_catalog_cache(sender, **kwargs):
+    invalidate_catalog()
+
+
+def index_product(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    engine = get_search_engine(using)
+    if engine is not None and not engine.indexed_by_trigger:
+        engine.index_products([instance.pk])
+
+
+def unindex_product(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    engine = get_search_engine(using)
+    if engine is not None:
+        engine.remove_products([instance.pk])
+
+
+def capture_stored_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save: remember the stored snapshot fields of a product.
+
+    The one query shared by every Product ``post_save`` receiver that compares
+    against the stored row (facets, stock ledger, notifications):
+    ``instance._stored_state`` is the ``snapshot()`` dict, ``None`` for a new
+    or raw row, or ``False`` when ``update_fields`` touches none of its fields.
+    """
+    instance._stored_state = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(SNAPSHOT_FIELDS).intersection(
+        sender._meta.get_field(name).attname for name in update_fields
+    ):
+        instance._stored_state = False
+        return
+    instance._stored_state = (
+        Product.objects.filter(pk=instance.pk).values(*SNAPSHOT_FIELDS).first()
+    )
+
+
+def update_facets_on_save(sender, instance, created=False, raw=False, **kwargs):
+    before = getattr(instance, '_stored_state', None)
+    if raw or before is False:
+        return
+    after = snapshot(instance)
+    engine = get_facet_engine()
+    if before is not None and any(before[f] != after[f] for f in BUCKET_FIELDS):
+        engine.invalidate()
+    elif before is None or any(before[f] != after[f] for f in INCREMENTAL_FIELDS):
+        engine.apply_product_change(before, after)
+
+
+def update_facets_on_delete(sender, instance, **kwargs):
+    get_facet_engine().apply_product_change(snapshot(instance), None)
+
+
+def capture_stock(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save: remember the stored stock so the ledger can record the change."""
+    instance._stock_before = False
+    if raw or (update_fields is not None and 'stock' not in update_fields):
+        return
+    if instance.pk is None:
+        instance._stock_before = 0
+        return
+    if sender is Product:
+        stored = getattr(instance, '_stored_state', None)
+        instance._stock_before = stored['stock'] if stored else 0
+        return
+    instance._stock_before = sender.objects.filter(pk=instance.pk).values_list('stock', flat=True).first() or 0
+
+
+def record_stock_adjustment(sender, instance, created=False, raw=False, **kwargs):
+    """post_save: a stock change made by saving the row (admin, API) becomes a movement."""
+    before = getattr(instance, '_stock_before', False)
+    if raw or before is False:
+        return
+    delta = int(instance.stock) - before
+    if delta:
+        product_id = instance.pk if sender is Product else instance.product_id
+        variant_id = instance.pk if sender is ProductVariant else None
+        reason = StockMovement.REASON_INITIAL if created else StockMovement.REASON_ADJUSTMENT
+        record_movements([(product_id, variant_id, delta)], reason)
+
+
+def invalidate_facets(sender, **kwargs):
+    get_facet_engine().invalidate()
+
+
+def invalidate_tree(sender, **kwargs):
+    invalidate_category_tree()
+
+
+def install_search_index(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate: create the full-text index structures with the rest of the schema."""
+    install_search_engine(using)
+
+
+for _model in CATALOG_MODELS:
+    post_save.connect(
+        invalidate_catalog_cache,
+        sender=_model,
+        dispatch_uid=f'catalog_cache_save_{_model.__name__}',
+    )
+    post_delete.connect(
+        invalidate_catalog_cache,
+        sender=_model,
+        dispatch_uid=f'catalog_cache_delete_{_model.__name__}',
+    )
+
+post_save.connect(index_product, sender=Product, dispatch_uid='product_search_index')
+post_delete.connect(unindex_product, sender=Product, dispatch_uid='product_search_unindex')
+
+post_save.connect(invalidate_tree, sender=Category, dispatch_uid='category_tree_save')
+post_delete.connect(invalidate_tree, sender=Category, dispatch_uid='category_tree_delete')
+
+pre_save.connect(capture_stored_state, sender=Product, dispatch_uid='product_stored_state')
+post_save.connect(update_facets_on_save, sender=Product, dispatch_uid='product_facets_save')
+post_delete.connect(update_facets_on_delete, sender=Product, dispatch_uid='product_facets_delete')
+for _model in (Product, ProductVariant):
+    pre_save.connect(capture_stock, sender=_model, dispatch_uid=f'stock_ledger_capture_{_model.__name__}')
+    post_save.connect(record_stock_adjustment, sender=_model, dispatch_uid=f'stock_ledger_save_{_model.__name__}')
+# Label and attribute changes start a new facet generation.
+for _model in (Category, Brand, ProductAttribute):
+    post_save.connect(invalidate_facets, sender=_model, dispatch_uid=f'facets_save_{_model.__name__}')
+    post_delete.connect(invalidate_facets, sender=_model, dispatch_uid=f'facets_delete_{_model.__name__}')
@@ -0,0 +1,260 @@
+"""
+Stock decrements without read-then-write row locks.
+
+``decrement_stock()`` takes the lines of a checkout and issues one conditional
+``UPDATE`` per table::
+
+    UPDATE products
+       SET stock = stock - CASE id WHEN 1 THEN 2 WHEN 7 THEN 1 END
+     WHERE id IN (1, 7)
+       AND stock >= CASE id WHEN 1 THEN 2 WHEN 7 THEN 1 END
+
+The database applies the check and the write atomically per row, so no
+``SELECT ... FOR UPDATE`` is needed and concurrent checkouts only contend for
+the duration of the statement (plus the rest of the caller's transaction; run
+it as late as possible). If fewer rows were updated than requested, the
+decrement is rolled back and the current stock is read to say which lines
+fell short.
+
+Lines without a variant draw from ``Product.stock``; lines with a variant draw
+from ``ProductVariant.stock`` only, as checkout always has. Active holds
+(``StockReservation``) placed by other carts are left untouched: a row only
+qualifies if ``stock - held >= q``.
+
+Both directions are recorded as ``StockMovement`` rows (see ``ledger``):
+checkout decrements, and ``restock_orders()`` for cancelled/refunded orders.
+"""
+from collections import defaultdict
+from typing import Hashable, List, NamedTuple, Optional
+
+from django.db import transaction
+from django.db.models import Case, ExpressionWrapper, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import invalidate_catalog, invalidate_products
+from .facets import get_facet_engine
+from .ledger import record_movements
+from .models import Product, ProductVariant, StockMovement, StockReservation
+
+
+# A shortfall that appears and then disappears on re-read (stock was returned
+# in between) is retried this many times before giving up.
+DECREMENT_ATTEMPTS = 3
+
+
+class StockLine(NamedTuple):
+    key: Hashable
+    product_id: int
+    variant_id: Optional[int]
+    quantity: int
+
+
+class StockShortage(NamedTuple):
+    line: StockLine
+    # ``None`` when the product/variant row no longer exists.
+    available: Optional[int]
+
+
+class InsufficientStock(Exception):
+    def __init__(self, shortages: List[StockShortage]):
+        super().__init__(f'{len(shortages)} line(s) have insufficient stock')
+        self.shortages = shortages
+
+
+class _Shortfall(Exception):
+    pass
+
+
+def describe_shortage(shortage: StockShortage) -> dict:
+    """One entry of the checkout ``Insufficient stock`` error ``details`` list."""
+    line = shortage.line
+    if shortage.available is None:
+        if line.variant_id:
+            return {'cart_item_id': line.key, 'variant_id': line.variant_id, 'reason': 'variant_not_found'}
+        return {'cart_item_id': line.key, 'product_id': line.product_id, 'reason': 'product_not_found'}
+    error = {'cart_item_id': line.key, 'product_id': line.product_id}
+    if line.variant_id:
+        error['variant_id'] = line.variant_id
+    error.update({'available': shortage.available, 'requested': line.quantity, 'reason': 'insufficient_stock'})
+    return error
+
+
+def _target(line: StockLine):
+    if line.variant_id:
+        return ProductVariant, line.variant_id
+    return Product, line.product_id
+
+
+def _requested(lines: List[StockLine]) -> dict:
+    """``{model: {pk: total quantity}}`` over all lines."""
+    requested = defaultdict(lambda: defaultdict(int))
+    for line in lines:
+        model, pk = _target(line)
+        requested[model][pk] += line.quantity
+    return requested
+
+
+def _amount(quantities: dict) -> Case:
+    return Case(
+        *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def held_quantity(model, exclude_cart_id=None, now=None):
+    """Units of each ``model`` row held by active, unexpired reservations.
+
+    A correlated ``SUM`` served by the ``reservations_active_idx`` index,
+    usable in ``annotate()`` and ``filter()`` on Product/ProductVariant.
+    Holds of ``exclude_cart_id`` are not counted.
+    """
+    holds = StockReservation.objects.filter(
+        status=StockReservation.STATUS_ACTIVE,
+        expires_at__gt=now or timezone.now(),
+    )
+    if model is ProductVariant:
+        holds = holds.filter(variant=OuterRef('pk')).values('variant')
+    else:
+        holds = holds.filter(product=OuterRef('pk'), variant__isnull=True).values('product')
+    if exclude_cart_id is not None:
+        holds = holds.exclude(cart_id=exclude_cart_id)
+    total = holds.annotate(total=Sum('quantity')).values('total')
+    return Coalesce(Subquery(total, output_field=IntegerField()), Value(0))
+
+
+def conditional_decrement(model, quantities: dict, exclude_cart_id=None) -> int:
+    """Decrement ``stock`` of every row in ``quantities`` that has enough; returns rows updated."""
+    if not quantities:
+        return 0
+    amount = _amount(quantities)
+    return model.objects.filter(
+        pk__in=list(quantities),
+        stock__gte=ExpressionWrapper(amount + held_quantity(model, exclude_cart_id), output_field=IntegerField()),
+    ).update(stock=F('stock') - amount)
+
+
+def available_to_sell(model, pks, exclude_cart_id=None) -> dict:
+    """``{pk: stock minus active holds}`` for ``model`` rows (missing rows are absent)."""
+    return dict(
+        model.objects.filter(pk__in=list(pks)).annotate(
+            available=ExpressionWrapper(F('stock') - held_quantity(model, exclude_cart_id), output_field=IntegerField())
+        ).values_list('pk', 'available')
+    )
+
+
+def _shortages(lines: List[StockLine], requested: dict, exclude_cart_id=None) -> List[StockShortage]:
+    current = {
+        model: available_to_sell(model, quantities, exclude_cart_id)
+        for model, quantities in requested.items()
+    }
+    shortages = []
+    for line in lines:
+        model, pk = _target(line)
+        available = current[model].get(pk)
+        if available is None or available < requested[model][pk]:
+            shortages.append(StockShortage(line, available))
+    return shortages
+
+
+def decrement_stock(lines: List[StockLine], cart_id=None, order_id=None) -> None:
+    """Take ``lines`` out of stock, all or nothing.
+
+    Stock held for other carts is not available; holds of ``cart_id`` are.
+    Raises ``InsufficientStock`` listing the lines that can't be covered;
+    nothing is decremented in that case. Call inside the caller's transaction.
+    The decrement is recorded in the ledger as ``checkout`` movements of
+    ``order_id``.
+    """
+    requested = _requested(lines)
+    for _attempt in range(DECREMENT_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                # Fixed table order so concurrent checkouts lock in the same order.
+                for model in (Product, ProductVariant):
+                    quantities = requested.get(model)
+                    if quantities and conditional_decrement(model, quantities, cart_id) != len(quantities):
+                        raise _Shortfall
+                record_movements(
+                    ((line.product_id, line.variant_id, -line.quantity) for line in lines),
+                    StockMovement.REASON_CHECKOUT, order_id,
+                )
+        except _Shortfall:
+            shortages = _shortages(lines, requested, cart_id)
+            if shortages:
+                raise InsufficientStock(shortages)
+            continue
+        _stock_changed(lines, requested.get(Product, {}))
+        return
+    raise InsufficientStock(_shortages(lines, requested, cart_id))
+
+
+def restock_orders(order_ids, reason: str) -> int:
+    """Put back what the orders' checkouts took out of stock; returns items restocked.
+
+    Works from the orders' ledger movements, so an order is restocked once
+    however many times it is cancelled or refunded, and orders placed before
+    the ledger existed are left alone.
+    """
+    outstanding = StockMovement.objects.filter(order_id__in=list(order_ids)).values(
+        'order_id', 'product_id', 'variant_id',
+    ).annotate(net=Sum('quantity')).filter(net__lt=0).order_by()
+    returned = defaultdict(list)
+    for row in outstanding:
+        returned[row['order_id']].append(StockLine(None, row['product_id'], row['variant_id'], -row['net']))
+    if not returned:
+        return 0
+
+    lines = [line for order_lines in returned.values() for line in order_lines]
+    requested = _requested(lines)
+    with transaction.atomic():
+        for model in (Product, ProductVariant):
+            quantities = requested.get(model)
+            if quantities:
+                model.objects.filter(pk__in=list(quantities)).update(stock=F('stock') + _amount(quantities))
+        StockMovement.objects.bulk_create(
+            StockMovement(product_id=line.product_id, variant_id=line.variant_id, quantity=line.quantity,
+                          reason=reason, order_id=order_id)
+            for order_id, order_lines in returned.items()
+            for line in order_lines
+        )
+    _stock_changed(lines, requested.get(Product, {}), restocked=True)
+    return len(lines)
+
+
+def _stock_changed(lines: List[StockLine], product_quantities: dict, restocked: bool = False) -> None:
+    """Stand in for the ``post_save`` handlers that ``update()`` bypasses.
+
+    Only the touched products' cached details are invalidated here; list
+    cards show ``in_stock``, so the whole catalog is only invalidated when a
+    product runs out or comes back (see ``_availability_changed``). A product
+    that comes back from a restock also gets the wishlist ``product_restocked``
+    fan-out that its ``post_save`` would have queued.
+    """
+    invalidate_products(line.product_id for line in lines)
+    if product_quantities:
+        transaction.on_commit(lambda: _availability_changed(product_quantities, restocked))
+
+
+def _availability_changed(product_quantities: dict, restocked: bool = False) -> None:
+    # Only products that just ran out, or just came back from zero, move
+    # between availability buckets and change their list cards.
+    changed = Product.objects.filter(pk__in=list(product_quantities)).only('id', 'stock', 'price', 'is_active')
+    if not restocked:
+        changed = changed.filter(stock=0)
+    crossed = []
+    for product in changed:
+        quantity = product_quantities[product.pk]
+        before = product.stock - quantity if restocked else quantity
+        if (before > 0) != (product.stock > 0):
+            crossed.append((before, product))
+    if crossed:
+        # One new facet generation for the whole batch.
+        get_facet_engine().invalidate()
+        invalidate_catalog()
+    if restocked:
+        # Wishlisters hear about a restock the way a product save would tell them.
+        from apps.notifications.fanout import queue_product_notifications
+
+        for before, product in crossed:
+            queue_product_notifications({'price': product.price, 'stock': before}, product)
@@ -0,0 +1,123 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.products.cache import get_catalog_cache, get_catalog_version
+from apps.products.models import Category, Brand, Product, ProductImage, ProductVariant, ProductAttribute
+from apps.products.stock import StockLine, decrement_stock
+
+
+@override_settings(CATALOG_CACHE_ENABLED=True)
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Cache Cat', slug='cache-cat')
+        self.brand = Brand.objects.create(name='Cache Brand', slug='cache-brand')
+        self.product = Product.objects.create(
+            name='Cached Product',
+            slug='cached-product',
+            description='Served from cache',
+            category=self.category,
+            brand=self.brand,
+            sku='CACHE-1',
+            price='10.00',
+            stock=5,
+        )
+
+    def tearDown(self):
+        get_catalog_cache().clear()
+
+    def test_detail_second_request_is_served_without_queries(self):
+        first = self.client.get('/api/v1/products/cached-product/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with CaptureQueriesContext(connection) as context:
+            second = self.client.get('/api/v1/products/cached-product/')
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_list_key_ignores_query_parameter_order(self):
+        self.client.get('/api/v1/products/?category=%d&ordering=price' % self.category.id)
+        response = self.client.get('/api/v1/products/?ordering=price&category=%d' % self.category.id)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_list_pages_and_filters_are_cached_separately(self):
+        self.client.get('/api/v1/products/?page=1')
+        response = self.client.get('/api/v1/products/?page=1&brand=%d' % self.brand.id)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_not_found_is_not_cached(self):
+        self.client.get('/api/v1/products/missing/')
+        response = self.client.get('/api/v1/products/missing/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_product_save_invalidates(self):
+        self.client.get('/api/v1/products/cached-product/')
+        self.product.name = 'Renamed Product'
+        self.product.save()
+
+        response = self.client.get('/api/v1/products/cached-product/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['name'], 'Renamed Product')
+
+    def test_related_rows_invalidate(self):
+        writes = [
+            lambda: ProductVariant.objects.create(
+                product=self.product, name='Size', value='L', sku='CACHE-1-L', stock=1,
+            ),
+            lambda: ProductImage.objects.create(product=self.product, alt_text='front'),
+            lambda: ProductAttribute.objects.create(product=self.product, name='Material', value='Wool'),
+            lambda: self.product.attributes.all().delete(),
+            lambda: self.brand.save(),
+        ]
+        for write in writes:
+            self.client.get('/api/v1/products/cached-product/')
+            version = get_catalog_version()
+            write()
+            self.assertGreater(get_catalog_version(), version)
+            response = self.client.get('/api/v1/products/cached-product/')
+            self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_stock_changes_invalidate_only_the_product_until_it_sells_out(self):
+        other = Product.objects.create(
+            name='Other Product', slug='other-product', description='', category=self.category,
+            sku='CACHE-2', price='5.00', stock=5,
+        )
+        for url in ('/api/v1/products/', '/api/v1/products/cached-product/', '/api/v1/products/other-product/'):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            decrement_stock([StockLine(1, self.product.pk, None, 2)])
+        self.assertEqual(self.client.get('/api/v1/products/')['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/api/v1/products/other-product/')['X-Cache'], 'HIT')
+        response = self.client.get('/api/v1/products/cached-product/')
+        self.assertEqual((response['X-Cache'], response.data['stock']), ('MISS', 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            decrement_stock([StockLine(1, self.product.pk, None, 3)])
+        response = self.client.get('/api/v1/products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([card['in_stock'] for card in response.data['results']], [True, False])
+
+    def test_hit_and_miss_counters_are_recorded(self):
+        with mock.patch('apps.products.cache.cache_hit_counter') as hits, \
+                mock.patch('apps.products.cache.cache_miss_counter') as misses:
+            self.client.get('/api/v1/products/')
+            self.client.get('/api/v1/products/')
+
+        misses.add.assert_called_once_with(1, {'cache': 'catalog', 'view': 'products.list'})
+        hits.add.assert_called_once_with(1, {'cache': 'catalog', 'view': 'products.list'})
+
+    @override_settings(CATALOG_CACHE_ENABLED=False)
+    def test_disabled_cache_always_hits_database(self):
+        self.client.get('/api/v1/products/cached-product/')
+        response = self.client.get('/api/v1/products/cached-product/')
+        self.assertFalse(response.has_header('X-Cache'))
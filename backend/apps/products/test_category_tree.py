@@ -0,0 +1,112 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.products.cache import get_catalog_cache
+from apps.products.models import Category, Product
+from apps.products.serializers import CategorySerializer
+from apps.products.tree import get_category_tree
+
+
+class CategoryTreeTests(TestCase):
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.client = APIClient()
+        self.clothing = Category.objects.create(name='Clothing', slug='clothing')
+        self.men = Category.objects.create(name='Men', slug='men', parent=self.clothing)
+        self.shirts = Category.objects.create(name='Shirts', slug='shirts', parent=self.men)
+        self.women = Category.objects.create(name='Women', slug='women', parent=self.clothing)
+        self.garden = Category.objects.create(name='Garden', slug='garden')
+
+    def tearDown(self):
+        get_catalog_cache().clear()
+
+    def _product(self, sku, category):
+        return Product.objects.create(
+            name=sku, slug=sku.lower(), description=sku, category=category,
+            sku=sku, price='10.00', stock=1
+        )
+
+    def _refresh(self, *categories):
+        for category in categories:
+            category.refresh_from_db()
+
+    def test_paths_are_materialized_on_create(self):
+        self.assertEqual(self.shirts.path, f'{self.clothing.id}/{self.men.id}/{self.shirts.id}/')
+        self.assertEqual(self.shirts.depth, 2)
+        self._refresh(self.shirts)
+        self.assertEqual(self.shirts.path, f'{self.clothing.id}/{self.men.id}/{self.shirts.id}/')
+
+    def test_descendants_and_ancestors_use_one_query(self):
+        with self.assertNumQueries(1):
+            descendants = set(self.clothing.descendants())
+        self.assertEqual(descendants, {self.men, self.shirts, self.women})
+
+        with self.assertNumQueries(1):
+            ancestors = list(self.shirts.ancestors())
+        self.assertEqual(ancestors, [self.clothing, self.men])
+        self.assertEqual(list(self.shirts.ancestors(include_self=True))[-1], self.shirts)
+
+    def test_moving_a_category_moves_its_subtree(self):
+        self.men.parent = self.garden
+        self.men.save()
+        self._refresh(self.shirts)
+        self.assertEqual(self.shirts.path, f'{self.garden.id}/{self.men.id}/{self.shirts.id}/')
+        self.assertEqual(set(self.garden.descendants()), {self.men, self.shirts})
+        self.assertEqual(set(self.clothing.descendants()), {self.women})
+
+        self.men.parent = None
+        self.men.save()
+        self._refresh(self.shirts)
+        self.assertEqual((self.shirts.path, self.shirts.depth), (f'{self.men.id}/{self.shirts.id}/', 1))
+
+    def test_cannot_move_under_own_descendant(self):
+        self.clothing.parent = self.shirts
+        with self.assertRaises(ValueError):
+            self.clothing.save()
+
+    def test_rebuild_command_restores_paths(self):
+        Category.objects.update(path='', depth=0)
+        call_command('rebuild_category_tree', stdout=StringIO())
+        self._refresh(self.shirts)
+        self.assertEqual(self.shirts.path, f'{self.clothing.id}/{self.men.id}/{self.shirts.id}/')
+        self.assertEqual(self.shirts.depth, 2)
+
+    def test_tree_is_cached_in_process(self):
+        get_category_tree()
+        with self.assertNumQueries(0):
+            crumbs = get_category_tree().breadcrumbs(self.shirts.id)
+        self.assertEqual([c['slug'] for c in crumbs], ['clothing', 'men', 'shirts'])
+
+        self.shirts.name = 'Dress Shirts'
+        self.shirts.save()
+        self.assertEqual(get_category_tree().breadcrumbs(self.shirts.id)[-1]['name'], 'Dress Shirts')
+
+    def test_category_tree_filter(self):
+        self._product('TEE', self.shirts)
+        self._product('DRESS', self.women)
+        self._product('HOSE', self.garden)
+
+        def skus(slug):
+            response = self.client.get('/api/v1/products/', {'category_tree': slug})
+            self.assertEqual(response.status_code, 200)
+            return sorted(item['sku'] for item in response.data['results'])
+
+        self.assertEqual(skus('clothing'), ['DRESS', 'TEE'])
+        self.assertEqual(skus('men'), ['TEE'])
+        self.assertEqual(skus('missing'), [])
+
+    def test_product_detail_has_breadcrumbs(self):
+        self._product('TEE', self.shirts)
+        response = self.client.get('/api/v1/products/tee/')
+        self.assertEqual(
+            [crumb['name'] for crumb in response.data['category_breadcrumbs']],
+            ['Clothing', 'Men', 'Shirts'],
+        )
+
+    def test_serializer_rejects_cycles(self):
+        serializer = CategorySerializer(self.clothing, data={'parent': self.shirts.id}, partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('parent', serializer.errors)
@@ -0,0 +1,134 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.products.facets import get_facet_engine
+from apps.products.models import Category, Brand, Product, ProductAttribute
+
+
+class FacetCountTests(TestCase):
+    def setUp(self):
+        get_facet_engine().cache.clear()
+        self.client = APIClient()
+        self.shirts = Category.objects.create(name='Shirts', slug='shirts')
+        self.shoes = Category.objects.create(name='Shoes', slug='shoes')
+        self.acme = Brand.objects.create(name='Acme', slug='acme')
+        self.tee = self._product('Tee', 'TEE', self.shirts, '20.00', stock=5, brand=self.acme)
+        self.polo = self._product('Polo', 'POLO', self.shirts, '45.00', stock=0, brand=self.acme)
+        self.boot = self._product('Boot', 'BOOT', self.shoes, '120.00', stock=3, is_featured=True)
+        self._product('Retired', 'OLD', self.shoes, '10.00', stock=9, is_active=False)
+        ProductAttribute.objects.create(product=self.tee, name='Color', value='Red')
+        ProductAttribute.objects.create(product=self.polo, name='Color', value='Red')
+        ProductAttribute.objects.create(product=self.boot, name='Color', value='Black')
+
+    def tearDown(self):
+        get_facet_engine().cache.clear()
+
+    def _product(self, name, sku, category, price, **extra):
+        return Product.objects.create(
+            name=name, slug=sku.lower(), description=name, category=category,
+            sku=sku, price=price, **extra
+        )
+
+    def _facets(self, **params):
+        response = self.client.get('/api/v1/products/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counts_every_facet_for_active_products(self):
+        data = self._facets()
+        self.assertEqual(
+            data['categories'],
+            [
+                {'id': self.shirts.id, 'name': 'Shirts', 'count': 2},
+                {'id': self.shoes.id, 'name': 'Shoes', 'count': 1},
+            ],
+        )
+        self.assertEqual(data['brands'], [{'id': self.acme.id, 'name': 'Acme', 'count': 2}])
+        self.assertEqual(
+            [(band['key'], band['count']) for band in data['price_bands']],
+            [('0-25', 1), ('25-50', 1), ('100-250', 1)],
+        )
+        self.assertEqual(data['availability'], {'in_stock': 2, 'out_of_stock': 1})
+        self.assertEqual(
+            data['attributes'],
+            [{'name': 'Color', 'values': [{'value': 'Red', 'count': 2}, {'value': 'Black', 'count': 1}]}],
+        )
+
+    def test_respects_current_filters(self):
+        data = self._facets(category=self.shirts.id)
+        self.assertEqual(data['categories'], [{'id': self.shirts.id, 'name': 'Shirts', 'count': 2}])
+        self.assertEqual(data['availability'], {'in_stock': 1, 'out_of_stock': 1})
+
+        data = self._facets(search='boot')
+        self.assertEqual(data['categories'], [{'id': self.shoes.id, 'name': 'Shoes', 'count': 1}])
+
+    def test_all_facets_in_one_query_and_cached(self):
+        with CaptureQueriesContext(connection) as context:
+            self._facets(brand=self.acme.id)
+        facet_queries = [q for q in context.captured_queries if 'WITH filtered' in q['sql']]
+        self.assertEqual(len(facet_queries), 1)
+
+        with CaptureQueriesContext(connection) as context:
+            self._facets(brand=self.acme.id, page=2, ordering='price')
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_running_out_or_restocking_starts_new_generation(self):
+        self._facets(category=self.shirts.id)
+        self.polo.stock = 4
+        self.polo.save(update_fields=['stock'])
+
+        data = self._facets(category=self.shirts.id)
+        self.assertEqual(data['availability'], {'in_stock': 2, 'out_of_stock': 0})
+
+    def test_stock_change_within_a_bucket_keeps_the_counts(self):
+        self._facets(category=self.shirts.id)
+        self.tee.stock = 2
+        self.tee.save(update_fields=['stock'])
+
+        with CaptureQueriesContext(connection) as context:
+            data = self._facets(category=self.shirts.id)
+        self.assertEqual(len(context.captured_queries), 0)
+        self.assertEqual(data['availability'], {'in_stock': 1, 'out_of_stock': 1})
+
+    def test_one_snapshot_query_per_product_save(self):
+        with CaptureQueriesContext(connection) as context:
+            self.tee.price = '15.00'
+            self.tee.save(update_fields=['price'])
+        snapshot_queries = [
+            q for q in context.captured_queries
+            if q['sql'].startswith('SELECT') and '"products"' in q['sql']
+        ]
+        self.assertEqual(len(snapshot_queries), 1)
+
+    def test_deactivation_removes_contribution(self):
+        self._facets()
+        self._facets(category=self.shoes.id)
+        self.tee.is_active = False
+        self.tee.save()
+
+        data = self._facets()
+        self.assertEqual(data['categories'][0], {'id': self.shirts.id, 'name': 'Shirts', 'count': 1})
+        self.assertIn({'value': 'Red', 'count': 1}, data['attributes'][0]['values'])
+        self.assertEqual(self._facets(category=self.shoes.id)['categories'][0]['count'], 1)
+
+    def test_new_product_is_added(self):
+        self._facets()
+        self._product('Sandal', 'SANDAL', self.shoes, '30.00', stock=2)
+        data = self._facets()
+        self.assertIn({'id': self.shoes.id, 'name': 'Shoes', 'count': 2}, data['categories'])
+
+    def test_searched_counts_follow_availability_changes(self):
+        self._facets(search='tee')
+        self.tee.stock = 0
+        self.tee.save()
+        data = self._facets(search='tee')
+        self.assertEqual(data['availability'], {'in_stock': 0, 'out_of_stock': 1})
+
+    def test_price_change_starts_new_generation(self):
+        self._facets()
+        self.tee.price = '60.00'
+        self.tee.save()
+        bands = {band['key']: band['count'] for band in self._facets()['price_bands']}
+        self.assertEqual(bands, {'25-50': 1, '50-100': 1, '100-250': 1})
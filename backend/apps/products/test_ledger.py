@@ -0,0 +1,129 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Address, User
+from apps.cart.models import Cart, CartItem
+from apps.orders.models import Order
+from apps.products.ledger import take_snapshot, with_ledger_level
+from apps.products.models import Category, Product, ProductVariant, StockMovement, StockSnapshot
+from apps.products.stock import StockLine, decrement_stock
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Ledger', slug='ledger')
+        self.product = Product.objects.create(
+            name='Mug', slug='mug', description='', category=category, sku='MUG', price='8.00', stock=10,
+        )
+        self.variant = ProductVariant.objects.create(
+            product=self.product, name='Color', value='Blue', sku='MUG-BLUE', stock=4,
+        )
+
+    def _levels(self):
+        return (
+            with_ledger_level(Product.objects.filter(pk=self.product.pk)).values_list('stock', 'ledger_level').get(),
+            with_ledger_level(ProductVariant.objects.filter(pk=self.variant.pk)).values_list(
+                'stock', 'ledger_level').get(),
+        )
+
+    def test_saves_and_decrements_are_recorded(self):
+        self.product.stock = 12
+        self.product.save()
+        decrement_stock([
+            StockLine(1, self.product.pk, None, 3), StockLine(2, self.product.pk, self.variant.pk, 1),
+        ])
+        self.assertEqual(
+            list(StockMovement.objects.order_by('id').values_list('variant_id', 'quantity', 'reason')),
+            [(None, 10, 'initial'), (self.variant.pk, 4, 'initial'), (None, 2, 'adjustment'),
+             (None, -3, 'checkout'), (self.variant.pk, -1, 'checkout')],
+        )
+        self.assertEqual(self._levels(), ((9, 9), (3, 3)))
+
+    def test_snapshot_plus_delta_gives_the_level(self):
+        mark, written = take_snapshot(lag=timedelta(0))
+        self.assertEqual(written, 2)
+        decrement_stock([StockLine(1, self.product.pk, None, 4)])
+        self.assertEqual(self._levels(), ((6, 6), (4, 4)))
+
+        _, written = take_snapshot(lag=timedelta(0))
+        self.assertEqual(written, 1)
+        snapshot = StockSnapshot.objects.filter(product=self.product, variant__isnull=True).latest('movement_id')
+        self.assertEqual(snapshot.level, 6)
+        self.assertGreater(snapshot.movement_id, mark)
+        self.assertEqual(self._levels(), ((6, 6), (4, 4)))
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        Product.objects.filter(pk=self.product.pk).update(stock=7)
+        out = StringIO()
+        call_command('reconcile_stock', stdout=out)
+        self.assertIn(f'Product {self.product.pk}: stock=7 ledger=10', out.getvalue())
+        self.assertIn('1 rows differ', out.getvalue())
+
+        call_command('reconcile_stock', '--fix', stdout=StringIO())
+        self.assertEqual(self._levels(), ((10, 10), (4, 4)))
+
+    def test_backfill_adopts_stock_that_predates_the_ledger(self):
+        StockMovement.objects.all().delete()
+        call_command('reconcile_stock', '--backfill', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(self._levels(), ((10, 10), (4, 4)))
+        self.assertEqual(set(StockMovement.objects.values_list('reason', flat=True)), {'adjustment'})
+
+
+class OrderRestockTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='ledger', email='ledger@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Ledger', slug='ledger')
+        self.product = Product.objects.create(
+            name='Mug', slug='mug', description='', category=category, sku='MUG', price='8.00', stock=5,
+        )
+        address = Address.objects.create(
+            user=self.user, address_type='shipping', full_name='Ledger', phone='1',
+            address_line1='1 St', city='City', state='ST', postal_code='1', country='US',
+        )
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        response = self.client.post('/api/v1/orders/create_from_cart/', {
+            'shipping_address': address.id, 'billing_address': address.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.order = Order.objects.get(pk=response.data['id'])
+
+    def _stock(self):
+        self.product.refresh_from_db()
+        return self.product.stock
+
+    def test_checkout_movement_points_at_the_order(self):
+        movement = StockMovement.objects.get(reason='checkout')
+        self.assertEqual((movement.order_id, movement.quantity), (self.order.id, -2))
+        self.assertEqual(self._stock(), 3)
+
+    def test_cancel_restocks_once(self):
+        response = self.client.post(f'/api/v1/orders/{self.order.id}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._stock(), 5)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(f'/api/v1/orders/{self.order.id}/update_status/', {'status': 'refunded'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._stock(), 5)
+        self.assertEqual(
+            list(StockMovement.objects.filter(order=self.order).values_list('reason', 'quantity').order_by('id')),
+            [('checkout', -2), ('cancel', 2)],
+        )
+
+    def test_bulk_refund_restocks(self):
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post('/api/v1/orders/bulk_update_status/', {
+            'updates': [{'id': self.order.id, 'status': 'refunded'}],
+        }, format='json')
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(self._stock(), 5)
+        self.assertTrue(StockMovement.objects.filter(order=self.order, reason='refund', quantity=2).exists())
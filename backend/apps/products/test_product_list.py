@@ -0,0 +1,67 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.products.models import Category, Product, ProductImage, ProductVariant
+
+
+class ProductListSerializerTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Lamps', slug='lamps')
+        self.lamp = self._product('LAMP', stock=0, compare_price='30.00')
+        ProductImage.objects.create(product=self.lamp, image='products/side.jpg', order=0)
+        ProductImage.objects.create(product=self.lamp, image='products/front.jpg', is_primary=True, order=1)
+        ProductVariant.objects.create(product=self.lamp, name='Color', value='Red', sku='LAMP-RED')
+
+    def _product(self, sku, **extra):
+        return Product.objects.create(
+            name=sku.title(), slug=sku.lower(), description='Long description ' * 50,
+            category=self.category, sku=sku, price='20.00', cost_price='5.00', **extra
+        )
+
+    def _list(self):
+        response = self.client.get('/api/v1/products/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_list_uses_compact_cards(self):
+        card = self._list()[0]
+        for field in ('description', 'cost_price', 'variants', 'attributes', 'images', 'stock'):
+            self.assertNotIn(field, card)
+        self.assertEqual(card['primary_image'], 'http://testserver/media/products/front.jpg')
+        self.assertFalse(card['in_stock'])
+        self.assertTrue(card['is_on_sale'])
+        self.assertEqual(card['category_name'], 'Lamps')
+
+    def test_product_without_primary_image(self):
+        self.lamp.delete()
+        self._product('BULB', stock=3)
+        card = self._list()[0]
+        self.assertIsNone(card['primary_image'])
+        self.assertTrue(card['in_stock'])
+
+    def test_large_columns_are_not_selected(self):
+        with CaptureQueriesContext(connection) as context:
+            self._list()
+        product_query = next(q['sql'] for q in context.captured_queries if 'FROM "products"' in q['sql'] and 'LIMIT' in q['sql'])
+        self.assertNotIn('"products"."description"', product_query)
+        image_query = next(q['sql'] for q in context.captured_queries if 'product_images' in q['sql'])
+        self.assertIn('is_primary', image_query)
+
+    def test_query_count_does_not_grow_with_page(self):
+        with CaptureQueriesContext(connection) as context:
+            self._list()
+        baseline = len(context.captured_queries)
+        for i in range(5):
+            product = self._product(f'EXTRA{i}')
+            ProductImage.objects.create(product=product, image=f'products/{i}.jpg', is_primary=True)
+        with self.assertNumQueries(baseline):
+            self._list()
+
+    def test_detail_keeps_full_payload(self):
+        response = self.client.get('/api/v1/products/lamp/')
+        self.assertEqual(len(response.data['images']), 2)
+        self.assertEqual(len(response.data['variants']), 1)
+        self.assertIn('description', response.data)
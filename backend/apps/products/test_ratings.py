@@ -0,0 +1,102 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.products.models import Category, Product
+from apps.reviews.models import Review
+
+
+class ProductRatingAggregateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username='rating-admin', email='rating-admin@example.com', password='password123', is_staff=True,
+        )
+        self.shopper = User.objects.create_user(
+            username='rating-shopper', email='rating-shopper@example.com', password='password123',
+        )
+        category = Category.objects.create(name='Ratings', slug='ratings')
+        self.product = Product.objects.create(
+            name='Lamp', slug='lamp', description='', category=category, sku='LAMP', price='30.00', stock=3,
+        )
+        self.other = Product.objects.create(
+            name='Desk', slug='desk', description='', category=category, sku='DESK', price='90.00', stock=3,
+        )
+
+    def _rating(self, product=None):
+        product = Product.objects.get(pk=(product or self.product).pk)
+        return (product.rating_count, product.rating_sum,
+                [getattr(product, f'rating_{star}') for star in range(1, 6)])
+
+    def _review(self, rating):
+        self.client.force_authenticate(self.shopper)
+        response = self.client.post('/api/v1/reviews/', {
+            'product': self.product.pk, 'rating': rating, 'title': 'Lamp', 'comment': 'Bright',
+        }, format='json')
+        self.assertIn(response.status_code, (200, 201), response.data)
+        return response.data['id']
+
+    def test_only_approved_reviews_count(self):
+        review_id = self._review(4)
+        self.assertEqual(self._rating(), (0, 0, [0, 0, 0, 0, 0]))
+
+        self.client.force_authenticate(self.admin)
+        self.client.post(f'/api/v1/reviews/{review_id}/approve/')
+        self.assertEqual(self._rating(), (1, 4, [0, 0, 0, 1, 0]))
+
+        self.client.post(f'/api/v1/reviews/{review_id}/unapprove/')
+        self.assertEqual(self._rating(), (0, 0, [0, 0, 0, 0, 0]))
+
+    def test_repeated_approvals_count_the_review_once(self):
+        review_id = self._review(3)
+        self.client.force_authenticate(self.admin)
+        for _ in range(2):
+            response = self.client.post(f'/api/v1/reviews/{review_id}/approve/')
+            self.assertEqual((response.status_code, response.data['is_approved']), (200, True))
+        self.assertEqual(self._rating(), (1, 3, [0, 0, 1, 0, 0]))
+
+        for _ in range(2):
+            self.client.post(f'/api/v1/reviews/{review_id}/unapprove/')
+        self.assertEqual(self._rating(), (0, 0, [0, 0, 0, 0, 0]))
+
+    def test_rerating_and_deleting_move_the_histogram(self):
+        review_id = self._review(2)
+        Review.objects.filter(pk=review_id).update(is_approved=True)
+        call_command('rebuild_product_ratings', stdout=StringIO())
+        self.assertEqual(self._rating(), (1, 2, [0, 1, 0, 0, 0]))
+
+        self._review(5)  # same user and product: updates the review
+        self.assertEqual(self._rating(), (1, 5, [0, 0, 0, 0, 1]))
+
+        review = Review.objects.get(pk=review_id)
+        review.product = self.other
+        review.save()
+        self.assertEqual(self._rating(), (0, 0, [0, 0, 0, 0, 0]))
+        self.assertEqual(self._rating(self.other), (1, 5, [0, 0, 0, 0, 1]))
+
+        review.delete()
+        self.assertEqual(self._rating(self.other), (0, 0, [0, 0, 0, 0, 0]))
+
+    def test_list_payload_and_rebuild(self):
+        for i, rating in enumerate((5, 4, 4)):
+            user = User.objects.create_user(username=f'r{i}', email=f'r{i}@example.com', password='password123')
+            Review.objects.create(product=self.product, user=user, rating=rating, title='t', comment='c',
+                                  is_approved=True)
+        Product.objects.filter(pk=self.product.pk).update(rating_count=0, rating_sum=0, rating_4=0)
+
+        out = StringIO()
+        call_command('rebuild_product_ratings', '--batch-size', '1', stdout=out)
+        self.assertIn('Rebuilt ratings for 2 products', out.getvalue())
+
+        response = self.client.get('/api/v1/products/')
+        cards = {card['slug']: card for card in response.data['results']}
+        self.assertEqual(cards['lamp']['rating'], {
+            'count': 3, 'average': 4.33, 'histogram': {'1': 0, '2': 0, '3': 0, '4': 2, '5': 1},
+        })
+        self.assertEqual(cards['desk']['rating']['average'], None)
+        detail = self.client.get('/api/v1/products/lamp/').data
+        self.assertEqual(detail['rating']['count'], 3)
+        self.assertNotIn('rating_sum', detail)
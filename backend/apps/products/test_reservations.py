@@ -0,0 +1,157 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Address, User
+from apps.cart.models import Cart, CartItem
+from apps.products import reservations
+from apps.products.models import Category, Product, ProductVariant, StockReservation
+from apps.products.stock import InsufficientStock, StockLine, decrement_stock
+
+
+class ReservationServiceTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Holds', slug='holds')
+        self.product = Product.objects.create(
+            name='Lamp', slug='lamp', description='', category=category, sku='LAMP', price='10.00', stock=5,
+        )
+        self.variant = ProductVariant.objects.create(
+            product=self.product, name='Color', value='Red', sku='LAMP-RED', stock=2,
+        )
+        self.carts = [
+            Cart.objects.create(user=User.objects.create_user(
+                username=f'holder{i}', email=f'holder{i}@example.com', password='password123',
+            ))
+            for i in range(2)
+        ]
+
+    def _available(self, exclude_cart_id=None):
+        return reservations.availability(
+            [StockLine(None, self.product.pk, None, 1), StockLine(None, self.product.pk, self.variant.pk, 1)],
+            exclude_cart_id,
+        )
+
+    def test_available_to_sell_subtracts_active_holds(self):
+        reservations.reserve([StockLine(1, self.product.pk, None, 3)], cart=self.carts[0])
+        reservations.reserve([StockLine(2, self.product.pk, self.variant.pk, 2)], cart=self.carts[1])
+        self.assertEqual(self._available(), {(self.product.pk, None): 2, (self.product.pk, self.variant.pk): 0})
+        self.assertEqual(self._available(self.carts[0].pk)[(self.product.pk, None)], 5)
+
+        StockReservation.objects.filter(cart=self.carts[0]).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self._available()[(self.product.pk, None)], 5)
+
+    def test_reserve_is_all_or_nothing(self):
+        reservations.reserve([StockLine(1, self.product.pk, None, 4)], cart=self.carts[0])
+        with self.assertRaises(InsufficientStock) as ctx:
+            reservations.reserve([
+                StockLine(2, self.product.pk, self.variant.pk, 1),
+                StockLine(3, self.product.pk, None, 2),
+            ], cart=self.carts[1])
+        self.assertEqual([(s.line.key, s.available) for s in ctx.exception.shortages], [(3, 1)])
+        self.assertFalse(StockReservation.objects.filter(cart=self.carts[1]).exists())
+
+    def test_reserving_again_replaces_the_carts_holds(self):
+        reservations.reserve([StockLine(1, self.product.pk, None, 5)], cart=self.carts[0])
+        reservations.reserve([StockLine(1, self.product.pk, None, 4)], cart=self.carts[0])
+        self.assertEqual(self._available()[(self.product.pk, None)], 1)
+
+    def test_decrement_respects_other_carts_holds(self):
+        reservations.reserve([StockLine(1, self.product.pk, None, 4)], cart=self.carts[0])
+        with self.assertRaises(InsufficientStock) as ctx:
+            decrement_stock([StockLine(2, self.product.pk, None, 2)], cart_id=self.carts[1].pk)
+        self.assertEqual(ctx.exception.shortages[0].available, 1)
+        decrement_stock([StockLine(1, self.product.pk, None, 4)], cart_id=self.carts[0].pk)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+    def test_sweeper_releases_expired_holds_in_batches(self):
+        reservations.reserve([StockLine(1, self.product.pk, None, 1)], cart=self.carts[0])
+        reservations.reserve([StockLine(2, self.product.pk, None, 1)], cart=self.carts[1])
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        out = StringIO()
+        call_command('release_expired_reservations', '--batch-size', '1', stdout=out)
+        self.assertIn('Released 2', out.getvalue())
+        self.assertFalse(StockReservation.objects.filter(status=StockReservation.STATUS_ACTIVE).exists())
+
+    def test_active_holds_are_summed_from_the_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('plan text is SQLite specific')
+        queryset = StockReservation.objects.filter(
+            product=self.product, variant__isnull=True, status='active', expires_at__gt=timezone.now(),
+        ).values('product').annotate(total=Sum('quantity'))
+        self.assertIn('reservations_active_idx', queryset.explain())
+
+
+class CartReservationEndpointTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='res', email='res@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Holds', slug='holds')
+        self.product = Product.objects.create(
+            name='Lamp', slug='lamp', description='', category=category, sku='LAMP', price='10.00', stock=3,
+        )
+        self.cart = Cart.objects.create(user=self.user)
+        self.item = CartItem.objects.create(cart=self.cart, product=self.product, quantity=3)
+
+    def test_reserve_then_checkout_commits_the_hold(self):
+        response = self.client.post('/api/v1/cart/reserve/')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['reservations'][0]['quantity'], 3)
+
+        other = User.objects.create_user(username='other', email='other@example.com', password='password123')
+        other_cart = Cart.objects.create(user=other)
+        with self.assertRaises(InsufficientStock):
+            decrement_stock([StockLine(0, self.product.pk, None, 1)], cart_id=other_cart.pk)
+
+        address = Address.objects.create(
+            user=self.user, address_type='shipping', full_name='Res', phone='1',
+            address_line1='1 St', city='City', state='ST', postal_code='1', country='US',
+        )
+        response = self.client.post('/api/v1/orders/create_from_cart/', {
+            'shipping_address': address.id, 'billing_address': address.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        hold = StockReservation.objects.get()
+        self.assertEqual((hold.status, hold.order_id), (StockReservation.STATUS_COMMITTED, response.data['id']))
+
+    def test_partial_checkout_commits_only_the_checked_out_holds(self):
+        lamp_shade = Product.objects.create(
+            name='Shade', slug='shade', description='', category=self.product.category, sku='SHADE',
+            price='5.00', stock=2,
+        )
+        CartItem.objects.create(cart=self.cart, product=lamp_shade, quantity=1)
+        self.client.post('/api/v1/cart/reserve/')
+        address = Address.objects.create(
+            user=self.user, address_type='shipping', full_name='Res', phone='1',
+            address_line1='1 St', city='City', state='ST', postal_code='1', country='US',
+        )
+        response = self.client.post('/api/v1/orders/create_from_cart/', {
+            'shipping_address': address.id, 'billing_address': address.id, 'item_ids': [self.item.id],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(
+            dict(StockReservation.objects.values_list('product_id', 'status')),
+            {self.product.id: StockReservation.STATUS_COMMITTED, lamp_shade.id: StockReservation.STATUS_ACTIVE},
+        )
+
+    def test_reserve_reports_shortages_in_checkout_format(self):
+        self.item.quantity = 4
+        self.item.save()
+        response = self.client.post('/api/v1/cart/reserve/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['details'], [{
+            'cart_item_id': self.item.id, 'product_id': self.product.id,
+            'available': 3, 'requested': 4, 'reason': 'insufficient_stock',
+        }])
+
+    def test_clear_releases_holds(self):
+        self.client.post('/api/v1/cart/reserve/')
+        self.client.post('/api/v1/cart/clear/')
+        self.assertEqual(StockReservation.objects.get().status, StockReservation.STATUS_RELEASED)
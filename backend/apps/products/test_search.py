@@ -0,0 +1,112 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.products.models import Category, Product
+from apps.products import search
+from apps.products.search import get_search_engine, tokenize
+
+
+class TokenizeTests(TestCase):
+    def test_splits_on_punctuation_and_lowercases(self):
+        self.assertEqual(tokenize('Smart-Phone  X_1'), ['smart', 'phone', 'x', '1'])
+
+    def test_blank_query(self):
+        self.assertEqual(tokenize('  -- '), [])
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Electronics', slug='electronics')
+        self.other_category = Category.objects.create(name='Home', slug='home')
+        self.phone = self._product('Smartphone X', 'SM-X-001', 'Flagship phone with a great camera')
+        self.case = self._product('Leather Case', 'CASE-001', 'Protective case for the Smartphone X')
+        self.lamp = self._product('Desk Lamp', 'LAMP-001', 'Warm light', category=self.other_category)
+
+    def _product(self, name, sku, description, category=None, **extra):
+        return Product.objects.create(
+            name=name,
+            slug=sku.lower(),
+            description=description,
+            category=category or self.category,
+            sku=sku,
+            price='10.00',
+            stock=5,
+            **extra
+        )
+
+    def _search(self, query, **params):
+        response = self.client.get('/api/v1/products/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['sku'] for item in response.data['results']]
+
+    def test_engine_available_on_sqlite(self):
+        self.assertIsNotNone(get_search_engine())
+
+    def test_engine_is_detected_never_installed_by_lookups(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE product_search')
+        search._available.clear()
+        self.addCleanup(search._available.clear)
+        with CaptureQueriesContext(connection) as context:
+            self.assertIsNone(get_search_engine())
+            self.assertEqual(sorted(self._search('phone')), ['CASE-001', 'SM-X-001'])
+        self.assertFalse(any('CREATE' in q['sql'] for q in context.captured_queries))
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self._search('smartphone'), ['SM-X-001', 'CASE-001'])
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self._search('smartphone'), ['SM-X-001', 'CASE-001'])
+
+    def test_prefix_matching(self):
+        self.assertEqual(self._search('lam'), ['LAMP-001'])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(self._search('leather smartphone'), ['CASE-001'])
+        self.assertEqual(self._search('leather lamp'), [])
+
+    def test_exact_sku_fast_path(self):
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self._search('case-001'), ['CASE-001'])
+        self.assertFalse(any('product_search' in q['sql'] for q in context.captured_queries))
+
+    def test_inactive_products_are_excluded(self):
+        self.lamp.is_active = False
+        self.lamp.save()
+        self.assertEqual(self._search('lamp'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.lamp.name = 'Floor Light'
+        self.lamp.save()
+        self.assertEqual(self._search('floor'), ['LAMP-001'])
+        self.assertEqual(self._search('desk'), [])
+
+        self.lamp.delete()
+        self.assertEqual(self._search('floor'), [])
+
+    def test_combines_with_filters(self):
+        self.assertEqual(self._search('smartphone', category=self.other_category.id), [])
+        self.assertEqual(self._search('light', category=self.other_category.id), ['LAMP-001'])
+
+    def test_explicit_ordering_overrides_rank(self):
+        self.case.price = '5.00'
+        self.case.save()
+        self.assertEqual(self._search('smartphone', ordering='price'), ['CASE-001', 'SM-X-001'])
+
+    def test_rebuild_command_reindexes_everything(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM product_search')
+        self.assertEqual(self._search('lamp'), [])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self._search('lamp'), ['LAMP-001'])
+
+    @override_settings(PRODUCT_SEARCH_ENGINE='none')
+    def test_falls_back_to_icontains_without_engine(self):
+        self.assertEqual(sorted(self._search('phone')), ['CASE-001', 'SM-X-001'])
@@ -0,0 +1,106 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Address, User
+from apps.cart.models import Cart, CartItem
+from apps.orders.models import Order
+from apps.products.models import Category, Product, ProductVariant
+from apps.products.stock import InsufficientStock, StockLine, decrement_stock
+
+
+class DecrementStockTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Stock', slug='stock')
+        self.shirt = Product.objects.create(
+            name='Shirt', slug='shirt', description='', category=category, sku='SHIRT', price='10.00', stock=5,
+        )
+        self.cap = Product.objects.create(
+            name='Cap', slug='cap', description='', category=category, sku='CAP', price='5.00', stock=1,
+        )
+        self.large = ProductVariant.objects.create(
+            product=self.shirt, name='Size', value='L', sku='SHIRT-L', stock=2,
+        )
+
+    def _stock(self):
+        return [
+            Product.objects.get(pk=self.shirt.pk).stock,
+            Product.objects.get(pk=self.cap.pk).stock,
+            ProductVariant.objects.get(pk=self.large.pk).stock,
+        ]
+
+    def test_one_conditional_update_per_table(self):
+        lines = [
+            StockLine('a', self.shirt.pk, None, 3),
+            StockLine('b', self.cap.pk, None, 1),
+            StockLine('c', self.shirt.pk, self.large.pk, 2),
+        ]
+        with CaptureQueriesContext(connection) as context:
+            decrement_stock(lines)
+        updates = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertIn('CASE WHEN', updates[0])
+        self.assertFalse(any(q['sql'].startswith('SELECT') for q in context.captured_queries))
+        self.assertEqual(self._stock(), [2, 0, 0])
+
+    def test_shortage_is_all_or_nothing(self):
+        lines = [
+            StockLine('a', self.shirt.pk, None, 1),
+            StockLine('b', self.cap.pk, None, 2),
+            StockLine('c', self.shirt.pk, self.large.pk, 3),
+        ]
+        with self.assertRaises(InsufficientStock) as ctx:
+            decrement_stock(lines)
+        self.assertEqual(
+            [(s.line.key, s.available) for s in ctx.exception.shortages],
+            [('b', 1), ('c', 2)],
+        )
+        self.assertEqual(self._stock(), [5, 1, 2])
+
+    def test_missing_row_is_reported(self):
+        with self.assertRaises(InsufficientStock) as ctx:
+            decrement_stock([StockLine('x', self.shirt.pk, 99999, 1)])
+        self.assertIsNone(ctx.exception.shortages[0].available)
+
+
+class CheckoutStockErrorTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='stock', email='stock@example.com', password='password123')
+        self.client.force_authenticate(user=self.user)
+        category = Category.objects.create(name='Stock', slug='stock')
+        self.product = Product.objects.create(
+            name='Shirt', slug='shirt', description='', category=category, sku='SHIRT', price='10.00', stock=5,
+        )
+        self.variant = ProductVariant.objects.create(
+            product=self.product, name='Size', value='L', sku='SHIRT-L', stock=1,
+        )
+        self.address = Address.objects.create(
+            user=self.user, address_type='shipping', full_name='Stock User', phone='1',
+            address_line1='1 St', city='City', state='ST', postal_code='1', country='US',
+        )
+        cart = Cart.objects.create(user=self.user)
+        self.plain = CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        self.sized = CartItem.objects.create(cart=cart, product=self.product, variant=self.variant, quantity=3)
+
+    def test_variant_shortage_keeps_error_format_and_rolls_back(self):
+        response = self.client.post('/api/v1/orders/create_from_cart/', {
+            'shipping_address': self.address.id, 'billing_address': self.address.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {
+            'error': 'Insufficient stock',
+            'details': [{
+                'cart_item_id': self.sized.id,
+                'product_id': self.product.id,
+                'variant_id': self.variant.id,
+                'available': 1,
+                'requested': 3,
+                'reason': 'insufficient_stock',
+            }],
+        })
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.count(), 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 5)
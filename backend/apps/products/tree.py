@@ -0,0 +1,124 @@
+"""
+In-process cache of the category tree.
+
+The full tree is small and read on nearly every catalog page (breadcrumbs,
+``?category_tree=`` lookups), so each process keeps a copy loaded with a
+single query. Category writes bump a version number in the catalog cache;
+processes compare it on access and reload when it moved.
+"""
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.db import transaction
+
+from .cache import get_catalog_cache
+from .models import CATEGORY_PATH_SEPARATOR, Category
+
+
+TREE_VERSION_KEY = 'category_tree:version'
+
+
+class CategoryNode:
+    __slots__ = ('id', 'name', 'slug', 'parent_id', 'path', 'depth', 'is_active')
+
+    def __init__(self, id, name, slug, parent_id, path, depth, is_active):
+        self.id = id
+        self.name = name
+        self.slug = slug
+        self.parent_id = parent_id
+        self.path = path
+        self.depth = depth
+        self.is_active = is_active
+
+    @property
+    def ancestor_ids(self) -> List[int]:
+        return [int(part) for part in self.path.split(CATEGORY_PATH_SEPARATOR) if part]
+
+
+class CategoryTree:
+    def __init__(self, nodes):
+        self.by_id: Dict[int, CategoryNode] = {node.id: node for node in nodes}
+        self.by_slug: Dict[str, CategoryNode] = {node.slug: node for node in nodes}
+        self.children: Dict[Optional[int], List[int]] = {}
+        for node in sorted(nodes, key=lambda n: n.name):
+            self.children.setdefault(node.parent_id, []).append(node.id)
+
+    @classmethod
+    def load(cls) -> 'CategoryTree':
+        fields = CategoryNode.__slots__
+        return cls([CategoryNode(*row) for row in Category.objects.values_list(*fields)])
+
+    def get(self, category_id) -> Optional[CategoryNode]:
+        return self.by_id.get(category_id)
+
+    def get_by_slug(self, slug) -> Optional[CategoryNode]:
+        return self.by_slug.get(slug)
+
+    def ancestors(self, category_id, include_self=True) -> List[CategoryNode]:
+        node = self.by_id.get(category_id)
+        if node is None:
+            return []
+        ids = node.ancestor_ids if node.path else [node.id]
+        if not include_self:
+            ids = ids[:-1]
+        return [self.by_id[pk] for pk in ids if pk in self.by_id]
+
+    def descendant_ids(self, category_id, include_self=True) -> List[int]:
+        if category_id not in self.by_id:
+            return []
+        ids, stack = [], [category_id]
+        while stack:
+            current = stack.pop()
+            ids.append(current)
+            stack.extend(self.children.get(current, ()))
+        return ids if include_self else ids[1:]
+
+    def breadcrumbs(self, category_id) -> List[dict]:
+        return [
+            {'id': node.id, 'name': node.name, 'slug': node.slug}
+            for node in self.ancestors(category_id)
+        ]
+
+
+_lock = threading.Lock()
+_loaded = {'version': None, 'tree': None}
+
+
+def _tree_version() -> int:
+    cache = get_catalog_cache()
+    version = cache.get(TREE_VERSION_KEY)
+    if version is None:
+        cache.add(TREE_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(TREE_VERSION_KEY) or int(time.time() * 1000)
+    return int(version)
+
+
+def get_category_tree() -> CategoryTree:
+    """Return this process's copy of the tree, reloading it if stale."""
+    version = _tree_version()
+    if _loaded['version'] != version:
+        with _lock:
+            if _loaded['version'] != version:
+                _loaded['tree'] = CategoryTree.load()
+                _loaded['version'] = version
+    return _loaded['tree']
+
+
+def _bump_tree_version() -> None:
+    cache = get_catalog_cache()
+    try:
+        cache.incr(TREE_VERSION_KEY)
+    except ValueError:
+        cache.set(TREE_VERSION_KEY, int(time.time() * 1000), timeout=None)
+
+
+def invalidate_category_tree() -> None:
+    """Make every process reload the tree on next access.
+
+    Bumped again on commit, like ``invalidate_catalog()``, so a process
+    that reloaded before the write committed does not keep the old tree.
+    """
+    _bump_tree_version()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(_bump_tree_version)
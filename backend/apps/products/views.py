@@ -1,8 +1,17 @@
-from rest_framework import viewsets, filters, permissions
+from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django.db.models import Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
+from apps.counters.buffer import record as record_count
+from apps.counters.shards import with_totals
+from .cache import CatalogCacheMixin
+from .facets import get_facet_engine
+from .filters import ProductFilter, ProductSearchFilter, SearchRankOrderingFilter
 from .models import Category, Brand, Product, ProductImage, ProductVariant
 from .serializers import (
-    CategorySerializer, BrandSerializer, ProductSerializer,
+    CategorySerializer, BrandSerializer, ProductSerializer, ProductDetailSerializer,
+    ProductListSerializer,
     ProductImageSerializer, ProductVariantSerializer
 )
 
@@ -19,17 +28,44 @@ class BrandViewSet(viewsets.ReadOnlyModelViewSet):
     lookup_field = 'slug'
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = ProductSerializer
     lookup_field = 'slug'
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'brand', 'is_featured']
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, SearchRankOrderingFilter]
+    filterset_class = ProductFilter
     search_fields = ['name', 'description', 'sku']
     ordering_fields = ['price', 'created_at', 'name']
     ordering = ['-created_at']
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ProductListSerializer
+        if self.action == 'retrieve':
+            return ProductDetailSerializer
+        return super().get_serializer_class()
+
+    def retrieve(self, request, *args, **kwargs):
+        # Counted in process memory and written in the background, so a view
+        # costs no query, even when the response comes from the cache.
+        record_count(Product, 'views_count', slug=kwargs[self.lookup_field])
+        return super().retrieve(request, *args, **kwargs)
+
     def get_queryset(self):
-        return Product.objects.filter(is_active=True).select_related(
+        if self.action == 'list':
+            return Product.objects.filter(is_active=True).select_related(
+                'category',
+                'brand'
+            ).prefetch_related(
+                Prefetch(
+                    'images',
+                    queryset=ProductImage.objects.filter(is_primary=True),
+                    to_attr='primary_images',
+                )
+            ).defer(
+                'description',
+                'short_description',
+            ).order_by('-created_at', '-id')
+        return with_totals(Product.objects.filter(is_active=True), 'views_count').select_related(
             'category',
             'brand'
         ).prefetch_related(
@@ -38,6 +74,14 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
             'attributes'
         ).order_by('-created_at', '-id')
 
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Facet counts for the products matching the current filters."""
+        return Response(get_facet_engine().get_counts(
+            request.query_params,
+            lambda: self.filter_queryset(Product.objects.filter(is_active=True)),
+        ))
+
 
 class CategoryAdminViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
@@ -52,7 +96,7 @@ class BrandAdminViewSet(viewsets.ModelViewSet):
 
 
 class ProductAdminViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all().select_related('category', 'brand')
+    queryset = with_totals(Product.objects.all(), 'views_count').select_related('category', 'brand')
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAdminUser]
 
@@ -22,6 +22,10 @@ class Review(TimeStampedModel):
         verbose_name_plural = 'Reviews'
         unique_together = ['product', 'user']
         ordering = ['-created_at']
+        indexes = [
+            # A product's approved reviews, newest first, without a sort.
+            models.Index(fields=['product', 'is_approved', '-created_at', '-id'], name='reviews_product_approved_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.product.name} ({self.rating}★)"
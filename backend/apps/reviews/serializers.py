@@ -11,9 +11,14 @@ class ReviewImageSerializer(serializers.ModelSerializer):
 class ReviewSerializer(serializers.ModelSerializer):
     images = ReviewImageSerializer(many=True, read_only=True)
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
+    # Column plus pending counter shards when the queryset was annotated.
+    helpful_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Review
         fields = '__all__'
         read_only_fields = ['id', 'user', 'is_verified_purchase', 'is_approved', 
                             'helpful_count', 'created_at', 'updated_at']
+
+    def get_helpful_count(self, obj):
+        return getattr(obj, 'helpful_count_total', obj.helpful_count)
@@ -0,0 +1,45 @@
+"""
+Signal handlers for the reviews app.
+
+Connected in ``ReviewsConfig.ready()``.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from apps.products import ratings
+
+from .models import Review
+
+
+def capture_rating(sender, instance, raw=False, using=None, **kwargs):
+    """pre_save: remember what the stored review contributed to its product's ratings.
+
+    Inside a transaction the row is locked until commit, so two concurrent
+    saves can't both compute their delta from the same stored state.
+    (``approve``/``unapprove`` don't save; they flip the flag conditionally.)
+    """
+    instance._rating_before = None
+    if raw or instance.pk is None:
+        return
+    stored = Review.objects.filter(pk=instance.pk)
+    if transaction.get_connection(using).in_atomic_block:
+        stored = stored.select_for_update()
+    stored = stored.values_list('product_id', 'rating', 'is_approved').first()
+    if stored is not None:
+        instance._rating_before = ratings.contribution(*stored)
+
+
+def update_ratings_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    after = ratings.contribution(instance.product_id, instance.rating, instance.is_approved)
+    ratings.apply_change(getattr(instance, '_rating_before', None), after)
+
+
+def update_ratings_on_delete(sender, instance, **kwargs):
+    ratings.apply_change(ratings.contribution(instance.product_id, instance.rating, instance.is_approved), None)
+
+
+pre_save.connect(capture_rating, sender=Review, dispatch_uid='review_ratings_capture')
+post_save.connect(update_ratings_on_save, sender=Review, dispatch_uid='review_ratings_save')
+post_delete.connect(update_ratings_on_delete, sender=Review, dispatch_uid='review_ratings_delete')
@@ -3,6 +3,9 @@ from django.db.models import Q
 from rest_framework import status, viewsets, permissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from django.utils import timezone
+from apps.counters import shards
+from apps.products import ratings
 from .models import Review
 from .serializers import ReviewSerializer
 
@@ -32,7 +35,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
         product_id = self.request.query_params.get('product', None)
         if product_id:
             queryset = queryset.filter(product_id=product_id)
-        return queryset.select_related('user', 'product').order_by('-created_at', '-id')
+        return shards.with_totals(queryset, 'helpful_count').select_related('user', 'product').order_by('-created_at', '-id')
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
     def pending(self, request):
@@ -46,16 +49,34 @@ class ReviewViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def approve(self, request, pk=None):
-        review = self.get_object()
-        review.is_approved = True
-        review.save(update_fields=['is_approved'])
-        return Response(self.get_serializer(review).data, status=status.HTTP_200_OK)
+        return self._set_approved(True)
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def unapprove(self, request, pk=None):
+        return self._set_approved(False)
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
+    def helpful(self, request, pk=None):
+        """Count a "this review was helpful" vote on a sharded counter (no hot row lock)."""
         review = self.get_object()
-        review.is_approved = False
-        review.save(update_fields=['is_approved'])
+        shards.increment(Review, review.pk, 'helpful_count')
+        return Response({'id': review.pk, 'helpful_count': shards.total(review, 'helpful_count')})
+
+    def _set_approved(self, approved):
+        """Flip ``is_approved`` with a conditional UPDATE; only the request that flips it moves the ratings."""
+        review = self.get_object()
+        with transaction.atomic():
+            flipped = Review.objects.filter(pk=review.pk, is_approved=not approved).update(
+                is_approved=approved, updated_at=timezone.now(),
+            )
+            if flipped:
+                # Our UPDATE holds the row lock, so these are the values whose contribution flipped.
+                product_id, rating = Review.objects.filter(pk=review.pk).values_list('product_id', 'rating').get()
+                ratings.apply_change(
+                    ratings.contribution(product_id, rating, not approved),
+                    ratings.contribution(product_id, rating, approved),
+                )
+        review = self.get_queryset().get(pk=review.pk)
         return Response(self.get_serializer(review).data, status=status.HTTP_200_OK)
 
     def create(self, request, *args, **kwargs):
@@ -16,6 +16,10 @@ class TelemetryConfig(AppConfig):
     
     def ready(self):
         """Initialize OpenTelemetry when Django starts."""
+        if getattr(settings, 'QUERY_AUDIT_LOG', None):
+            from utils.query_audit import install_recorder
+            install_recorder(settings.QUERY_AUDIT_LOG)
+
         if getattr(settings, 'OTEL_ENABLED', True):
             # Check that the configured OTLP endpoint is reachable before initializing
             try:
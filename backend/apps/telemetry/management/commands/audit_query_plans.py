@@ -0,0 +1,58 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from utils.query_audit import audit, read_log, suggest_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Explain the statements recorded with QUERY_AUDIT_LOG (from a test or benchmark '
+        'run) against a fresh test database and report full table scans per table, '
+        'with the index columns each table would need.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('logs', nargs='+', help='Recorder log files (JSON lines)')
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--ignore', default='',
+                            help='Comma-separated tables whose full scans are expected (small lookup tables)')
+        parser.add_argument('--examples', type=int, default=3, help='Queries shown per table (default: 3)')
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help='Exit with an error if any table is scanned')
+
+    def handle(self, *args, **options):
+        statements = read_log(options['logs'])
+        ignore = {table.strip() for table in options['ignore'].split(',') if table.strip()}
+        connection = connections[options['database']]
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = audit(statements, using=options['database'], ignore_tables=ignore)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(f'{len(statements)} distinct statements explained')
+        for table, plans in sorted(report.scans.items(), key=lambda item: -len(item[1])):
+            suggestions = Counter(
+                tuple(columns) for columns in (suggest_index(plan.sql, table) for plan in plans) if columns
+            )
+            self.stdout.write(self.style.WARNING(f'\n{table}: full scan in {len(plans)} statements'))
+            for columns, count in suggestions.most_common(3):
+                self.stdout.write(f'  index on ({", ".join(columns)}) would serve {count}')
+            for plan in plans[:options['examples']]:
+                self.stdout.write(f'  - {plan.sql[:300]}')
+
+        if report.sorts:
+            self.stdout.write(f'\n{len(report.sorts)} statements sort rows no index provides in order')
+            if options['verbosity'] > 1:
+                for plan in report.sorts:
+                    self.stdout.write(f'  - {plan.sql[:300]}')
+        if report.errors:
+            self.stdout.write(f'{len(report.errors)} statements could not be planned here (skipped)')
+
+        scans = sum(len(plans) for plans in report.scans.values())
+        if scans and options['fail_on_scan']:
+            raise CommandError(f'{scans} full table scans in {len(report.scans)} tables')
+        self.stdout.write(self.style.SUCCESS(f'\n{scans} full table scans in {len(report.scans)} tables'))
@@ -4,6 +4,7 @@ from rest_framework.test import APIClient
 from apps.accounts.models import User, Address
 from apps.products.models import Category, Product
 from apps.cart.models import Cart, CartItem
+from apps.idempotency.models import IdempotencyKey
 from apps.orders.models import Order
 from apps.payments.models import Payment
 
@@ -117,6 +118,23 @@ class CheckoutIdempotencyTests(TestCase):
         # Only one order should be created
         self.assertEqual(Order.objects.count(), initial_order_count + 1)
 
+    def test_retry_after_the_stored_response_is_purged_returns_the_same_order(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=2)
+        data = {
+            'shipping_address': self.address.id,
+            'billing_address': self.address.id,
+            'idempotency_key': 'purged-key',
+        }
+        first = self.client.post('/api/v1/orders/create_from_cart/', data)
+        self.assertEqual(first.status_code, 201)
+        IdempotencyKey.objects.all().delete()
+        CartItem.objects.create(cart=cart, product=self.product, quantity=1)
+
+        retry = self.client.post('/api/v1/orders/create_from_cart/', data)
+        self.assertEqual((retry.status_code, retry.data['id']), (200, first.data['id']))
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+
     def test_checkout_idempotency_key_via_header(self):
         """Test idempotency key can be provided via header"""
         cart = Cart.objects.create(user=self.user)
@@ -289,6 +307,16 @@ class PaymentIdempotencyTests(TestCase):
         # Only one payment should be created
         self.assertEqual(Payment.objects.count(), initial_payment_count + 1)
 
+    def test_payment_retry_after_the_stored_response_is_purged_returns_the_same_payment(self):
+        data = {'order': self.order.id, 'payment_method': 'credit_card', 'idempotency_key': 'purged-payment'}
+        first = self.client.post('/api/v1/payments/create_for_order/', data)
+        self.assertEqual(first.status_code, 201)
+        IdempotencyKey.objects.all().delete()
+
+        retry = self.client.post('/api/v1/payments/create_for_order/', data)
+        self.assertEqual((retry.status_code, retry.data['id']), (200, first.data['id']))
+        self.assertEqual(Payment.objects.filter(order=self.order).count(), 1)
+
     def test_payment_idempotency_key_via_header(self):
         """Test payment idempotency key can be provided via header"""
         idempotency_key = 'payment-header-456'
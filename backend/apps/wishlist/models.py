@@ -27,6 +27,10 @@ class WishlistItem(TimeStampedModel):
         verbose_name = 'Wishlist Item'
         verbose_name_plural = 'Wishlist Items'
         unique_together = ['wishlist', 'product']
+        indexes = [
+            # Notification fan-out: a product's wishlisters in id order.
+            models.Index(fields=['product', 'id'], name='wishlist_items_product_idx'),
+        ]
     
     def __str__(self):
         return f"{self.product.name} in {self.wishlist.user.email}'s wishlist"
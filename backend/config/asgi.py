@@ -2,6 +2,8 @@
 ASGI config for e-commerce project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Server-Sent Events (``/api/v1/events/stream/``) are answered by
+``apps.notifications.stream.EventStreamApp``; everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -13,4 +15,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings.development')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from apps.notifications.stream import EventStreamApp  # noqa: E402  (needs the app registry)
+
+application = EventStreamApp(django_application)
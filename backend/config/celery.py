@@ -0,0 +1,46 @@
+"""
+Celery application for ``TASK_EXECUTOR = 'celery'``.
+
+Start a worker with::
+
+    celery -A config.celery worker
+
+Only the background jobs registered in ``TASKS`` can be sent to a worker:
+``utils.tasks.enqueue`` looks the function up there by ``module:name`` and
+refuses anything else, so a message on the broker can only ever start one of
+these jobs. Arguments must be JSON-serializable.
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings.development')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+
+@app.task(name='notifications.notify_wishlisters')
+def notify_wishlisters(product_id, notification_type, previous_price=None, chunk_size=None):
+    from apps.notifications.fanout import notify_wishlisters
+    return notify_wishlisters(product_id, notification_type, previous_price, chunk_size)
+
+
+@app.task(name='cart.flush_cart')
+def flush_cart(user_id):
+    from apps.cart.store import flush_cart
+    return flush_cart(user_id)
+
+
+@app.task(name='counters.write_counts')
+def write_counts(counts):
+    from apps.counters.buffer import write_counts
+    return write_counts(counts)
+
+
+# ``module:name`` of the function ``enqueue`` is given -> the task that runs it.
+TASKS = {
+    'apps.notifications.fanout:notify_wishlisters': notify_wishlisters,
+    'apps.cart.store:flush_cart': flush_cart,
+    'apps.counters.buffer:write_counts': write_counts,
+}
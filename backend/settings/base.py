@@ -55,6 +55,8 @@ INSTALLED_APPS = [
     'apps.reviews',
     'apps.wishlist',
     'apps.notifications',
+    'apps.idempotency',
+    'apps.counters',
 
     # Admin API (admin-only CRUD)
     'apps.admin_api',
@@ -215,3 +217,121 @@ def _env_bool(name: str, default: bool) -> bool:
 
 
 OTEL_ENABLED = _env_bool('OTEL_ENABLED', True)
+
+# Caching
+#
+# Local-memory caches (LRU-culled) by default. Production points these aliases
+# at Redis via REDIS_URL; see settings/production.py.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalog',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Read-through response cache for the public product catalog.
+CATALOG_CACHE_ENABLED = _env_bool('CATALOG_CACHE_ENABLED', True)
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', '300'))
+
+# Full-text product search: 'auto' picks Postgres tsvector or SQLite FTS5 from
+# the database vendor; 'none' falls back to icontains matching.
+PRODUCT_SEARCH_ENGINE = os.getenv('PRODUCT_SEARCH_ENGINE', 'auto')
+
+# Page-number counts for ApproximateCountPagination (admin lists): planner
+# estimates above the threshold (PostgreSQL only), short-lived cached exact
+# counts below it.
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = int(os.getenv('PAGINATION_COUNT_ESTIMATE_THRESHOLD', '100000'))
+PAGINATION_COUNT_CACHE_ALIAS = 'default'
+PAGINATION_COUNT_CACHE_TIMEOUT = int(os.getenv('PAGINATION_COUNT_CACHE_TIMEOUT', '30'))
+
+# Product facet counts (cached in the catalog cache per filter signature)
+PRODUCT_FACET_PRICE_BANDS = [0, 25, 50, 100, 250, 500]
+PRODUCT_FACET_CACHE_TIMEOUT = int(os.getenv('PRODUCT_FACET_CACHE_TIMEOUT', '600'))
+
+# Background work (utils.tasks.enqueue): 'thread' runs on a small in-process
+# pool, 'sync' runs inline, 'celery' sends it to `celery -A config.celery worker`.
+TASK_EXECUTOR = os.getenv('TASK_EXECUTOR', 'thread')
+TASK_EXECUTOR_WORKERS = int(os.getenv('TASK_EXECUTOR_WORKERS', '4'))
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_IGNORE_RESULT = True
+
+# Cart storage: 'database' writes every change to CartItem; 'redis' keeps line
+# quantities of active carts in Redis (REDIS_URL, or an in-process stand-in)
+# and writes them back in the background and before checkout.
+CART_STORE_BACKEND = os.getenv('CART_STORE_BACKEND', 'database')
+CART_STORE_TTL = int(os.getenv('CART_STORE_TTL', str(7 * 24 * 3600)))
+# How long the Redis store serves cart line details (names, prices) without a
+# database read; quantities are always current.
+CART_STORE_READ_TTL = int(os.getenv('CART_STORE_READ_TTL', '30'))
+
+# Stock holds placed by POST /api/v1/cart/reserve/ (seconds). Expired holds stop
+# counting at once; `manage.py release_expired_reservations` tidies them up.
+STOCK_RESERVATION_TTL = int(os.getenv('STOCK_RESERVATION_TTL', str(15 * 60)))
+
+# Stock ledger (apps.products.ledger): `manage.py snapshot_stock_ledger` only
+# folds movements older than STOCK_SNAPSHOT_LAG seconds, so a movement whose
+# transaction is still open is never skipped.
+STOCK_SNAPSHOT_LAG = int(os.getenv('STOCK_SNAPSHOT_LAG', '60'))
+
+# Hot counters (apps.counters): increments are spread over COUNTER_SHARDS rows
+# per object; product views are buffered in process and written every
+# COUNTER_FLUSH_INTERVAL seconds (or at COUNTER_FLUSH_SIZE pending counters).
+# `manage.py fold_counters` moves shard values into the columns.
+COUNTER_SHARDS = int(os.getenv('COUNTER_SHARDS', '8'))
+COUNTER_FLUSH_INTERVAL = float(os.getenv('COUNTER_FLUSH_INTERVAL', '5'))
+COUNTER_FLUSH_SIZE = int(os.getenv('COUNTER_FLUSH_SIZE', '1000'))
+
+# Restock / price-drop notifications to wishlisters (apps.notifications.fanout)
+# are inserted this many per bulk insert and transaction.
+NOTIFICATION_FANOUT_CHUNK = int(os.getenv('NOTIFICATION_FANOUT_CHUNK', '1000'))
+
+# Read notifications older than this many days are moved to
+# notifications_archive by `manage.py archive_notifications` (run it daily).
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', '90'))
+
+# Per-user unread notification counters (apps.notifications.unread): kept in
+# this cache and adjusted on create / read; a missing or expired entry is
+# recounted from the database, so drift lasts at most the timeout.
+NOTIFICATION_UNREAD_CACHE_ALIAS = 'default'
+NOTIFICATION_UNREAD_CACHE_TIMEOUT = int(os.getenv('NOTIFICATION_UNREAD_CACHE_TIMEOUT', '300'))
+
+# Query-plan audit (utils.query_audit): when set, every distinct SELECT,
+# UPDATE and DELETE is appended to this file; `manage.py audit_query_plans <file>` reports the ones
+# that scan whole tables.
+QUERY_AUDIT_LOG = os.getenv('QUERY_AUDIT_LOG') or None
+
+# Live event stream (apps.notifications.stream, served by config/asgi.py).
+# Each worker process keeps at most SSE_MAX_CONNECTIONS streams open and sends
+# a heartbeat comment every SSE_HEARTBEAT_INTERVAL seconds; refused or dropped
+# clients are told to retry after SSE_RETRY_AFTER seconds. Events travel over
+# Redis pub/sub (REDIS_URL); without it only the publishing process sees them.
+# Browsers open the stream with a single-use ticket (POST
+# /api/v1/notifications/stream_ticket/) that expires after SSE_TICKET_TTL seconds.
+SSE_TICKET_TTL = int(os.getenv('SSE_TICKET_TTL', '30'))
+SSE_MAX_CONNECTIONS = int(os.getenv('SSE_MAX_CONNECTIONS', '500'))
+SSE_HEARTBEAT_INTERVAL = float(os.getenv('SSE_HEARTBEAT_INTERVAL', '15'))
+SSE_RETRY_AFTER = int(os.getenv('SSE_RETRY_AFTER', '10'))
+PUBSUB_POLL_INTERVAL = float(os.getenv('PUBSUB_POLL_INTERVAL', '0.5'))
+
+# Idempotency-Key handling for POST actions (apps.idempotency). Successful
+# responses are replayed for IDEMPOTENCY_KEY_TTL seconds; a duplicate arriving
+# while the first request is still running gets 409. An in-flight claim older
+# than IDEMPOTENCY_LOCK_TIMEOUT seconds is treated as abandoned.
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', str(24 * 3600)))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', '30'))
+
+# Order numbers (apps.orders.numbers): 'snowflake' (time-ordered, unique per
+# node), 'ulid' or 'random' (legacy). 'snowflake' needs each process that
+# creates orders to have its own ORDER_NUMBER_NODE_ID (0-1023) and refuses to
+# start without one; unset, the default is 'ulid'.
+ORDER_NUMBER_NODE_ID = os.getenv('ORDER_NUMBER_NODE_ID') or None
+ORDER_NUMBER_GENERATOR = os.getenv('ORDER_NUMBER_GENERATOR') or ('snowflake' if ORDER_NUMBER_NODE_ID else 'ulid')
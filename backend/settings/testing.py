@@ -45,3 +45,12 @@ REST_FRAMEWORK = {
     },
 }
 
+
+# Catalog response caching is exercised explicitly by its own tests
+CATALOG_CACHE_ENABLED = False
+
+# Run background tasks inline so tests see their effects
+TASK_EXECUTOR = 'sync'
+
+# Pick up pub/sub (un)subscriptions quickly in stream tests
+PUBSUB_POLL_INTERVAL = 0.02
@@ -0,0 +1,39 @@
+"""
+Small timing helpers shared by the ``bench_*`` management commands.
+"""
+import math
+import time
+from typing import Callable, Dict, List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples`` (``pct`` in 0..100)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def measure(fn: Callable[[], object], repeat: int = 20, warmup: int = 2) -> Dict[str, float]:
+    """Call ``fn`` ``repeat`` times and return p50/p99/mean in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return {
+        'p50': percentile(samples, 50),
+        'p99': percentile(samples, 99),
+        'mean': sum(samples) / len(samples),
+    }
+
+
+def format_row(label: str, stats: Dict[str, float]) -> str:
+    return f"{label:<32} p50={stats['p50']:8.2f}ms  p99={stats['p99']:8.2f}ms  mean={stats['mean']:8.2f}ms"
+
+
+class Rollback(Exception):
+    """Raised at the end of a benchmark to discard the rows it seeded."""
@@ -2,14 +2,6 @@
 Utility functions for the e-commerce application.
 """
 
-import random
-import string
-
-
-def generate_order_number():
-    """Generate a unique order number."""
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
-
 
 def calculate_discount(original_price, discount_percentage):
     """Calculate discounted price."""
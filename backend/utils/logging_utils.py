@@ -117,6 +117,23 @@ def log_order_status_change(
     logger.info(f"Order status change: {json.dumps(log_data)}")
 
 
+def log_bulk_order_status_change(
+    new_status: str,
+    changes: list,
+    changed_by: int
+):
+    """Log one bulk status change: ``changes`` holds ``order_id``/``user_id``/``old_status`` dicts."""
+    log_data = {
+        'event': 'order_status_bulk_change',
+        'new_status': new_status,
+        'order_count': len(changes),
+        'orders': changes,
+        'changed_by_user_id': changed_by,
+        'trace': _get_trace_context(),
+    }
+    logger.info(f"Order status bulk change: {json.dumps(log_data)}")
+
+
 def log_payment_status_change(
     user_id: int,
     order_id: int,
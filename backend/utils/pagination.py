@@ -1,11 +1,272 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
+from rest_framework.response import Response
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Cursor pagination over a composite ``(created_at, id)`` key.
+
+    DRF's ``CursorPagination`` positions on the first ordering field only and
+    skips ties with an OFFSET. Here the cursor carries both fields, so every
+    page is a single range scan on the ``(created_at, id)`` index: no COUNT,
+    no OFFSET, and page 1000 costs the same as page 1.
+    """
+
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    position_separator = '|'
+
+    def get_ordering(self, request, queryset, view):
+        # Keyset pages need a fixed, unique ordering; ``?ordering=`` and
+        # search ranking only apply to page-number pagination.
+        return tuple(getattr(view, 'cursor_ordering', self.ordering))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            attr = instance[field_name] if isinstance(instance, dict) else getattr(instance, field_name)
+            values.append('' if attr is None else str(attr))
+        return self.position_separator.join(values)
+
+    def _keyset_filter(self, model, position, reverse):
+        """Rows strictly after ``position`` in (possibly reversed) ordering."""
+        parts = position.split(self.position_separator, len(self.ordering) - 1)
+        if len(parts) != len(self.ordering):
+            return None
+        values = []
+        for order, raw in zip(self.ordering, parts):
+            field = model._meta.get_field(order.lstrip('-'))
+            try:
+                values.append(field.to_python(raw))
+            except ValidationError:
+                return None
+
+        # (a, b) after (x, y)  ==  a > x OR (a = x AND b > y), per direction.
+        condition = Q()
+        for index in reversed(range(len(self.ordering))):
+            order = self.ordering[index]
+            name = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            if index < len(self.ordering) - 1:
+                step |= Q(**{name: values[index]}) & condition
+            condition = step
+        # Redundant bound on the leading column so the planner can seek the
+        # index instead of scanning it up to the cursor.
+        first = self.ordering[0]
+        bound = 'lte' if first.startswith('-') != reverse else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{bound}': values[0]}) & condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            condition = self._keyset_filter(queryset.model, current_position, reverse)
+            if condition is None:
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(condition)
+
+        # Positions are unique, so the offset only ever comes from a hand-made cursor.
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
 
 
 class StandardResultsSetPagination(PageNumberPagination):
     """DRF pagination that allows client-controlled page sizes.
 
     This repo's docs and frontend rely on a `page_size` query param.
+
+    Passing ``?cursor=`` (empty for the first page) switches the request to
+    keyset pagination: the response has ``next``/``previous`` cursor links
+    and no ``count``.
     """
 
     page_size_query_param = "page_size"
     max_page_size = 100
+    cursor_query_param = "cursor"
+    cursor_pagination_class = KeysetCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_html_context()
+        return super().get_html_context()
+
+
+def estimate_count(queryset):
+    """Planner row estimate for ``queryset``, or ``None`` if unavailable.
+
+    Only PostgreSQL is supported: an unfiltered queryset reads ``reltuples``
+    from ``pg_class``, anything else takes the top-level row estimate from
+    ``EXPLAIN``.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    query = queryset.query
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct and not query.combinator:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        else:
+            sql, params = queryset.order_by().values('pk').query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            row = (plan[0]['Plan']['Plan Rows'],)
+    # reltuples is -1 for a table that has never been analyzed.
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator whose ``count`` avoids a ``COUNT(*)`` per request.
+
+    Above ``PAGINATION_COUNT_ESTIMATE_THRESHOLD`` rows the planner estimate
+    is used and ``count_is_approximate`` is set. Below it, exact counts are
+    cached per query signature for ``PAGINATION_COUNT_CACHE_TIMEOUT`` seconds.
+    """
+
+    count_is_approximate = False
+
+    @staticmethod
+    def signature(queryset) -> str:
+        sql, params = queryset.order_by().query.sql_with_params()
+        raw = f"{queryset.db}:{sql}:{params!r}"
+        return 'pagination:count:' + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+
+        threshold = getattr(settings, 'PAGINATION_COUNT_ESTIMATE_THRESHOLD', 100000)
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= threshold:
+            self.count_is_approximate = True
+            return estimate
+
+        cache = caches[getattr(settings, 'PAGINATION_COUNT_CACHE_ALIAS', 'default')]
+        key = self.signature(queryset)
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, timeout=getattr(settings, 'PAGINATION_COUNT_CACHE_TIMEOUT', 30))
+        return count
+
+    def validate_number(self, number):
+        self.count  # resolves count_is_approximate
+        if not self.count_is_approximate:
+            return super().validate_number(number)
+        # An estimate can fall short of the real last page; let the query decide.
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_is_approximate:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        return Page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class ApproximateCountPagination(StandardResultsSetPagination):
+    """Page-number pagination backed by ``CachedCountPaginator``.
+
+    Responses carry ``count_is_approximate`` next to ``count``.
+    """
+
+    django_paginator_class = CachedCountPaginator
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return super().get_paginated_response(data)
+        return Response({
+            'count': self.page.paginator.count,
+            'count_is_approximate': self.page.paginator.count_is_approximate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
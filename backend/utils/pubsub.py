@@ -0,0 +1,188 @@
+"""
+Publish/subscribe for pushing events to connected clients.
+
+Publishers call ``publish(channel, event, data)`` from anywhere (request
+threads, task workers); the message goes through Redis ``PUBLISH`` on
+``utils.redis_client.get_redis()``, so it reaches every process, or through
+the in-process ``LocalRedis`` stand-in when ``REDIS_URL`` is unset.
+
+Consumers are asyncio tasks (the SSE endpoint). Each process has one
+``Broker`` that holds a single Redis subscription, on a listener thread, for
+the channels its local subscribers want, and hands every message to their
+``asyncio.Queue``. A thousand open streams therefore cost one Redis
+connection, not a thousand. Subscribing and unsubscribing are applied by the
+listener between reads, at most ``PUBSUB_POLL_INTERVAL`` seconds later.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(event, data) -> str:
+    return json.dumps({'event': event, 'data': data}, default=str)
+
+
+def publish(channel, event, data) -> int:
+    """Send ``event`` with JSON-serializable ``data`` to ``channel``; returns receivers."""
+    return get_redis().publish(channel, _encode(event, data))
+
+
+def publish_many(messages) -> None:
+    """Publish ``(channel, event, data)`` triples in one pipeline round trip."""
+    messages = list(messages)
+    if not messages:
+        return
+    pipe = get_redis().pipeline(transaction=False)
+    for channel, event, data in messages:
+        pipe.publish(channel, _encode(event, data))
+    pipe.execute()
+
+
+class Subscription:
+    """One consumer's view of a channel; read it with ``await get(timeout)``."""
+
+    def __init__(self, broker, channel, loop, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.ready = asyncio.Event()  # set once the broker listens on the channel
+        self.dropped = 0
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A consumer this far behind is not reading; don't buffer without bound.
+            self.dropped += 1
+
+    async def get(self, timeout=None):
+        """The next ``{'event': ..., 'data': ...}``, or ``None`` after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """Per-process fan-out of one Redis subscription to many asyncio subscribers."""
+
+    def __init__(self, client=None):
+        self._client = client
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._pending = set()
+        self._listening = set()
+        self._thread = None
+
+    def _poll_interval(self) -> float:
+        return float(getattr(settings, 'PUBSUB_POLL_INTERVAL', 0.5))
+
+    def subscribe(self, channel, loop=None, maxsize=100) -> Subscription:
+        subscription = Subscription(self, channel, loop or asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+            self._pending.add(channel)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._listen, name='pubsub-broker', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+                    self._pending.add(subscription.channel)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _sync_channels(self, pubsub):
+        """Apply (un)subscriptions requested since the last read (listener thread only)."""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            wanted = {channel for channel in pending if channel in self._subscribers}
+            ready = [subscription for channel in wanted for subscription in self._subscribers[channel]]
+        added = wanted - self._listening
+        dropped = (pending - wanted) & self._listening
+        if added:
+            pubsub.subscribe(*added)
+        if dropped:
+            pubsub.unsubscribe(*dropped)
+        self._listening = (self._listening | added) - dropped
+        for subscription in ready:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.ready.set)
+            except RuntimeError:
+                self.unsubscribe(subscription)
+
+    def _dispatch(self, message):
+        channel = message['channel']
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        try:
+            payload = json.loads(message['data'])
+        except (TypeError, ValueError):
+            logger.warning('Dropping malformed pub/sub message on %s', channel)
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, payload)
+            except RuntimeError:  # its event loop is closed
+                self.unsubscribe(subscription)
+
+    def _listen(self):
+        pubsub = None
+        while True:
+            try:
+                if pubsub is None:
+                    pubsub = (self._client or get_redis()).pubsub(ignore_subscribe_messages=True)
+                    self._listening = set()
+                    with self._lock:
+                        self._pending.update(self._subscribers)
+                self._sync_channels(pubsub)
+                if not self._listening:
+                    time.sleep(self._poll_interval())
+                    continue
+                message = pubsub.get_message(ignore_subscribe_messages=True, timeout=self._poll_interval())
+                if message is not None:
+                    self._dispatch(message)
+            except Exception:
+                logger.exception('Pub/sub listener failed; reconnecting')
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+                pubsub = None
+                time.sleep(self._poll_interval())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> Broker:
+    """Return this process's shared ``Broker``."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = Broker()
+        return _broker
@@ -0,0 +1,237 @@
+"""
+Query-plan audit: which of the queries the application really runs read a
+whole table?
+
+1. Record. With ``QUERY_AUDIT_LOG=<path>`` in the environment, every distinct
+   ``SELECT``, ``UPDATE`` and ``DELETE`` a process runs is appended to
+   ``<path>`` as a JSON line
+   (``{"sql": ..., "params": [...]}``), e.g.
+   ``QUERY_AUDIT_LOG=/tmp/queries.jsonl python manage.py test apps`` or the
+   same around a ``bench_*`` command.
+2. Explain. ``manage.py audit_query_plans /tmp/queries.jsonl`` creates an
+   empty test database, explains each recorded statement there and reports
+   full table scans (and sorts that could not use an index), per table, with
+   the columns an index would need.
+
+Plans come from an empty schema, so they show what the indexes allow, not
+what the planner would pick for a given row count: SQLite plans from the
+schema alone, and on PostgreSQL sequential scans are disabled while
+explaining, so a ``Seq Scan`` means no usable index exists.
+
+``assert_no_full_scan`` uses the same classification in tests.
+"""
+import json
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+
+# -- recording ------------------------------------------------------------------
+
+
+AUDITED_STATEMENTS = {'SELECT', 'UPDATE', 'DELETE'}
+
+# Tables the database itself reads in full, not the application.
+INTERNAL_TABLES = {'sqlite_master', 'django_migrations', 'CONSTANT'}
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` that appends each distinct statement it plans to a JSONL file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip()[:6].upper() in AUDITED_STATEMENTS:
+            with self._lock:
+                if sql not in self._seen:
+                    self._seen.add(sql)
+                    with open(self.path, 'a', encoding='utf-8') as log:
+                        log.write(json.dumps({
+                            'sql': sql,
+                            'params': list(params) if params is not None else None,
+                            'alias': context['connection'].alias,
+                        }, default=str) + '\n')
+        return execute(sql, params, many, context)
+
+
+_recorder = None
+
+
+def _attach(sender, connection, **kwargs):
+    if _recorder not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_recorder)
+
+
+def install_recorder(path) -> QueryRecorder:
+    """Record the statements of every database connection of this process to ``path``."""
+    global _recorder
+    if _recorder is None:
+        _recorder = QueryRecorder(path)
+        connection_created.connect(_attach, dispatch_uid='query_audit_recorder')
+        for connection in connections.all():
+            _attach(None, connection)
+    return _recorder
+
+
+def read_log(paths: Iterable[str]) -> List[dict]:
+    """Distinct statements from recorder logs, in first-seen order."""
+    statements = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as log:
+            for line in log:
+                if line.strip():
+                    entry = json.loads(line)
+                    statements.setdefault(entry['sql'], entry)
+    return list(statements.values())
+
+# -- explaining -----------------------------------------------------------------
+
+
+@dataclass
+class Plan:
+    sql: str
+    lines: List[str]
+    full_scans: List[str] = field(default_factory=list)   # tables read in full
+    sorts: int = 0                                       # sorts not served by an index
+    error: Optional[str] = None
+
+
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(?: AS \w+)?(.*)$')
+
+
+def _explain_sqlite(cursor, sql, params):
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+    lines = [row[-1] for row in cursor.fetchall()]
+    scans = []
+    for line in lines:
+        match = _SQLITE_SCAN.match(line)
+        if match and 'INDEX' not in match.group(2) and 'SUBQUERY' not in line:
+            scans.append(match.group(1))
+    sorts = sum(1 for line in lines if line.startswith('USE TEMP B-TREE FOR') and 'ORDER BY' in line)
+    return lines, scans, sorts
+
+
+def _explain_postgresql(cursor, sql, params):
+    cursor.execute('SET LOCAL enable_seqscan = off')
+    cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+    raw = cursor.fetchone()[0]
+    root = (json.loads(raw) if isinstance(raw, str) else raw)[0]['Plan']
+    lines, scans, sorts = [], [], 0
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        relation = node.get('Relation Name')
+        lines.append('  ' * depth + node['Node Type'] + (f' on {relation}' if relation else ''))
+        if node['Node Type'] == 'Seq Scan':
+            scans.append(relation)
+        if node['Node Type'] in ('Sort', 'Incremental Sort'):
+            sorts += 1
+        stack.extend((child, depth + 1) for child in reversed(node.get('Plans', [])))
+    return lines, scans, sorts
+
+
+EXPLAINERS = {
+    'sqlite': _explain_sqlite,
+    'postgresql': _explain_postgresql,
+}
+
+
+def explain(sql, params=None, using='default') -> Plan:
+    """Plan ``sql`` on connection ``using`` and classify its table accesses."""
+    connection = connections[using]
+    explainer = EXPLAINERS.get(connection.vendor)
+    if explainer is None:
+        raise ValueError(f'Unknown query plan vendor: {connection.vendor!r}')
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            lines, scans, sorts = explainer(cursor, sql, params)
+    except Exception as exc:  # statements recorded elsewhere may not plan here
+        return Plan(sql=sql, lines=[], error=str(exc))
+    return Plan(sql=sql, lines=lines, full_scans=scans, sorts=sorts)
+
+
+def queryset_sql(queryset):
+    """``(sql, params)`` for a queryset, as it would be sent to the database."""
+    return queryset.query.sql_with_params()
+
+
+def assert_no_full_scan(testcase, queryset, using='default'):
+    """Fail ``testcase`` if ``queryset`` reads any table in full."""
+    sql, params = queryset_sql(queryset)
+    plan = explain(sql, params, using=using)
+    testcase.assertIsNone(plan.error, plan.error)
+    testcase.assertEqual(plan.full_scans, [], 'Full scan in plan:\n  {}\nfor\n  {}'.format(
+        '\n  '.join(plan.lines), sql))
+
+# -- suggestions ------------------------------------------------------------------
+
+
+def _column_pattern(table):
+    return rf'"{table}"\."(\w+)"'
+
+
+def suggest_index(sql: str, table: str) -> List[str]:
+    """Columns of ``table`` an index would need for ``sql``: filtered ones, then ORDER BY ones.
+
+    A heuristic over Django's generated SQL, meant as a starting point: the
+    columns compared in ``WHERE`` come first (equalities before ranges), then
+    the ``ORDER BY`` columns with their direction.
+    """
+    where = re.search(r'\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)', sql, re.S)
+    order = re.search(r'\bORDER BY\b(.*?)(?:\bLIMIT\b|\bOFFSET\b|$)', sql, re.S)
+    equal, ranges, columns = [], [], []
+    if where:
+        for match in re.finditer(_column_pattern(table) + r'\s*(=|IN\b|IS\b|<=|>=|<|>)?', where.group(1)):
+            column, op = match.group(1), match.group(2)
+            if op in ('=', 'IN', 'IS') or op is None:
+                equal.append(column)
+            else:
+                ranges.append(column)
+    for column in equal + ranges:
+        if column not in columns:
+            columns.append(column)
+    if order:
+        for match in re.finditer(_column_pattern(table) + r'\s*(DESC|ASC)?', order.group(1)):
+            column = ('-' if match.group(2) == 'DESC' else '') + match.group(1)
+            if match.group(1) not in columns and column not in columns:
+                columns.append(column)
+    return columns
+
+
+@dataclass
+class AuditReport:
+    scans: Dict[str, List[Plan]] = field(default_factory=dict)  # table -> plans reading it in full
+    sorts: List[Plan] = field(default_factory=list)             # plans sorting without an index
+    errors: List[Plan] = field(default_factory=list)            # statements that could not be planned
+
+
+def _unbounded(sql) -> bool:
+    """No ``WHERE`` and no ``LIMIT``: the statement means to touch every row (flushes, exports)."""
+    return not re.search(r'\bWHERE\b', sql) and not re.search(r'\bLIMIT\b', sql)
+
+
+def audit(statements: Iterable[dict], using='default', ignore_tables=()) -> AuditReport:
+    """Explain recorded ``statements`` and collect full scans (by table), sorts and failures.
+
+    Statements without ``WHERE`` or ``LIMIT`` are skipped: a full scan is what they ask for.
+    """
+    report = AuditReport()
+    for statement in statements:
+        if _unbounded(statement['sql']):
+            continue
+        plan = explain(statement['sql'], statement.get('params'), using=using)
+        if plan.error:
+            report.errors.append(plan)
+            continue
+        for table in dict.fromkeys(plan.full_scans):
+            if table not in ignore_tables and table not in INTERNAL_TABLES:
+                report.scans.setdefault(table, []).append(plan)
+        if plan.sorts:
+            report.sorts.append(plan)
+    return report
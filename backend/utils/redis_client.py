@@ -0,0 +1,279 @@
+"""
+Redis connection for application data structures (not the Django cache).
+
+``get_redis()`` returns a client for ``REDIS_URL``. Without one (development,
+tests) it returns a process-local ``LocalRedis`` that implements the commands
+this project uses with Redis semantics, so callers never branch on it.
+"""
+import queue
+import threading
+import time
+
+from django.conf import settings
+
+
+class LocalRedis:
+    """In-process stand-in for the subset of Redis commands used here.
+
+    Strings are returned as ``str`` to match a client created with
+    ``decode_responses=True``. Safe across threads, not across processes.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.RLock()
+        self._subscribers = {}
+
+    # -- keys -----------------------------------------------------------------
+
+    def _live(self, name):
+        expires = self._expires.get(name)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return self._data.get(name)
+
+    def exists(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._live(name) is not None)
+
+    def delete(self, *names):
+        with self._lock:
+            removed = 0
+            for name in names:
+                if self._live(name) is not None:
+                    removed += 1
+                self._data.pop(name, None)
+                self._expires.pop(name, None)
+            return removed
+
+    def expire(self, name, seconds):
+        with self._lock:
+            if self._live(name) is None:
+                return False
+            self._expires[name] = time.monotonic() + int(seconds)
+            return True
+
+    def flushall(self):
+        with self._lock:
+            self._data.clear()
+            self._expires.clear()
+            return True
+
+    # -- strings ---------------------------------------------------------------
+
+    def get(self, name):
+        with self._lock:
+            return self._live(name)
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(name) is not None:
+                return None
+            self._data[name] = str(value)
+            self._expires.pop(name, None)
+            if ex is not None:
+                self._expires[name] = time.monotonic() + int(ex)
+            return True
+
+    def incrby(self, name, amount=1):
+        with self._lock:
+            value = int(self._live(name) or 0) + int(amount)
+            self._data[name] = str(value)
+            return value
+
+    def incr(self, name, amount=1):
+        return self.incrby(name, amount)
+
+    # -- hashes ----------------------------------------------------------------
+
+    def _hash(self, name, create=False):
+        value = self._live(name)
+        if value is None and create:
+            value = self._data[name] = {}
+        return value
+
+    def hget(self, name, key):
+        with self._lock:
+            return (self._hash(name) or {}).get(str(key))
+
+    def hgetall(self, name):
+        with self._lock:
+            return dict(self._hash(name) or {})
+
+    def hexists(self, name, key):
+        with self._lock:
+            return str(key) in (self._hash(name) or {})
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        with self._lock:
+            data = self._hash(name, create=True)
+            items = dict(mapping or {})
+            if key is not None:
+                items[key] = value
+            added = 0
+            for field, field_value in items.items():
+                if str(field) not in data:
+                    added += 1
+                data[str(field)] = str(field_value)
+            return added
+
+    def hsetnx(self, name, key, value):
+        with self._lock:
+            data = self._hash(name, create=True)
+            if str(key) in data:
+                return False
+            data[str(key)] = str(value)
+            return True
+
+    def hincrby(self, name, key, amount=1):
+        with self._lock:
+            data = self._hash(name, create=True)
+            value = int(data.get(str(key), 0)) + int(amount)
+            data[str(key)] = str(value)
+            return value
+
+    def hdel(self, name, *keys):
+        with self._lock:
+            data = self._hash(name) or {}
+            removed = 0
+            for key in keys:
+                if data.pop(str(key), None) is not None:
+                    removed += 1
+            if not data:
+                self._data.pop(name, None)
+            return removed
+
+    # -- sets ------------------------------------------------------------------
+
+    def sadd(self, name, *values):
+        with self._lock:
+            members = self._live(name)
+            if members is None:
+                members = self._data[name] = set()
+            before = len(members)
+            members.update(str(v) for v in values)
+            return len(members) - before
+
+    def srem(self, name, *values):
+        with self._lock:
+            members = self._live(name) or set()
+            removed = 0
+            for value in values:
+                if str(value) in members:
+                    members.discard(str(value))
+                    removed += 1
+            if not members:
+                self._data.pop(name, None)
+            return removed
+
+    def smembers(self, name):
+        with self._lock:
+            return set(self._live(name) or ())
+
+    # -- pub/sub -------------------------------------------------------------------
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for pubsub in subscribers:
+            pubsub._deliver(channel, str(message))
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return _LocalPubSub(self, ignore_subscribe_messages)
+
+    # -- pipelines ----------------------------------------------------------------
+
+    def pipeline(self, transaction=True):
+        return _LocalPipeline(self)
+
+
+class _LocalPubSub:
+    """``redis.client.PubSub`` for ``LocalRedis``: messages wait in a queue until read."""
+
+    def __init__(self, client, ignore_subscribe_messages=False):
+        self._client = client
+        self._messages = queue.Queue()
+        self.ignore_subscribe_messages = ignore_subscribe_messages
+        self.channels = {}
+
+    def _deliver(self, channel, data, kind='message'):
+        self._messages.put({'type': kind, 'pattern': None, 'channel': channel, 'data': data})
+
+    def subscribe(self, *channels):
+        with self._client._lock:
+            for channel in channels:
+                self._client._subscribers.setdefault(channel, set()).add(self)
+                self.channels[channel] = None
+                self._deliver(channel, len(self.channels), 'subscribe')
+
+    def unsubscribe(self, *channels):
+        with self._client._lock:
+            for channel in channels or list(self.channels):
+                subscribers = self._client._subscribers.get(channel, set())
+                subscribers.discard(self)
+                if not subscribers:
+                    self._client._subscribers.pop(channel, None)
+                self.channels.pop(channel, None)
+                self._deliver(channel, len(self.channels), 'unsubscribe')
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        deadline = time.monotonic() + (timeout or 0)
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                message = self._messages.get(timeout=remaining) if remaining > 0 else self._messages.get_nowait()
+            except queue.Empty:
+                return None
+            if message['type'] == 'message' or not (ignore_subscribe_messages or self.ignore_subscribe_messages):
+                return message
+
+    def close(self):
+        self.unsubscribe()
+
+
+class _LocalPipeline:
+    """Queues commands and runs them under the store lock on ``execute()``."""
+
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        with self._client._lock:
+            results = [method(*args, **kwargs) for method, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._commands = []
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_redis():
+    """Return the shared Redis client (or the local stand-in)."""
+    url = getattr(settings, 'REDIS_URL', None)
+    with _clients_lock:
+        if url not in _clients:
+            if url:
+                import redis
+                _clients[url] = redis.Redis.from_url(url, decode_responses=True)
+            else:
+                _clients[url] = LocalRedis()
+        return _clients[url]
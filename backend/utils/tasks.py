@@ -0,0 +1,60 @@
+"""
+Minimal background execution for work that must not block a request.
+
+``TASK_EXECUTOR`` selects how ``enqueue()`` runs a callable:
+
+- ``'thread'``: a shared thread pool; database connections opened by the task
+  are closed when it finishes.
+- ``'sync'``: inline, in the caller's thread (tests, management commands).
+- ``'celery'``: sent to a Celery worker (``config.celery``); ``func`` must be
+  one of the functions registered in ``config.celery.TASKS`` and its
+  arguments JSON-serializable.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'TASK_EXECUTOR_WORKERS', 4),
+                thread_name_prefix='tasks',
+            )
+        return _executor
+
+
+def _run(func, args, kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', getattr(func, '__qualname__', func))
+    finally:
+        connections.close_all()
+
+
+def enqueue(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` according to ``TASK_EXECUTOR``."""
+    mode = getattr(settings, 'TASK_EXECUTOR', 'thread')
+    if mode == 'sync':
+        return func(*args, **kwargs)
+    if mode == 'celery':
+        from config.celery import TASKS
+        path = f'{func.__module__}:{func.__qualname__}'
+        if path not in TASKS:
+            raise ValueError(f'{path} is not a registered Celery task (config.celery.TASKS)')
+        return TASKS[path].delay(*args, **kwargs)
+    if mode != 'thread':
+        raise ValueError(f'Unknown TASK_EXECUTOR: {mode!r}')
+    return _get_executor().submit(_run, func, args, kwargs)
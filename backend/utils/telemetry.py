@@ -361,6 +361,13 @@ payment_duration_histogram = _meter.create_histogram(
     unit="ms",
 )
 
+# Idempotency metrics
+idempotency_replay_counter = _meter.create_counter(
+    "idempotency.replays",
+    description="Number of POST requests answered from a stored idempotent response",
+    unit="1",
+)
+
 # Error metrics
 api_error_counter = _meter.create_counter(
     "api.errors",
@@ -386,3 +393,16 @@ admin_duration_histogram = _meter.create_histogram(
     description="Duration of admin API requests",
     unit="ms",
 )
+
+# Cache metrics
+cache_hit_counter = _meter.create_counter(
+    "cache.hits",
+    description="Number of cache lookups served from cache",
+    unit="1",
+)
+
+cache_miss_counter = _meter.create_counter(
+    "cache.misses",
+    description="Number of cache lookups that fell through to the database",
+    unit="1",
+)
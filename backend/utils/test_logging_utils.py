@@ -59,3 +59,22 @@ class LoggingUtilsTests(SimpleTestCase):
         self.assertIn("trace", data)
         self.assertIn("trace_id", data["trace"])
         self.assertIn("span_id", data["trace"])
+
+    @mock.patch("utils.logging_utils.logger")
+    def test_log_bulk_order_status_change_emits_one_record(self, mock_logger):
+        logging_utils.log_bulk_order_status_change(
+            new_status="shipped",
+            changes=[
+                {"order_id": 1, "user_id": 5, "old_status": "processing"},
+                {"order_id": 2, "user_id": 6, "old_status": "confirmed"},
+            ],
+            changed_by=9,
+        )
+
+        self.assertEqual(mock_logger.info.call_count, 1)
+        payload = mock_logger.info.call_args[0][0]
+        data = json.loads(payload.split("Order status bulk change: ")[-1])
+        self.assertEqual(data["event"], "order_status_bulk_change")
+        self.assertEqual(data["order_count"], 2)
+        self.assertEqual(data["orders"][1]["old_status"], "confirmed")
+        self.assertEqual(data["changed_by_user_id"], 9)
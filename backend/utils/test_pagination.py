@@ -0,0 +1,139 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.notifications.models import Notification
+from apps.products.models import Category, Product
+from utils.pagination import CachedCountPaginator, estimate_count
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Paging', slug='paging')
+        self.products = [
+            Product.objects.create(
+                name=f'P{i}', slug=f'p{i}', description='', category=category,
+                sku=f'P{i}', price='1.00', stock=1
+            )
+            for i in range(7)
+        ]
+        # Three rows share a timestamp so the id tie-breaker is exercised.
+        now = timezone.now()
+        Product.objects.filter(pk__in=[p.pk for p in self.products[2:5]]).update(created_at=now)
+        for offset, product in enumerate(self.products[5:], start=1):
+            Product.objects.filter(pk=product.pk).update(created_at=now + timedelta(seconds=offset))
+        for offset, product in enumerate(self.products[:2], start=1):
+            Product.objects.filter(pk=product.pk).update(created_at=now - timedelta(seconds=offset))
+
+    def _expected(self):
+        return list(Product.objects.order_by('-created_at', '-id').values_list('sku', flat=True))
+
+    def _walk(self, url, params):
+        skus, pages = [], []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            skus.extend(item['sku'] for item in response.data['results'])
+            url, params = response.data['next'], None
+        return skus, pages
+
+    def test_cursor_walk_returns_every_row_once_in_order(self):
+        skus, pages = self._walk('/api/v1/products/', {'cursor': '', 'page_size': 2})
+        self.assertEqual(skus, self._expected())
+        self.assertEqual(len(pages), 4)
+        self.assertNotIn('count', pages[0])
+
+    def test_cursor_pages_skip_count_and_offset(self):
+        first = self.client.get('/api/v1/products/', {'cursor': '', 'page_size': 2})
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(first.data['next'])
+        sql = ' '.join(q['sql'] for q in context.captured_queries).upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_previous_link_walks_back(self):
+        first = self.client.get('/api/v1/products/', {'cursor': '', 'page_size': 3})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [item['sku'] for item in back.data['results']],
+            [item['sku'] for item in first.data['results']],
+        )
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/v1/products/', {'cursor': 'cD1nYXJiYWdl'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_numbers_remain_the_default(self):
+        response = self.client.get('/api/v1/products/', {'page_size': 2, 'page': 2})
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual([item['sku'] for item in response.data['results']], self._expected()[2:4])
+
+    def test_user_scoped_lists_support_cursor(self):
+        user = User.objects.create_user(username='reader', email='reader@example.com', password='pass12345')
+        for i in range(3):
+            Notification.objects.create(user=user, notification_type='price_drop', title=f'N{i}', message='')
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/v1/notifications/', {'cursor': '', 'page_size': 2})
+        self.assertEqual([n['title'] for n in response.data['results']], ['N2', 'N1'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([n['title'] for n in response.data['results']], ['N0'])
+        self.assertIsNone(response.data['next'])
+
+
+class ApproximateCountPaginationTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password123'
+        )
+        self.client.force_authenticate(user=self.admin)
+        category = Category.objects.create(name='Admin paging', slug='admin-paging')
+        for i in range(5):
+            Product.objects.create(
+                name=f'A{i}', slug=f'a{i}', description='', category=category,
+                sku=f'A{i}', price='1.00', stock=1
+            )
+
+    def tearDown(self):
+        caches['default'].clear()
+
+    def _list(self, **params):
+        response = self.client.get('/api/v1/admin/products/products/', {'page_size': 2, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_exact_count_is_cached_per_filter(self):
+        data = self._list()
+        self.assertEqual((data['count'], data['count_is_approximate']), (5, False))
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self._list(page=2)['count'], 5)
+        self.assertFalse(any('COUNT(' in q['sql'].upper() for q in context.captured_queries))
+
+        self.assertNotEqual(
+            CachedCountPaginator.signature(Product.objects.all()),
+            CachedCountPaginator.signature(Product.objects.filter(sku='A1')),
+        )
+
+    @override_settings(PAGINATION_COUNT_ESTIMATE_THRESHOLD=1000)
+    def test_large_tables_use_planner_estimate(self):
+        with mock.patch('utils.pagination.estimate_count', return_value=2500000):
+            data = self._list()
+            self.assertEqual((data['count'], data['count_is_approximate']), (2500000, True))
+            self.assertIsNotNone(data['next'])
+            # Pages past the real end are empty rather than 404.
+            self.assertEqual(self._list(page=4)['results'], [])
+
+    def test_estimate_is_unavailable_on_sqlite(self):
+        self.assertIsNone(estimate_count(Product.objects.all()))
@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+
+from django.db import connection
+from django.test import TestCase
+
+from apps.accounts.models import Address
+from apps.notifications.archive import eligible
+from apps.notifications.fanout import recipients
+from apps.notifications.models import Notification
+from apps.orders.models import Order, OrderStatusHistory
+from apps.payments.models import Payment
+from apps.products.models import Product
+from apps.reviews.models import Review
+from apps.wishlist.models import WishlistItem
+from utils.query_audit import QueryRecorder, assert_no_full_scan, audit, read_log, suggest_index
+
+# Queries served on every page view or badge poll. Each must reach its rows
+# through an index; a full scan here fails the build.
+HOT_QUERIES = {
+    'storefront count': lambda: Product.objects.filter(is_active=True).order_by().values('id'),
+    'storefront page': lambda: Product.objects.filter(is_active=True).order_by('-created_at', '-id')[:20],
+    'my orders': lambda: Order.objects.filter(user_id=1).order_by('-created_at', '-id')[:20],
+    'order timeline': lambda: OrderStatusHistory.objects.filter(order_id=1).order_by('-created_at', '-id'),
+    'my payments': lambda: Payment.objects.filter(order__user_id=1).order_by('-created_at', '-id')[:20],
+    'product reviews': lambda: Review.objects.filter(product_id=1, is_approved=True).order_by('-created_at', '-id'),
+    'my notifications': lambda: Notification.objects.filter(user_id=1).order_by('-created_at', '-id')[:20],
+    'unread badge': lambda: Notification.objects.filter(user_id=1, is_read=False).values('id'),
+    'default address': lambda: Address.objects.filter(user_id=1, address_type='shipping', is_default=True),
+    'wishlisters': lambda: WishlistItem.objects.filter(product_id=1, id__gt=0).order_by('id')[:1000],
+    'archival batch': lambda: eligible('2024-01-01').order_by('created_at').values('id')[:1000],
+}
+
+
+class HotQueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        for name, build in HOT_QUERIES.items():
+            with self.subTest(name):
+                assert_no_full_scan(self, build())
+
+    def test_full_scan_is_detected(self):
+        with self.assertRaises(AssertionError):
+            assert_no_full_scan(self, Notification.objects.filter(title='x'))
+
+
+class QueryAuditTests(TestCase):
+    def test_recorded_statements_are_audited(self):
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with connection.execute_wrapper(QueryRecorder(path)):
+            list(Notification.objects.filter(notification_type='price_drop').order_by('-created_at'))
+            list(Notification.objects.filter(notification_type='price_drop').order_by('-created_at'))
+            list(recipients(1, limit=10))
+            Address.objects.filter(user_id=1, address_type='shipping', is_default=True).update(is_default=False)
+
+        statements = read_log([path])
+        self.assertEqual(len(statements), 3)
+        with open(path) as log:
+            self.assertEqual(json.loads(log.readline())['params'], ['price_drop'])
+
+        report = audit(statements)
+        self.assertEqual(list(report.scans), ['notifications'])
+        [plan] = report.scans['notifications']
+        self.assertEqual(suggest_index(plan.sql, 'notifications'), ['notification_type', '-created_at'])
+        self.assertEqual(report.sorts, [plan])
+        self.assertEqual(report.errors, [])
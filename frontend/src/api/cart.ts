@@ -13,9 +13,18 @@ export type CartItem = {
     id: number
     name: string
     slug: string
+    sku?: string
     price: string
     stock: number
+    is_active?: boolean
   }
+  variant_details?: {
+    id: number
+    name: string
+    value: string
+    price_adjustment: string
+    stock: number
+  } | null
 }
 
 export type Cart = {
@@ -64,3 +73,13 @@ export async function decrementCartItem(itemId: number): Promise<Cart> {
 export async function clearCart(): Promise<Cart> {
   return postJson<Cart>(`${API_BASE_URL}/api/v1/cart/clear/`, {})
 }
+
+export type CartBatchOperation =
+  | { op: 'add'; product: number; variant?: number | null; quantity?: number }
+  | { op: 'set'; item_id: number; quantity: number }
+  | { op: 'remove'; item_id: number }
+  | { op: 'increment'; item_id: number; quantity?: number }
+
+export async function batchUpdateCart(operations: CartBatchOperation[]): Promise<Cart> {
+  return postJson<Cart>(`${API_BASE_URL}/api/v1/cart/batch/`, { operations })
+}
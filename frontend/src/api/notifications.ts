@@ -27,3 +27,19 @@ export async function listNotifications(): Promise<Notification[]> {
 export async function markAllNotificationsRead(): Promise<{ status: string }> {
   return postJson<{ status: string }>(`${API_BASE_URL}/api/v1/notifications/mark_all_as_read/`, {})
 }
+
+export async function getUnreadNotificationCount(): Promise<number> {
+  const data = await getJson<{ unread_count: number }>(`${API_BASE_URL}/api/v1/notifications/unread_count/`)
+  return data.unread_count
+}
+
+// Server-Sent Events: `notification` and `order_status` events for the signed-in user.
+// The URL carries a single-use, short-lived ticket rather than the API token, so a
+// stream that errors out must be closed and reopened through this function.
+export async function openEventStream(): Promise<EventSource> {
+  const { ticket } = await postJson<{ ticket: string; expires_in: number }>(
+    `${API_BASE_URL}/api/v1/notifications/stream_ticket/`,
+    {},
+  )
+  return new EventSource(`${API_BASE_URL}/api/v1/events/stream/?ticket=${encodeURIComponent(ticket)}`)
+}
@@ -24,13 +24,21 @@ export type OrderItem = {
   quantity: number
   price: string
   subtotal: string
+  // Captured at purchase; later catalog edits don't change these.
   product_details?: {
     id: number
     name: string
     slug: string
-    price: string
-    images?: Array<{ id: number; image: string; is_primary: boolean; alt_text?: string | null }>
+    sku: string
+    image: string | null
   }
+  variant_details?: {
+    id: number
+    name: string
+    value: string
+    sku: string
+    label: string
+  } | null
 }
 
 export type OrderDetail = {
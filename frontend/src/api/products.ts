@@ -60,6 +60,12 @@ export type ProductAttribute = {
   value: string
 }
 
+export type ProductRating = {
+  count: number
+  average: number | null
+  histogram: Record<'1' | '2' | '3' | '4' | '5', number>
+}
+
 export type Product = {
   id: number
   name: string
@@ -76,6 +82,10 @@ export type Product = {
   is_featured?: boolean
   is_on_sale?: boolean
   discount_percentage?: number
+  // List responses carry these instead of images/variants/attributes.
+  in_stock?: boolean
+  primary_image?: string | null
+  rating?: ProductRating
   images?: ProductImage[]
   variants?: ProductVariant[]
   attributes?: ProductAttribute[]
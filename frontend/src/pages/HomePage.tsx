@@ -7,6 +7,7 @@ import Loading from '../shared/ui/Loading'
 const PLACEHOLDER = 'https://placehold.co/600x400?text=Product'
 
 function productImageUrl(p: Product): string {
+  if (p.primary_image) return p.primary_image
   const primary = p.images?.find((img) => img.is_primary) ?? p.images?.[0]
   return (primary?.image_url ?? primary?.image) || PLACEHOLDER
 }